@@ -11,6 +11,42 @@ class Settings(BaseSettings):
     # Riot Games API
     riot_api_key: str = ""
     riot_api_base_url: str = "https://americas.api.riotgames.com"
+    riot_connections_per_host: int = 20  # Pooled keep-alive connections per Riot host
+    riot_max_concurrency: int = 10  # Max in-flight requests for concurrent match fetching
+    riot_app_rate_limit: str = "20:1,100:120"  # Assumed app limit until X-App-Rate-Limit headers arrive
+    
+    # Match cache (finished match-v5 payloads, stored on disk)
+    match_cache_enabled: bool = True
+    match_cache_path: str = "data/match_cache.sqlite3"
+    match_cache_max_mb: int = 512
+    
+    # Lookup cache (Riot ID -> PUUID, summoner and league entries)
+    lookup_cache_max_entries: int = 10000
+    lookup_cache_path: Optional[str] = None  # Shared SQLite file for multi-worker deployments; None = in-process only
+    lookup_cache_max_rows: int = 100000  # Size limit for the shared SQLite file; expired rows are pruned too
+    riot_account_cache_ttl: int = 86400  # PUUIDs never change
+    riot_summoner_cache_ttl: int = 3600
+    riot_league_cache_ttl: int = 300  # Rank changes at most once per game
+    riot_not_found_cache_ttl: int = 60  # Negative caching for 404s (unknown Riot IDs)
+    
+    # Agents
+    context_history_size: int = 256  # Context changes kept per ContextManager
+    agent_result_cache_max_entries: int = 256
+    agent_result_cache_ttl: int = 1800  # Seconds a cached agent result stays valid
+    workflow_timeout: float = 60  # Deadline for a whole agent workflow, in seconds
+    llm_agent_timeout: float = 45  # Per-step timeout for agents that call Bedrock
+    year_summary_job_workers: int = 2  # Background workers for year-summary jobs
+    job_result_ttl: int = 3600  # Seconds a finished job (and its result) is kept
+    event_history_size: int = 1000  # Events kept in the shared EventBus history
+    event_async_dispatch: bool = True  # Run subscribers and sinks on a background worker
+    event_sample_rates: str = ""  # Per-type fraction recorded, e.g. "context_updated:0.1"
+    event_log_path: Optional[str] = None  # JSON-lines event log; None = no log
+    event_sink_batch_size: int = 100
+    
+    # Worker pools for blocking work in async routes
+    io_pool_workers: int = 32  # Blocking network I/O (boto3, sync Riot client)
+    compute_pool_workers: int = 4  # Analysis and agent workflows
+    render_pool_processes: int = 2  # Chart PNG rendering processes; 0 renders in-thread
     
     # AWS Configuration
     aws_region: str = "us-east-1"
@@ -20,6 +56,28 @@ class Settings(BaseSettings):
     # AWS Bedrock
     bedrock_model_id: str = "anthropic.claude-v2"
     bedrock_region: str = "us-east-1"
+    bedrock_read_timeout: int = 60  # Seconds to wait for a model response before giving up
+    bedrock_concurrency_initial: int = 8  # Starting cap on concurrent model calls; adapts to throttling
+    bedrock_concurrency_min: int = 1
+    bedrock_concurrency_max: int = 32
+    bedrock_max_attempts: int = 4  # Tries per model call when Bedrock throttles
+    bedrock_retry_base_delay: float = 0.5  # Full-jitter backoff: up to base * 2^attempt seconds
+    bedrock_retry_max_delay: float = 8.0
+    prompt_token_budget: int = 6000  # Approximate input tokens per prompt; match tables are trimmed to fit
+    prompt_max_list_items: int = 10  # Longest list sent to the model inside JSON data sections
+    llm_cache_ttl: int = 86400  # Seconds a model response is reused for an identical request; 0 disables
+    llm_cache_max_entries: int = 1000  # In-process LRU entries
+    llm_cache_path: Optional[str] = "data/llm_cache.sqlite3"  # Persistent store shared by workers; None = in-process only
+    llm_cache_max_rows: int = 50000  # Size limit for the persistent store
+    # Comma-separated BedrockService task types whose responses are cached (chat never is)
+    llm_cache_tasks: str = ("insights,match_analysis,year_end_summary,creative_year_summary,"
+                            "playstyle_comparison,progress_narrative,shareable_moment,social_comparison")
+    llm_cache_temperature: Optional[float] = None  # Pinned temperature for cached tasks (e.g. 0); None = 0.7
+    
+    # AWS Comprehend
+    comprehend_max_concurrency: int = 4  # Batch calls in flight at once
+    comprehend_cache_max_entries: int = 5000  # Analyzed documents kept, keyed by text hash
+    comprehend_cache_ttl: int = 604800  # Analysis of a given text never changes; a week
     
     # Application
     app_env: str = "development"
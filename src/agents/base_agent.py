@@ -2,19 +2,47 @@
 Base agent class for all specialized agents.
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import json
+from src.analyzers.player_games import PlayerGames
 from src.agents.context_manager import ContextManager
 from src.agents.messages import AgentRequest, AgentResponse, create_response
 from src.agents.events import EventBus, EventType, AgentEvent
 
 
+def _canonical(value: Any) -> Any:
+    """Reduce an input value to a small JSON-serializable form that identifies it."""
+    if isinstance(value, PlayerGames):
+        # A player's games are identified by the player and the set of match IDs
+        return {"puuid": value.puuid, "match_ids": sorted(value.match_ids.tolist())}
+    if isinstance(value, list) and value and all(isinstance(v, dict) and "metadata" in v for v in value):
+        return {"match_ids": sorted(v["metadata"].get("matchId", "") for v in value)}
+    return value
+
+
+def fingerprint_request(agent_name: str, task: str, input_data: Dict[str, Any]) -> str:
+    """Stable hash of an agent task and its inputs."""
+    payload = json.dumps(
+        [agent_name, task, {key: _canonical(value) for key, value in input_data.items()}],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 class BaseAgent(ABC):
     """Abstract base class for all agents."""
     
+    # Tasks whose results are cached in the global context, keyed by a fingerprint of their inputs.
+    # Only opt in tasks whose output depends on nothing but their inputs.
+    cacheable_tasks: Tuple[str, ...] = ()
+    
     def __init__(self, name: str, context_manager: ContextManager, event_bus: Optional[EventBus] = None):
         self.name = name
         self.context_manager = context_manager
         self.event_bus = event_bus or EventBus()
+        # Default per-step timeout in workflows (seconds); None means only the workflow deadline applies
+        self.timeout: Optional[float] = None
         self._initialized = False
     
     def initialize(self) -> None:
@@ -34,23 +62,41 @@ class BaseAgent(ABC):
         """Execute the agent's task."""
         pass
     
-    def read_from_context(self, keys: list) -> Dict[str, Any]:
+    def context_for(self, request: AgentRequest) -> ContextManager:
+        """Get the context a request works in: its own if it carries one, else the agent's global context."""
+        return request.context if request.context is not None else self.context_manager
+    
+    def read_from_context(self, keys: list, context: Optional[ContextManager] = None) -> Dict[str, Any]:
         """Read values from shared context."""
+        context = context or self.context_manager
         result = {}
         for key in keys:
-            value = self.context_manager.get(key)
+            value = context.get(key)
             if value is not None:
                 result[key] = value
         return result
     
-    def write_to_context(self, updates: Dict[str, Any]) -> None:
+    def write_to_context(self, updates: Dict[str, Any], context: Optional[ContextManager] = None) -> None:
         """Write values to shared context."""
-        self.context_manager.update(updates, self.name)
+        (context or self.context_manager).update(updates, self.name)
         self._publish_event(EventType.CONTEXT_UPDATED, {
             "agent": self.name,
             "keys": list(updates.keys())
         })
     
+    def publish_result(self, request: AgentRequest, data: Dict[str, Any],
+                       summary: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Hand a result to the request context's listeners and announce it with a RESULT_READY event.
+        
+        Only the listeners (e.g. a streaming response) get data; the event carries the agent, task,
+        session id and the small summary fields, so bus history and sinks never hold charts or results.
+        """
+        context = self.context_for(request)
+        header = {"agent": self.name, "task": request.task, "session_id": context.get_session_id()}
+        context.notify_result({**header, **data})
+        self._publish_event(EventType.RESULT_READY, {**header, **(summary or {})})
+    
     def _publish_event(self, event_type: EventType, data: Dict[str, Any]) -> None:
         """Publish an event."""
         event = AgentEvent(event_type, self.name, data)
@@ -61,21 +107,39 @@ class BaseAgent(ABC):
         try:
             # Read context if needed
             if request.context_keys:
-                context_data = self.read_from_context(request.context_keys)
+                context_data = self.read_from_context(request.context_keys, self.context_for(request))
                 request.input_data.update(context_data)
             
-            # Execute the task
-            result = self.execute(request)
+            # Reuse a cached result for identical inputs, otherwise execute the task
+            fingerprint = None
+            result = None
+            if request.task in self.cacheable_tasks:
+                fingerprint = fingerprint_request(self.name, request.task, request.input_data)
+                cached = self.context_manager.get_cached_result(self.name, request.task, fingerprint)
+                if cached is not None:
+                    result = create_response(request, success=True, result=cached["result"],
+                                             context_updates=cached["context_updates"])
+            cache_hit = result is not None
+            if not cache_hit:
+                result = self.execute(request)
+                if fingerprint is not None and result.success:
+                    self.context_manager.cache_result(self.name, request.task, {
+                        "result": result.result,
+                        "context_updates": result.context_updates
+                    }, fingerprint)
             
             # Write to context if needed
             if result.success and result.context_updates:
-                self.write_to_context(result.context_updates)
+                self.write_to_context(result.context_updates, self.context_for(request))
+            if result.success:
+                self.publish_result(request, {"result": result.result})
             
             # Publish completion event
             self._publish_event(EventType.AGENT_COMPLETED, {
                 "agent": self.name,
                 "task": request.task,
-                "success": result.success
+                "success": result.success,
+                "cached": cache_hit
             })
             
             return result
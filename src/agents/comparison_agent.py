@@ -12,16 +12,22 @@ from src.generators.social_content import SocialContentGenerator
 class ComparisonAgent(BaseAgent):
     """Agent specialized in comparing players."""
     
-    def __init__(self, context_manager, event_bus=None):
+    def __init__(self, context_manager, event_bus=None, bedrock_service=None):
         super().__init__("player_comparison", context_manager, event_bus)
         self.match_analyzer = MatchAnalyzer()
-        self.bedrock_service = BedrockService()
+        self.bedrock_service = bedrock_service or BedrockService()
         self.social_generator = SocialContentGenerator()
     
     def _setup(self) -> None:
         """Setup player comparison agent."""
         pass
     
+    def _player_analysis(self, player_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Use the player's precomputed analysis if given, otherwise analyze their matches."""
+        if player_data.get("analysis") is not None:
+            return player_data["analysis"]
+        return self.match_analyzer.analyze_player_matches(player_data.get("matches", []), player_data.get("puuid"))
+    
     def execute(self, request: AgentRequest) -> AgentResponse:
         """Execute player comparison task."""
         try:
@@ -36,14 +42,9 @@ class ComparisonAgent(BaseAgent):
                     error="Missing required input: player1 or player2 data"
                 )
             
-            # Analyze both players
-            matches1 = player1_data.get("matches", [])
-            puuid1 = player1_data.get("puuid")
-            matches2 = player2_data.get("matches", [])
-            puuid2 = player2_data.get("puuid")
-            
-            analysis1 = self.match_analyzer.analyze_player_matches(matches1, puuid1)
-            analysis2 = self.match_analyzer.analyze_player_matches(matches2, puuid2)
+            # Analyze both players, unless the caller already has their analyses
+            analysis1 = self._player_analysis(player1_data)
+            analysis2 = self._player_analysis(player2_data)
             
             # Generate comparison using Bedrock
             comparison = self.bedrock_service.generate_social_comparison(
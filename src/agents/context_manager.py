@@ -1,100 +1,137 @@
 """
 Shared context manager for multi-agent system.
 Provides centralized context storage with thread-safe operations.
+
+Writes are copy-on-write: every change publishes a new dict, so readers get
+a consistent read-only snapshot without taking the lock or copying. The
+change history is a bounded ring buffer.
 """
-from typing import Dict, Any, Optional
+from collections import deque
+from types import MappingProxyType
+from typing import Callable, Dict, Any, List, Mapping, NamedTuple, Optional, Tuple
 from threading import Lock
 from datetime import datetime
+import time
 import uuid
+from config.settings import settings
+from src.services.ttl_cache import TTLCache
+
+
+class ContextChange(NamedTuple):
+    """One entry in the context change history."""
+    version: int
+    action: str  # "set", "update" or "clear"
+    keys: Tuple[str, ...]
+    agent: Optional[str]
+    timestamp: float  # time.monotonic() seconds
 
 
 class ContextManager:
     """Manages shared context for agent collaboration."""
     
-    def __init__(self):
+    def __init__(self, history_size: Optional[int] = None):
         self._context: Dict[str, Any] = {}
         self._lock = Lock()
         self._version = 0
         self._session_id = str(uuid.uuid4())
         self._created_at = datetime.now()
-        self._history: list = []
+        self._history: deque = deque(maxlen=history_size if history_size is not None
+                                     else settings.context_history_size)
+        # Agent results keyed by input fingerprint; separate from the context so clear() keeps them.
+        # Created on first use: only the global context caches results, per-request contexts never do
+        self._result_cache: Optional[TTLCache] = None
+        # Called with each full agent result produced in this context (e.g. by a streaming response)
+        self._result_listeners: List[Callable[[Dict[str, Any]], None]] = []
+    
+    def _publish(self, context: Dict[str, Any], action: str, keys: Tuple[str, ...],
+                 agent_name: Optional[str]) -> None:
+        """Swap in a new context dict and record the change. Caller holds the lock."""
+        self._context = context
+        self._version += 1
+        self._history.append(ContextChange(self._version, action, keys, agent_name, time.monotonic()))
     
     def set(self, key: str, value: Any, agent_name: Optional[str] = None) -> None:
         """Set a value in the shared context."""
         with self._lock:
-            self._context[key] = value
-            self._version += 1
-            self._history.append({
-                "version": self._version,
-                "key": key,
-                "agent": agent_name,
-                "timestamp": datetime.now().isoformat(),
-                "action": "set"
-            })
+            context = dict(self._context)
+            context[key] = value
+            self._publish(context, "set", (key,), agent_name)
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get a value from the shared context."""
-        with self._lock:
-            return self._context.get(key, default)
+        return self._context.get(key, default)
     
     def has(self, key: str) -> bool:
         """Check if a key exists in the context."""
-        with self._lock:
-            return key in self._context
+        return key in self._context
     
     def update(self, updates: Dict[str, Any], agent_name: Optional[str] = None) -> None:
         """Update multiple values in the context."""
         with self._lock:
-            self._context.update(updates)
-            self._version += 1
-            self._history.append({
-                "version": self._version,
-                "updates": list(updates.keys()),
-                "agent": agent_name,
-                "timestamp": datetime.now().isoformat(),
-                "action": "update"
-            })
-    
-    def get_all(self) -> Dict[str, Any]:
-        """Get all context data."""
-        with self._lock:
-            return self._context.copy()
+            context = dict(self._context)
+            context.update(updates)
+            self._publish(context, "update", tuple(updates), agent_name)
+    
+    def get_all(self) -> Mapping[str, Any]:
+        """Get a read-only snapshot of all context data; later writes don't change it."""
+        return MappingProxyType(self._context)
     
     def clear(self) -> None:
-        """Clear all context data."""
+        """Clear all context data and its history."""
         with self._lock:
-            self._context.clear()
-            self._version += 1
+            self._history.clear()
+            self._publish({}, "clear", (), None)
     
     def get_version(self) -> int:
         """Get current context version."""
-        with self._lock:
-            return self._version
+        return self._version
     
     def get_session_id(self) -> str:
         """Get session ID."""
         return self._session_id
     
-    def get_history(self) -> list:
-        """Get context change history."""
+    def get_history(self) -> Tuple[ContextChange, ...]:
+        """Get the most recent context changes, oldest first."""
         with self._lock:
-            return self._history.copy()
-    
-    def cache_result(self, agent_name: str, task: str, result: Any) -> None:
-        """Cache an agent's result."""
-        cache_key = f"agent_result:{agent_name}:{task}"
-        self.set(cache_key, {
-            "result": result,
-            "agent": agent_name,
-            "task": task,
-            "timestamp": datetime.now().isoformat()
-        }, agent_name)
-    
-    def get_cached_result(self, agent_name: str, task: str) -> Optional[Any]:
-        """Get a cached agent result."""
-        cache_key = f"agent_result:{agent_name}:{task}"
-        cached = self.get(cache_key)
-        if cached:
-            return cached.get("result")
-        return None
+            return tuple(self._history)
+    
+    def add_result_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Receive every result agents publish in this context, payload included."""
+        with self._lock:
+            self._result_listeners = self._result_listeners + [listener]
+    
+    def remove_result_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Stop receiving results."""
+        with self._lock:
+            self._result_listeners = [l for l in self._result_listeners if l is not listener]
+    
+    def notify_result(self, result: Dict[str, Any]) -> None:
+        """Hand a result to this context's listeners, on the calling thread."""
+        for listener in self._result_listeners:
+            try:
+                listener(result)
+            except Exception as e:
+                print(f"Error in result listener: {e}")
+    
+    def _results(self) -> TTLCache:
+        """Get the agent result cache, creating it on first use."""
+        if self._result_cache is None:
+            with self._lock:
+                if self._result_cache is None:
+                    self._result_cache = TTLCache(settings.agent_result_cache_max_entries)
+        return self._result_cache
+    
+    def cache_result(self, agent_name: str, task: str, result: Any, fingerprint: str = "",
+                     ttl: Optional[float] = None) -> None:
+        """Cache an agent's result for the given input fingerprint."""
+        self._results().set((agent_name, task, fingerprint), result,
+                               ttl if ttl is not None else settings.agent_result_cache_ttl)
+    
+    def get_cached_result(self, agent_name: str, task: str, fingerprint: str = "") -> Optional[Any]:
+        """Get a cached agent result for the given input fingerprint."""
+        return self._results().get((agent_name, task, fingerprint))
+    
+    def result_cache_stats(self) -> Dict:
+        """Get hit/miss counters for the agent result cache."""
+        return self._results().stats()
 
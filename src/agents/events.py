@@ -1,9 +1,21 @@
 """
 Event-driven communication system for agents.
+
+Publishing is cheap: events get their id and ISO timestamp only when
+serialized, history is a bounded ring, and subscribers and sinks can run on
+a background worker so a slow consumer never stalls the agent that
+published. Sinks receive events in batches.
 """
-from typing import Callable, Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
+from collections import deque
 from enum import Enum
 from datetime import datetime
+from threading import Lock, Thread
+import json
+import os
+import queue
+import random
+import time
 import uuid
 
 
@@ -15,17 +27,41 @@ class EventType(str, Enum):
     CONTEXT_UPDATED = "context_updated"
     TASK_DELEGATED = "task_delegated"
     RESULT_READY = "result_ready"
+    WORKFLOW_COMPLETED = "workflow_completed"
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[EventType, float]:
+    """Parse "event_type:rate,..." (e.g. "context_updated:0.1") into per-type sample rates."""
+    rates = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, rate = part.split(":")
+        rates[EventType(name.strip())] = float(rate)
+    return rates
 
 
 class AgentEvent:
     """Event for agent communication."""
     
     def __init__(self, event_type: EventType, source: str, data: Dict[str, Any] = None):
-        self.event_id = str(uuid.uuid4())
         self.event_type = event_type
         self.source = source
         self.data = data or {}
-        self.timestamp = datetime.now().isoformat()
+        self.created_at = time.time()
+        self._event_id: Optional[str] = None
+    
+    @property
+    def event_id(self) -> str:
+        """Unique event ID, generated on first use."""
+        if self._event_id is None:
+            self._event_id = str(uuid.uuid4())
+        return self._event_id
+    
+    @property
+    def timestamp(self) -> str:
+        """ISO timestamp of when the event was created."""
+        return datetime.fromtimestamp(self.created_at).isoformat()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert event to dictionary."""
@@ -38,41 +74,169 @@ class AgentEvent:
         }
 
 
+class JsonLinesEventSink:
+    """Appends events to a file, one JSON object per line."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = Lock()
+    
+    def write_batch(self, events: List[AgentEvent]) -> None:
+        """Write a batch of events with a single write and flush."""
+        lines = "".join(json.dumps(event.to_dict(), default=str) + "\n" for event in events)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+    
+    def close(self) -> None:
+        """Close the file."""
+        with self._lock:
+            self._file.close()
+
+
 class EventBus:
-    """Event bus for agent communication."""
+    """
+    Event bus for agent communication.
+    
+    With async_dispatch, publish only enqueues the event; a worker thread
+    calls subscribers and delivers batches to sinks. When the queue is full,
+    new events are dropped (and counted) rather than blocking the publisher.
+    sample_rates (event type -> fraction kept) thins out what is recorded in
+    history and sent to sinks; subscribers always receive every event.
+    """
     
-    def __init__(self):
+    def __init__(self, history_size: int = 1000, async_dispatch: bool = False,
+                 sample_rates: Optional[Dict[EventType, float]] = None,
+                 sinks: Optional[List[Any]] = None, sink_batch_size: int = 100,
+                 queue_size: int = 10000):
         self._subscribers: Dict[EventType, List[Callable]] = {}
-        self._event_history: List[AgentEvent] = []
+        self._event_history: deque = deque(maxlen=history_size)
+        self.sample_rates = sample_rates or {}
+        self.sinks = list(sinks or [])
+        self.sink_batch_size = sink_batch_size
+        self.published = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self._pending: List[AgentEvent] = []  # Sink batch being filled
+        self._lock = Lock()
+        
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[Thread] = None
+        if async_dispatch:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._worker = Thread(target=self._run_worker, name="event-bus", daemon=True)
+            self._worker.start()
     
     def subscribe(self, event_type: EventType, handler: Callable) -> None:
         """Subscribe to an event type."""
-        if event_type not in self._subscribers:
-            self._subscribers[event_type] = []
-        self._subscribers[event_type].append(handler)
+        with self._lock:
+            # Copy so dispatch can iterate the old list without locking
+            self._subscribers[event_type] = self._subscribers.get(event_type, []) + [handler]
     
     def unsubscribe(self, event_type: EventType, handler: Callable) -> None:
         """Unsubscribe from an event type."""
-        if event_type in self._subscribers:
-            if handler in self._subscribers[event_type]:
-                self._subscribers[event_type].remove(handler)
+        with self._lock:
+            handlers = self._subscribers.get(event_type, [])
+            if handler in handlers:
+                self._subscribers[event_type] = [h for h in handlers if h is not handler]
+    
+    def add_sink(self, sink: Any) -> None:
+        """Add a sink; it needs write_batch(events) and close()."""
+        self.sinks.append(sink)
     
     def publish(self, event: AgentEvent) -> None:
         """Publish an event."""
-        self._event_history.append(event)
+        self.published += 1
+        if self._queue is None:
+            self._dispatch(event)
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _dispatch(self, event: AgentEvent) -> None:
+        """Record an event and deliver it to subscribers and the sink batch."""
+        rate = self.sample_rates.get(event.event_type, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            self._event_history.append(event)
+            if self.sinks:
+                with self._lock:
+                    self._pending.append(event)
+                    full = len(self._pending) >= self.sink_batch_size
+                if full:
+                    self.flush()
+        else:
+            self.sampled_out += 1
         
-        if event.event_type in self._subscribers:
-            for handler in self._subscribers[event.event_type]:
-                try:
-                    handler(event)
-                except Exception as e:
-                    print(f"Error in event handler: {e}")
+        for handler in self._subscribers.get(event.event_type, ()):
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Error in event handler: {e}")
+    
+    def flush(self) -> None:
+        """Deliver the pending sink batch."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        for sink in self.sinks:
+            try:
+                sink.write_batch(batch)
+            except Exception as e:
+                print(f"Error in event sink: {e}")
+    
+    def _run_worker(self) -> None:
+        """Dispatch queued events; flush sinks whenever the queue goes idle."""
+        while True:
+            try:
+                event = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self.flush()
+                continue
+            if event is None:
+                self._queue.task_done()
+                break
+            self._dispatch(event)
+            self._queue.task_done()
+            if self._queue.empty():
+                self.flush()
+    
+    def drain(self) -> None:
+        """Wait until every queued event has been dispatched, then flush sinks."""
+        if self._queue is not None:
+            self._queue.join()
+        self.flush()
+    
+    def close(self) -> None:
+        """Stop the worker after it dispatches queued events, then flush and close sinks."""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get publish/drop counters and queue depth."""
+        return {
+            "published": self.published,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "history_size": len(self._event_history)
+        }
     
     def get_history(self) -> List[AgentEvent]:
-        """Get event history."""
-        return self._event_history.copy()
+        """Get event history, oldest first."""
+        return list(self._event_history)
     
     def clear_history(self) -> None:
         """Clear event history."""
         self._event_history.clear()
-
@@ -2,6 +2,7 @@
 Insights Generation Agent - Generates AI-powered insights from analyzed data.
 """
 from typing import Dict, Any
+from config.settings import settings
 from src.agents.base_agent import BaseAgent
 from src.agents.messages import AgentRequest, AgentResponse, create_response
 from src.services.aws_bedrock import BedrockService
@@ -10,9 +11,12 @@ from src.services.aws_bedrock import BedrockService
 class InsightsAgent(BaseAgent):
     """Agent specialized in generating AI-powered insights."""
     
-    def __init__(self, context_manager, event_bus=None):
+    cacheable_tasks = ("generate_insights",)
+    
+    def __init__(self, context_manager, event_bus=None, bedrock_service=None):
         super().__init__("insights_generation", context_manager, event_bus)
-        self.bedrock_service = BedrockService()
+        self.bedrock_service = bedrock_service or BedrockService()
+        self.timeout = settings.llm_agent_timeout
     
     def _setup(self) -> None:
         """Setup insights generation agent."""
@@ -25,7 +29,7 @@ class InsightsAgent(BaseAgent):
             match_analysis = request.input_data.get("match_analysis")
             if not match_analysis:
                 # Try to get from context
-                match_analysis = self.context_manager.get("match_analysis")
+                match_analysis = self.context_for(request).get("match_analysis")
             
             if not match_analysis:
                 return create_response(
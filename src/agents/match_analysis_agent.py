@@ -10,6 +10,8 @@ from src.analyzers.match_analyzer import MatchAnalyzer
 class MatchAnalysisAgent(BaseAgent):
     """Agent specialized in analyzing match data."""
     
+    cacheable_tasks = ("analyze_matches",)
+    
     def __init__(self, context_manager, event_bus=None):
         super().__init__("match_analysis", context_manager, event_bus)
         self.match_analyzer = MatchAnalyzer()
@@ -2,9 +2,10 @@
 Agent communication protocol and message formats.
 """
 from typing import Dict, Any, Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
+from src.agents.context_manager import ContextManager
 
 
 class MessageType(str, Enum):
@@ -38,7 +39,12 @@ class AgentRequest(BaseModel):
     input_data: Dict[str, Any]
     context_keys: Optional[List[str]] = None  # Keys to read from context
     output_keys: Optional[List[str]] = None  # Keys to write to context
+    # Request-scoped context the agent reads and writes; None means the agent's own (global) context
+    context: Optional[ContextManager] = Field(default=None, exclude=True)
     timestamp: str = datetime.now().isoformat()
+    
+    class Config:
+        arbitrary_types_allowed = True
 
 
 class AgentResponse(BaseModel):
@@ -55,7 +61,8 @@ class AgentResponse(BaseModel):
 
 def create_request(agent_name: str, task: str, input_data: Dict[str, Any], 
                    context_keys: Optional[List[str]] = None,
-                   output_keys: Optional[List[str]] = None) -> AgentRequest:
+                   output_keys: Optional[List[str]] = None,
+                   context: Optional[ContextManager] = None) -> AgentRequest:
     """Create a standardized agent request."""
     import uuid
     return AgentRequest(
@@ -64,7 +71,8 @@ def create_request(agent_name: str, task: str, input_data: Dict[str, Any],
         task=task,
         input_data=input_data,
         context_keys=context_keys,
-        output_keys=output_keys
+        output_keys=output_keys,
+        context=context
     )
 
 
@@ -1,27 +1,39 @@
 """
 Orchestrator Agent - Central coordinator that manages workflow and delegates tasks.
 """
-from typing import Dict, Any, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock
+import time
+from config.settings import settings
 from src.agents.context_manager import ContextManager
 from src.agents.registry import AgentRegistry
 from src.agents.messages import AgentRequest, AgentResponse, create_request
 from src.agents.events import EventBus, EventType, AgentEvent
+from src.analyzers.player_games import PlayerGames
+from src.services.deadline import deadline_scope, get_deadline, remaining, submit_with_context
 
 
 class Orchestrator:
     """Orchestrator for managing multi-agent workflows."""
     
     def __init__(self, context_manager: ContextManager, agent_registry: AgentRegistry, event_bus: Optional[EventBus] = None):
+        # Global context, kept only for data shared across requests; workflows use their own
         self.context_manager = context_manager
         self.agent_registry = agent_registry
         self.event_bus = event_bus or EventBus()
         self.executor = ThreadPoolExecutor(max_workers=10)
+        # Timed-out steps whose threads are still running; they hold executor workers until they finish
+        self._abandoned = set()
+        self._abandoned_lock = Lock()
+        self.abandoned_steps = 0
     
     def delegate(self, agent_name: str, task: str, input_data: Dict[str, Any],
                  context_keys: Optional[List[str]] = None,
-                 output_keys: Optional[List[str]] = None) -> AgentResponse:
-        """Delegate a task to a specific agent."""
+                 output_keys: Optional[List[str]] = None,
+                 context: Optional[ContextManager] = None) -> AgentResponse:
+        """Delegate a task to a specific agent, optionally within a request-scoped context."""
         agent = self.agent_registry.get(agent_name)
         if not agent:
             return AgentResponse(
@@ -32,8 +44,17 @@ class Orchestrator:
                 error=f"Agent '{agent_name}' not found in registry"
             )
         
+        if remaining() == 0.0:
+            return AgentResponse(
+                request_id="",
+                agent_name=agent_name,
+                task=task,
+                success=False,
+                error="Deadline exceeded before the task started"
+            )
+        
         # Create request
-        request = create_request(agent_name, task, input_data, context_keys, output_keys)
+        request = create_request(agent_name, task, input_data, context_keys, output_keys, context)
         
         # Publish delegation event
         event = AgentEvent(EventType.TASK_DELEGATED, "orchestrator", {
@@ -47,28 +68,166 @@ class Orchestrator:
         
         return response
     
-    def execute_workflow(self, workflow: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Execute a workflow of agent tasks."""
-        results = {}
+    def execute_workflow(self, workflow: List[Dict[str, Any]],
+                         context: Optional[ContextManager] = None,
+                         timeout: Optional[float] = None) -> Dict[str, AgentResponse]:
+        """
+        Execute a workflow of agent tasks as a dependency graph.
+        
+        A step depends on every earlier step whose output_keys it reads via
+        context_keys, plus any step ids listed in its "depends_on". Steps run
+        on the orchestrator's executor as soon as their dependencies have
+        completed, so independent steps overlap. Steps that depend on a
+        failed step are skipped and reported as failed.
+        
+        The workflow runs under a deadline of timeout seconds (default:
+        settings.workflow_timeout), which agents and the Riot/Bedrock clients
+        they call can see. A step can have a tighter "timeout", falling back
+        to its agent's timeout attribute. Steps still running when their time
+        is up are abandoned and reported as timed out; once the workflow
+        deadline passes, steps not yet started are cancelled. Whatever
+        completed is returned, so callers can use partial results.
         
+        Results are keyed by each step's "id" (default: "<agent>_<task>").
+        All steps share the given request-scoped context.
+        """
+        steps = {}
         for step in workflow:
-            agent_name = step.get("agent")
-            task = step.get("task")
-            input_data = step.get("input_data", {})
-            context_keys = step.get("context_keys")
-            output_keys = step.get("output_keys")
-            parallel = step.get("parallel", False)
-            
-            if parallel:
-                # Execute in parallel with other parallel steps
-                continue
-            
-            response = self.delegate(agent_name, task, input_data, context_keys, output_keys)
-            results[f"{agent_name}_{task}"] = response
+            step_id = step.get("id") or f"{step.get('agent')}_{step.get('task')}"
+            if step_id in steps:
+                raise ValueError(f"Duplicate workflow step id '{step_id}'")
+            steps[step_id] = step
         
-        return results
+        pending = self._workflow_dependencies(steps)
+        results: Dict[str, AgentResponse] = {}
+        running = {}  # future -> (step id, step deadline or None)
+        
+        with deadline_scope(timeout if timeout is not None else settings.workflow_timeout):
+            deadline = get_deadline()
+            while pending or running:
+                # Start (or skip) every step whose dependencies are all done
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for step_id in [s for s, deps in pending.items() if deps.issubset(results)]:
+                        deps = pending.pop(step_id)
+                        step = steps[step_id]
+                        failed = [dep for dep in deps if not results[dep].success]
+                        if failed:
+                            results[step_id] = self._failed_response(
+                                step, f"Skipped: dependency '{failed[0]}' failed")
+                            progressed = True
+                            continue
+                        step_timeout = step.get("timeout", self._agent_timeout(step.get("agent")))
+                        future = submit_with_context(self.executor, self._run_step, step, step_timeout, context)
+                        running[future] = (step_id, time.monotonic() + step_timeout if step_timeout else None)
+                
+                if not running:
+                    break
+                
+                # Wake up for the first completion or the nearest step/workflow deadline
+                deadlines = [d for _, d in running.values() if d is not None] + [deadline]
+                done, _ = wait(running, timeout=max(0.0, min(deadlines) - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                
+                now = time.monotonic()
+                for future, (step_id, step_deadline) in list(running.items()):
+                    if future.done():
+                        try:
+                            results[step_id] = future.result()
+                        except Exception as e:
+                            results[step_id] = self._failed_response(steps[step_id], str(e))
+                    elif now >= deadline or (step_deadline is not None and now >= step_deadline):
+                        # The thread can't be interrupted; it sees the expired deadline at its next check
+                        if not future.cancel():
+                            self._abandon(future)
+                        results[step_id] = self._failed_response(steps[step_id], "Timed out")
+                    else:
+                        continue
+                    del running[future]
+                
+                if now >= deadline:
+                    for step_id in pending:
+                        results[step_id] = self._failed_response(
+                            steps[step_id], "Cancelled: workflow deadline exceeded")
+                    pending.clear()
+        
+        if context is not None:
+            # Published after every step's events; subscribers must not rely on it, as a full bus drops events
+            self.event_bus.publish(AgentEvent(EventType.WORKFLOW_COMPLETED, "orchestrator", {
+                "session_id": context.get_session_id(),
+                "success": all(response.success for response in results.values())
+            }))
+        
+        return {step_id: results[step_id] for step_id in steps}
+    
+    def _abandon(self, future) -> None:
+        """Track a timed-out step's thread until it notices its deadline and returns."""
+        with self._abandoned_lock:
+            self._abandoned.add(future)
+            self.abandoned_steps += 1
+        
+        def finished(done) -> None:
+            with self._abandoned_lock:
+                self._abandoned.discard(done)
+        
+        future.add_done_callback(finished)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get counters for steps abandoned after timing out."""
+        with self._abandoned_lock:
+            return {
+                "abandoned_steps": self.abandoned_steps,
+                "abandoned_still_running": len(self._abandoned)
+            }
+    
+    def _run_step(self, step: Dict[str, Any], timeout: Optional[float],
+                  context: Optional[ContextManager]) -> AgentResponse:
+        """Run one workflow step under its own (tighter) deadline."""
+        with deadline_scope(timeout):
+            return self.delegate(
+                step.get("agent"),
+                step.get("task"),
+                step.get("input_data", {}),
+                step.get("context_keys"),
+                step.get("output_keys"),
+                context
+            )
+    
+    def _agent_timeout(self, agent_name: str) -> Optional[float]:
+        """Default step timeout for an agent, if it sets one."""
+        return getattr(self.agent_registry.get(agent_name), "timeout", None)
+    
+    def _failed_response(self, step: Dict[str, Any], error: str) -> AgentResponse:
+        """Failed response for a step that didn't run or didn't finish."""
+        return AgentResponse(
+            request_id="",
+            agent_name=step.get("agent", ""),
+            task=step.get("task", ""),
+            success=False,
+            error=error
+        )
     
-    def execute_parallel(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _workflow_dependencies(self, steps: Dict[str, Dict[str, Any]]) -> Dict[str, set]:
+        """Map each step id to the ids of the steps it has to wait for."""
+        dependencies = {}
+        earlier = []
+        for step_id, step in steps.items():
+            reads = set(step.get("context_keys") or [])
+            deps = {
+                producer for producer in earlier
+                if reads & set(steps[producer].get("output_keys") or [])
+            }
+            for dep in step.get("depends_on", []):
+                if dep not in earlier:
+                    raise ValueError(f"Workflow step '{step_id}' depends on unknown or later step '{dep}'")
+                deps.add(dep)
+            dependencies[step_id] = deps
+            earlier.append(step_id)
+        return dependencies
+    
+    def execute_parallel(self, tasks: List[Dict[str, Any]],
+                         context: Optional[ContextManager] = None) -> Dict[str, Any]:
         """Execute multiple agent tasks in parallel."""
         futures = {}
         results = {}
@@ -80,14 +239,16 @@ class Orchestrator:
             context_keys = task_config.get("context_keys")
             output_keys = task_config.get("output_keys")
             
-            # Submit task to executor
-            future = self.executor.submit(
+            # Submit task to executor, carrying the caller's deadline along
+            future = submit_with_context(
+                self.executor,
                 self.delegate,
                 agent_name,
                 task,
                 input_data,
                 context_keys,
-                output_keys
+                output_keys,
+                context
             )
             futures[future] = f"{agent_name}_{task}"
         
@@ -108,117 +269,181 @@ class Orchestrator:
         
         return results
     
-    def get_player_insights_workflow(self, matches: List[Dict], puuid: str, player_matches: List[Dict]) -> Dict[str, Any]:
-        """Get workflow for player insights generation."""
-        # Clear context for new workflow
-        self.context_manager.clear()
+    def get_player_insights_workflow(self, matches: Union[List[Dict], PlayerGames], puuid: str,
+                                     player_matches: List[Dict],
+                                     context: Optional[ContextManager] = None) -> Dict[str, Any]:
+        """
+        Get workflow for player insights generation.
         
-        # Store initial data in context
-        self.context_manager.set("matches", matches)
-        self.context_manager.set("puuid", puuid)
-        self.context_manager.set("player_matches", player_matches)
+        To receive results while the workflow runs, pass a fresh context with
+        a result listener (ContextManager.add_result_listener). Each agent
+        calls it on its worker thread with the full result (a chart, or a
+        whole agent result) as soon as that is ready. RESULT_READY events
+        on the bus only announce results; they carry no payload.
+        """
+        # Each workflow gets its own context so concurrent requests don't share keys
+        context = context or ContextManager()
         
-        # Execute sequential workflow
-        # Step 1: Match Analysis
-        match_analysis_response = self.delegate(
-            "match_analysis",
-            "analyze_matches",
-            {"matches": matches, "puuid": puuid},
-            output_keys=["match_analysis", "match_count", "puuid"]
-        )
+        # Extract the player's columns once; every agent below reuses the same table
+        games = PlayerGames.ensure(matches, puuid)
         
-        if not match_analysis_response.success:
-            return {"error": "Match analysis failed", "details": match_analysis_response.error}
+        # Store initial data in context
+        context.set("matches", matches)
+        context.set("puuid", puuid)
+        context.set("player_matches", player_matches)
         
-        # Step 2: Insights Generation (depends on match analysis)
-        insights_response = self.delegate(
-            "insights_generation",
-            "generate_insights",
-            {"player_matches": player_matches},
-            context_keys=["match_analysis"],
-            output_keys=["insights", "strengths", "weaknesses", "unexpected_insights", "recommendations"]
-        )
+        # Insights and visualization both only need the match analysis, so they run concurrently
+        results = self.execute_workflow([
+            {
+                "id": "match_analysis",
+                "agent": "match_analysis",
+                "task": "analyze_matches",
+                "input_data": {"matches": games, "puuid": puuid},
+                "output_keys": ["match_analysis", "match_count", "puuid"]
+            },
+            {
+                "id": "insights",
+                "agent": "insights_generation",
+                "task": "generate_insights",
+                "input_data": {"player_matches": player_matches},
+                "context_keys": ["match_analysis"],
+                "output_keys": ["insights", "strengths", "weaknesses", "unexpected_insights", "recommendations"]
+            },
+            {
+                "id": "visualization",
+                "agent": "visualization",
+                "task": "generate_visualizations",
+                "input_data": {"matches": games, "puuid": puuid},
+                "context_keys": ["match_analysis"],
+                "output_keys": ["visualizations"]
+            }
+        ], context)
         
-        # Step 3: Visualization (can run in parallel with insights, but we'll do it sequentially for now)
-        viz_response = self.delegate(
-            "visualization",
-            "generate_visualizations",
-            {"matches": matches, "puuid": puuid},
-            context_keys=["match_analysis"],
-            output_keys=["visualizations"]
-        )
+        if not results["match_analysis"].success:
+            return {"error": "Match analysis failed", "details": results["match_analysis"].error}
         
         # Aggregate results
-        match_analysis = self.context_manager.get("match_analysis", {})
-        insights = self.context_manager.get("insights", {})
-        visualizations = self.context_manager.get("visualizations", {})
+        match_analysis = context.get("match_analysis", {})
+        insights = context.get("insights", {})
+        visualizations = context.get("visualizations", {})
         
         return {
             "success": True,
             "match_analysis": match_analysis,
             "insights": insights,
             "visualizations": visualizations,
-            "key_metrics": match_analysis.get("key_metrics", {})
+            "key_metrics": match_analysis.get("key_metrics", {}),
+            # Insights or charts missing because a step failed or ran out of time
+            "partial": not all(response.success for response in results.values())
         }
     
-    def get_year_summary_workflow(self, matches: List[Dict], puuid: str, year: int) -> Dict[str, Any]:
+    def get_year_summary_workflow(self, matches: Union[List[Dict], PlayerGames], puuid: str,
+                                  year: int) -> Dict[str, Any]:
         """Get workflow for year-end summary generation."""
-        # Clear context for new workflow
-        self.context_manager.clear()
+        context = ContextManager()
+        
+        games = PlayerGames.ensure(matches, puuid)
         
         # Store initial data
-        self.context_manager.set("matches", matches)
-        self.context_manager.set("puuid", puuid)
-        self.context_manager.set("year", year)
+        context.set("matches", matches)
+        context.set("puuid", puuid)
+        context.set("year", year)
         
-        # Execute year summary agent
-        response = self.delegate(
-            "year_summary",
-            "generate_year_summary",
-            {"matches": matches, "puuid": puuid, "year": year},
-            output_keys=["year_summary", "year", "ai_summary"]
-        )
+        results = self.execute_workflow([
+            {
+                "id": "year_summary",
+                "agent": "year_summary",
+                "task": "generate_year_summary",
+                "input_data": {"matches": games, "puuid": puuid, "year": year},
+                "output_keys": ["year_summary", "year", "ai_summary"]
+            },
+            {
+                "id": "social_content",
+                "agent": "social_content",
+                "task": "generate_content",
+                "input_data": {"content_type": "year-end"},
+                "context_keys": ["year_summary"],
+                "output_keys": ["social_content", "content_type"]
+            }
+        ], context)
         
-        if not response.success:
-            return {"error": "Year summary generation failed", "details": response.error}
-        
-        # Get social content
-        social_response = self.delegate(
-            "social_content",
-            "generate_content",
-            {"content_type": "year-end"},
-            context_keys=["year_summary"],
-            output_keys=["social_content", "content_type"]
-        )
+        if not results["year_summary"].success:
+            return {"error": "Year summary generation failed", "details": results["year_summary"].error}
         
         # Aggregate results
-        year_summary = self.context_manager.get("year_summary", {})
-        ai_summary = self.context_manager.get("ai_summary", "")
-        social_content = self.context_manager.get("social_content", {})
+        year_summary = context.get("year_summary", {})
+        ai_summary = context.get("ai_summary", "")
+        social_content = context.get("social_content", {})
         
         return {
             "success": True,
             "year_summary": year_summary,
             "ai_summary": ai_summary,
-            "social_content": social_content
+            "social_content": social_content,
+            "partial": not results["social_content"].success
         }
     
-    def get_comparison_workflow(self, player1_data: Dict, player2_data: Dict) -> Dict[str, Any]:
-        """Get workflow for player comparison."""
-        # Clear context for new workflow
-        self.context_manager.clear()
+    def get_player_analysis(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> Dict[str, Any]:
+        """
+        Get one player's match analysis.
         
+        Goes through the match analysis agent in a context of its own, so a
+        result cached for the same player and match IDs (e.g. by an insights
+        request) is reused instead of recomputed.
+        """
+        games = PlayerGames.ensure(matches, puuid)
         response = self.delegate(
-            "player_comparison",
-            "compare_players",
-            {"player1": player1_data, "player2": player2_data},
-            output_keys=["comparison"]
+            "match_analysis",
+            "analyze_matches",
+            {"matches": games, "puuid": puuid},
+            context=ContextManager()
         )
         
+        if not response.success:
+            return {"error": "Match analysis failed", "details": response.error}
+        
+        return response.result.get("analysis", {})
+    
+    def get_comparison_workflow(self, player1_data: Dict, player2_data: Dict) -> Dict[str, Any]:
+        """
+        Get workflow for player comparison.
+        
+        Each player's data needs "name", "puuid" and "matches", and may carry a
+        precomputed "analysis". Missing analyses are produced for both players
+        concurrently before the comparison runs.
+        """
+        context = ContextManager()
+        
+        with deadline_scope(settings.workflow_timeout):
+            players = [player1_data, player2_data]
+            pending = {
+                index: submit_with_context(self.executor, self.get_player_analysis, data.get("matches", []), data.get("puuid"))
+                for index, data in enumerate(players)
+                if "analysis" not in data
+            }
+            for index, future in pending.items():
+                try:
+                    analysis = future.result(timeout=remaining())
+                except FutureTimeoutError:
+                    for other in pending.values():
+                        other.cancel()
+                    return {"error": "Player comparison failed", "details": "Timed out analyzing players"}
+                if "error" in analysis:
+                    return {"error": "Player comparison failed", "details": analysis.get("details")}
+                players[index] = {**players[index], "analysis": analysis}
+            
+            response = self.delegate(
+                "player_comparison",
+                "compare_players",
+                {"player1": players[0], "player2": players[1]},
+                output_keys=["comparison"],
+                context=context
+            )
+        
         if not response.success:
             return {"error": "Player comparison failed", "details": response.error}
         
-        comparison = self.context_manager.get("comparison", {})
+        comparison = context.get("comparison", {})
         
         return {
             "success": True,
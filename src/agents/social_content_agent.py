@@ -23,9 +23,10 @@ class SocialContentAgent(BaseAgent):
         try:
             content_type = request.input_data.get("content_type", "year-end")
             
-            # Get insights from context
-            insights = self.context_manager.get("insights", {})
-            year_summary = self.context_manager.get("year_summary")
+            # Get insights from input or the request's context
+            context = self.context_for(request)
+            insights = request.input_data.get("insights") or context.get("insights", {})
+            year_summary = request.input_data.get("year_summary") or context.get("year_summary")
             
             if content_type == "year-end" and year_summary:
                 # Generate year-end card
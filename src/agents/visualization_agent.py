@@ -4,15 +4,18 @@ Visualization Agent - Creates charts and visualizations.
 from typing import Dict, Any
 from src.agents.base_agent import BaseAgent
 from src.agents.messages import AgentRequest, AgentResponse, create_response
+from src.services.deadline import check_deadline
 from src.generators.visualizations import VisualizationGenerator
 
 
 class VisualizationAgent(BaseAgent):
     """Agent specialized in creating visualizations."""
     
-    def __init__(self, context_manager, event_bus=None):
+    cacheable_tasks = ("generate_visualizations",)
+    
+    def __init__(self, context_manager, event_bus=None, viz_generator=None):
         super().__init__("visualization", context_manager, event_bus)
-        self.viz_generator = VisualizationGenerator()
+        self.viz_generator = viz_generator or VisualizationGenerator()
     
     def _setup(self) -> None:
         """Setup visualization agent."""
@@ -27,16 +30,17 @@ class VisualizationAgent(BaseAgent):
             match_analysis = request.input_data.get("match_analysis")
             
             # Try to get from context if not in input
+            context = self.context_for(request)
             if not matches:
-                matches = self.context_manager.get("matches", [])
+                matches = context.get("matches", [])
             if not puuid:
-                puuid = self.context_manager.get("puuid")
+                puuid = context.get("puuid")
             if not match_analysis:
-                match_analysis = self.context_manager.get("match_analysis", {})
+                match_analysis = context.get("match_analysis", {})
             
             # If still missing, try to get from context keys
             if request.context_keys:
-                context_data = self.read_from_context(request.context_keys)
+                context_data = self.read_from_context(request.context_keys, context)
                 if not matches and "matches" in context_data:
                     matches = context_data["matches"]
                 if not puuid and "puuid" in context_data:
@@ -51,46 +55,34 @@ class VisualizationAgent(BaseAgent):
                     error="Missing required input: matches or puuid"
                 )
             
-            # Generate visualizations
+            # Generate visualizations; each chart is published as soon as it is ready so it can be streamed
+            champion_stats = match_analysis.get("champion_stats", {})
+            role_stats = match_analysis.get("role_stats", {})
+            charts = [
+                ("win_rate_chart", "win rate chart", lambda: self.viz_generator.generate_win_rate_chart(matches, puuid)),
+                ("kda_trend", "KDA trend", lambda: self.viz_generator.generate_kda_trend(matches, puuid)),
+                ("champion_performance", "champion performance",
+                 lambda: self.viz_generator.generate_champion_performance(champion_stats)),
+                ("role_performance", "role performance",
+                 lambda: self.viz_generator.generate_role_performance(role_stats)),
+                ("phase_heatmap", "phase performance heatmap",
+                 lambda: self.viz_generator.generate_phase_performance_heatmap(matches, puuid)),
+                ("win_rate_trend", "win rate trend line",
+                 lambda: self.viz_generator.generate_win_rate_trend_line(matches, puuid)),
+                ("champion_radar", "champion radar chart",
+                 lambda: self.viz_generator.generate_champion_radar_chart(matches, puuid)),
+            ]
             visualizations = {}
-            
-            try:
-                visualizations["win_rate_chart"] = self.viz_generator.generate_win_rate_chart(matches, puuid)
-            except Exception as e:
-                print(f"Error generating win rate chart: {e}")
-            
-            try:
-                visualizations["kda_trend"] = self.viz_generator.generate_kda_trend(matches, puuid)
-            except Exception as e:
-                print(f"Error generating KDA trend: {e}")
-            
-            try:
-                champion_stats = match_analysis.get("champion_stats", {})
-                visualizations["champion_performance"] = self.viz_generator.generate_champion_performance(champion_stats)
-            except Exception as e:
-                print(f"Error generating champion performance: {e}")
-            
-            try:
-                role_stats = match_analysis.get("role_stats", {})
-                visualizations["role_performance"] = self.viz_generator.generate_role_performance(role_stats)
-            except Exception as e:
-                print(f"Error generating role performance: {e}")
-            
-            # Generate new visualizations
-            try:
-                visualizations["phase_heatmap"] = self.viz_generator.generate_phase_performance_heatmap(matches, puuid)
-            except Exception as e:
-                print(f"Error generating phase performance heatmap: {e}")
-            
-            try:
-                visualizations["win_rate_trend"] = self.viz_generator.generate_win_rate_trend_line(matches, puuid)
-            except Exception as e:
-                print(f"Error generating win rate trend line: {e}")
-            
-            try:
-                visualizations["champion_radar"] = self.viz_generator.generate_champion_radar_chart(matches, puuid)
-            except Exception as e:
-                print(f"Error generating champion radar chart: {e}")
+            for name, label, generate in charts:
+                # Stop a timed-out step here instead of rendering charts nobody will receive
+                check_deadline(f"generating the {label}")
+                try:
+                    visualizations[name] = generate()
+                except Exception as e:
+                    print(f"Error generating {label}: {e}")
+                    continue
+                self.publish_result(request, {"chart": name, "visualization": visualizations[name]},
+                                    {"chart": name})
             
             # Prepare context updates
             context_updates = {
@@ -2,6 +2,7 @@
 Year-End Summary Agent - Creates comprehensive year-end retrospectives.
 """
 from typing import Dict, Any
+from config.settings import settings
 from src.agents.base_agent import BaseAgent
 from src.agents.messages import AgentRequest, AgentResponse, create_response
 from src.analyzers.year_summary import YearSummaryGenerator
@@ -11,10 +12,13 @@ from src.services.aws_bedrock import BedrockService
 class YearSummaryAgent(BaseAgent):
     """Agent specialized in generating year-end summaries."""
     
-    def __init__(self, context_manager, event_bus=None):
+    cacheable_tasks = ("generate_year_summary",)
+    
+    def __init__(self, context_manager, event_bus=None, bedrock_service=None):
         super().__init__("year_summary", context_manager, event_bus)
         self.year_summary_gen = YearSummaryGenerator()
-        self.bedrock_service = BedrockService()
+        self.bedrock_service = bedrock_service or BedrockService()
+        self.timeout = settings.llm_agent_timeout
     
     def _setup(self) -> None:
         """Setup year-end summary agent."""
@@ -1,5 +1,6 @@
 """Match data analysis modules."""
 from .rank_comparison import RankComparisonAnalyzer
+from .player_games import PlayerGames
 
-__all__ = ['MatchAnalyzer', 'YearSummaryGenerator', 'RankComparisonAnalyzer']
+__all__ = ['MatchAnalyzer', 'YearSummaryGenerator', 'RankComparisonAnalyzer', 'PlayerGames']
 
@@ -0,0 +1,150 @@
+"""
+Mergeable partial aggregates for match analysis.
+
+An AnalysisState holds everything MatchAnalyzer needs to produce its result
+(counts, sums, sums of squares and maxima, overall and per champion/role,
+plus the ten most recent games and the newest perfect games). Two states
+merge without looking at the underlying games again, so per-period states
+can be rolled up into coarser periods or a whole year.
+"""
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from src.analyzers.player_games import PlayerGames
+
+
+# Summed columns, per game: count, wins, KDA and damage with their squares, gold, vision, CS
+SUM_COLUMNS = ("games", "wins", "kda", "kda_sq", "damage", "damage_sq", "gold", "vision", "cs")
+# Maximum columns
+MAX_COLUMNS = ("kda", "damage")
+
+RECENT_WINDOW = 10
+MAX_PERFECT_GAMES = 5
+
+
+class AnalysisState:
+    """Partial aggregates of a player's games that merge associatively."""
+
+    def __init__(self):
+        self.totals = np.zeros(len(SUM_COLUMNS))
+        self.maxima = np.zeros(len(MAX_COLUMNS))
+        # Group name -> (sums, maxima), in order of first appearance
+        self.champions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.roles: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # The most recent games, oldest first, for the recent-form trend
+        self.recent_timestamps = np.zeros(0, dtype=np.int64)
+        self.recent_kda = np.zeros(0)
+        self.recent_win = np.zeros(0, dtype=bool)
+        # Newest perfect (deathless, with kills) games first: match_id, kills, assists, timestamp
+        self.perfect_games: List[Dict] = []
+
+    @classmethod
+    def from_games(cls, games: PlayerGames) -> "AnalysisState":
+        """Aggregate a PlayerGames table in one vectorized pass."""
+        state = cls()
+        if not len(games):
+            return state
+
+        kda = games.kda
+        damage = games.damage.astype(np.float64)
+        values = np.column_stack([
+            np.ones(len(games)), games.win, kda, kda ** 2, damage, damage ** 2, games.gold, games.vision, games.cs
+        ])
+        peaks = np.column_stack([kda, damage])
+
+        state.totals = values.sum(axis=0)
+        state.maxima = peaks.max(axis=0)
+        state.champions = _group(games.champion_codes, games.champions, values, peaks)
+        state.roles = _group(games.role_codes, games.roles, values, peaks)
+
+        recent = games.time_order()[-RECENT_WINDOW:]
+        state.recent_timestamps = games.timestamp[recent]
+        state.recent_kda = kda[recent]
+        state.recent_win = games.win[recent]
+
+        perfect = np.flatnonzero((games.deaths == 0) & (games.kills > 0))
+        for i in perfect[np.argsort(-games.timestamp[perfect], kind="stable")][:MAX_PERFECT_GAMES]:
+            state.perfect_games.append({
+                "match_id": games.match_ids[i],
+                "kills": int(games.kills[i]),
+                "assists": int(games.assists[i]),
+                "timestamp": int(games.timestamp[i])
+            })
+        return state
+
+    @classmethod
+    def merge_all(cls, states: Iterable["AnalysisState"]) -> "AnalysisState":
+        """Merge states in order, e.g. consecutive periods oldest first."""
+        merged = cls()
+        for state in states:
+            merged = merged.merge(state)
+        return merged
+
+    def merge(self, other: "AnalysisState") -> "AnalysisState":
+        """Combine with another state into a new one; neither input is modified."""
+        merged = AnalysisState()
+        merged.totals = self.totals + other.totals
+        merged.maxima = np.maximum(self.maxima, other.maxima)
+        merged.champions = _merge_groups(self.champions, other.champions)
+        merged.roles = _merge_groups(self.roles, other.roles)
+
+        timestamps = np.concatenate([self.recent_timestamps, other.recent_timestamps])
+        recent = np.argsort(timestamps, kind="stable")[-RECENT_WINDOW:]
+        merged.recent_timestamps = timestamps[recent]
+        merged.recent_kda = np.concatenate([self.recent_kda, other.recent_kda])[recent]
+        merged.recent_win = np.concatenate([self.recent_win, other.recent_win])[recent]
+
+        # Newest first whatever order the states are merged in, as from_games keeps them
+        merged.perfect_games = sorted(self.perfect_games + other.perfect_games,
+                                      key=lambda game: -game["timestamp"])[:MAX_PERFECT_GAMES]
+        return merged
+
+    @property
+    def games(self) -> int:
+        """Number of games aggregated."""
+        return int(self.totals[SUM_COLUMNS.index("games")])
+
+    def total(self, column: str) -> float:
+        """Overall sum of a column."""
+        return float(self.totals[SUM_COLUMNS.index(column)])
+
+    def best(self, column: str) -> float:
+        """Overall maximum of a column."""
+        return float(self.maxima[MAX_COLUMNS.index(column)])
+
+    def variance(self, column: str) -> float:
+        """Sample variance of a column with a squares sum (kda or damage)."""
+        n = self.games
+        if n < 2:
+            return 0.0
+        mean = self.total(column) / n
+        return max(0.0, (self.total(f"{column}_sq") - n * mean * mean) / (n - 1))
+
+
+def _group(codes: np.ndarray, names: List[str], values: np.ndarray,
+           peaks: np.ndarray) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Per-group sums and maxima keyed by name, in order of first appearance."""
+    size = len(names)
+    sums = np.column_stack([np.bincount(codes, weights=values[:, j], minlength=size) for j in range(values.shape[1])])
+    maxima = np.zeros((size, peaks.shape[1]))
+    np.maximum.at(maxima, codes, peaks)
+
+    first_seen = np.full(size, len(codes))
+    np.minimum.at(first_seen, codes, np.arange(len(codes)))
+
+    return {
+        names[code]: (sums[code], maxima[code])
+        for code in np.argsort(first_seen, kind="stable")
+        if sums[code][0] > 0
+    }
+
+
+def _merge_groups(left: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                  right: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Merge per-group aggregates, keeping left's order and appending new groups from right."""
+    merged = dict(left)
+    for name, (sums, maxima) in right.items():
+        if name in merged:
+            merged[name] = (merged[name][0] + sums, np.maximum(merged[name][1], maxima))
+        else:
+            merged[name] = (sums, maxima)
+    return merged
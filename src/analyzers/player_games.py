@@ -0,0 +1,157 @@
+"""
+Columnar per-player match table.
+
+Every analyzer and generator needs the same handful of fields from the
+player's participant entry. PlayerGames finds that entry once per match and
+keeps the fields as NumPy columns, so analysis code works on arrays instead of
+re-scanning ten participants and nested dicts per match.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+
+
+# Column name -> participant field, for plain numeric fields
+PARTICIPANT_COLUMNS = {
+    "kills": "kills",
+    "deaths": "deaths",
+    "assists": "assists",
+    "damage": "totalDamageDealtToChampions",
+    "gold": "goldEarned",
+    "vision": "visionScore",
+    "dragon_kills": "dragonKills",
+    "baron_kills": "baronKills",
+    "turret_damage": "damageDealtToTurrets",
+}
+
+
+class PlayerGames:
+    """One player's games as NumPy columns, one row per match the player appears in."""
+
+    def __init__(self, puuid: str, columns: Dict[str, np.ndarray], champions: List[str], roles: List[str],
+                 match_ids: np.ndarray, participants: List[Dict]):
+        self.puuid = puuid
+        self.kills = columns["kills"]
+        self.deaths = columns["deaths"]
+        self.assists = columns["assists"]
+        self.damage = columns["damage"]
+        self.gold = columns["gold"]
+        self.vision = columns["vision"]
+        self.dragon_kills = columns["dragon_kills"]
+        self.baron_kills = columns["baron_kills"]
+        self.turret_damage = columns["turret_damage"]
+        self.cs = columns["cs"]
+        self.team_kills = columns["team_kills"]
+        self.duration = columns["duration"]  # seconds
+        self.timestamp = columns["timestamp"]  # gameCreation, epoch milliseconds
+        self.win = columns["win"]
+        self.first_blood = columns["first_blood"]
+        self.champion_codes = columns["champion_codes"]
+        self.role_codes = columns["role_codes"]
+        # Code -> name lookups, shared by every subset taken from this table
+        self.champions = champions
+        self.roles = roles
+        self.match_ids = match_ids
+        # The player's raw participant entries, for callers that need fields not extracted here
+        self.participants = participants
+        self._kda: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_matches(cls, matches: List[Dict], puuid: str) -> "PlayerGames":
+        """Extract the player's columns from raw match-v5 payloads in a single pass."""
+        values = {name: [] for name in PARTICIPANT_COLUMNS}
+        cs, team_kills, duration, timestamp, win, first_blood = [], [], [], [], [], []
+        champion_codes, role_codes, match_ids, participants = [], [], [], []
+        champion_index: Dict[str, int] = {}
+        role_index: Dict[str, int] = {}
+
+        for match in matches:
+            info = match.get("info", {})
+            match_participants = info.get("participants", [])
+            player = None
+            for participant in match_participants:
+                if participant.get("puuid") == puuid:
+                    player = participant
+                    break
+            if player is None:
+                continue
+
+            for name, field in PARTICIPANT_COLUMNS.items():
+                values[name].append(player.get(field) or 0)
+            cs.append((player.get("totalMinionsKilled") or 0) + (player.get("neutralMinionsKilled") or 0))
+            team_id = player.get("teamId", 0)
+            team_kills.append(sum(p.get("kills") or 0 for p in match_participants if p.get("teamId") == team_id))
+            duration.append(info.get("gameDuration") or 0)
+            timestamp.append(info.get("gameCreation") or 0)
+            win.append(bool(player.get("win", False)))
+            first_blood.append(bool(player.get("firstBloodKill", False) or player.get("firstBloodAssist", False)))
+            champion_codes.append(champion_index.setdefault(player.get("championName", "Unknown"), len(champion_index)))
+            role_codes.append(role_index.setdefault(player.get("teamPosition", "UNKNOWN"), len(role_index)))
+            match_ids.append(match.get("metadata", {}).get("matchId", "unknown"))
+            participants.append(player)
+
+        columns = {name: np.array(column, dtype=np.int64) for name, column in values.items()}
+        columns.update({
+            "cs": np.array(cs, dtype=np.int64),
+            "team_kills": np.array(team_kills, dtype=np.int64),
+            "duration": np.array(duration, dtype=np.int64),
+            "timestamp": np.array(timestamp, dtype=np.int64),
+            "win": np.array(win, dtype=bool),
+            "first_blood": np.array(first_blood, dtype=bool),
+            "champion_codes": np.array(champion_codes, dtype=np.int32),
+            "role_codes": np.array(role_codes, dtype=np.int32),
+        })
+        return cls(puuid, columns, list(champion_index), list(role_index),
+                   np.array(match_ids, dtype=object), participants)
+
+    @classmethod
+    def ensure(cls, matches: Union[List[Dict], "PlayerGames"], puuid: Optional[str] = None) -> "PlayerGames":
+        """Return matches unchanged if it is already a PlayerGames table, otherwise build one."""
+        if isinstance(matches, PlayerGames):
+            if puuid is not None and matches.puuid != puuid:
+                raise ValueError("PlayerGames table was built for a different player")
+            return matches
+        return cls.from_matches(matches or [], puuid)
+
+    def __len__(self) -> int:
+        return len(self.kills)
+
+    @property
+    def kda(self) -> np.ndarray:
+        """Per-game KDA ratio, (kills + assists) / max(deaths, 1)."""
+        if self._kda is None:
+            self._kda = (self.kills + self.assists) / np.maximum(self.deaths, 1)
+        return self._kda
+
+    @property
+    def champion_names(self) -> np.ndarray:
+        """Per-game champion name."""
+        return np.array(self.champions, dtype=object)[self.champion_codes] if len(self) else np.array([], dtype=object)
+
+    @property
+    def role_names(self) -> np.ndarray:
+        """Per-game teamPosition."""
+        return np.array(self.roles, dtype=object)[self.role_codes] if len(self) else np.array([], dtype=object)
+
+    def time_order(self, descending: bool = False) -> np.ndarray:
+        """Row indices ordered by gameCreation; ties keep their original order."""
+        return np.argsort(-self.timestamp if descending else self.timestamp, kind="stable")
+
+    def take(self, index: np.ndarray) -> "PlayerGames":
+        """Subset of rows by boolean mask or integer indices, sharing the code lookups."""
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        columns = {
+            name: getattr(self, name)[index]
+            for name in list(PARTICIPANT_COLUMNS) + ["cs", "team_kills", "duration", "timestamp", "win",
+                                                     "first_blood", "champion_codes", "role_codes"]
+        }
+        return PlayerGames(self.puuid, columns, self.champions, self.roles, self.match_ids[index],
+                           [self.participants[i] for i in index])
+
+    def group_by(self, codes: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """Group rows by a code column, as (code, row indices) in order of first appearance."""
+        if len(codes) == 0:
+            return []
+        unique, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        return [(int(unique[i]), np.flatnonzero(inverse == i)) for i in np.argsort(first)]
@@ -1,44 +1,34 @@
 """
 Analyze player playstyles for social comparisons and complement detection.
 """
-from typing import Dict, List, Optional
-from collections import defaultdict, Counter
-import statistics
-from src.analyzers.match_analyzer import MatchAnalyzer
+from typing import Dict, List, Optional, Union
+from collections import Counter
+import numpy as np
+from src.analyzers.player_games import PlayerGames
 
 
 class PlaystyleAnalyzer:
     """Analyzes player playstyles for comparison and complement detection."""
     
-    def __init__(self):
-        self.match_analyzer = MatchAnalyzer()
-    
-    def analyze_playstyle(self, matches: List[Dict], puuid: str) -> Dict:
+    def analyze_playstyle(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> Dict:
         """
         Analyze a player's playstyle characteristics.
         
         Returns:
             Dict with playstyle attributes, preferences, and characteristics
         """
-        player_matches = []
-        for match in matches:
-            player_data = self.match_analyzer._extract_player_data(match, puuid)
-            if player_data:
-                player_matches.append({
-                    "match": match,
-                    "player": player_data
-                })
+        games = PlayerGames.ensure(matches, puuid)
         
-        if not player_matches:
+        if not len(games):
             return {}
         
         # Analyze playstyle dimensions
-        aggression = self._analyze_aggression(player_matches)
-        objective_focus = self._analyze_objective_focus(player_matches)
-        team_play = self._analyze_team_play(player_matches)
-        scaling = self._analyze_scaling_preference(player_matches)
-        role_preference = self._analyze_role_preference(player_matches)
-        champion_diversity = self._analyze_champion_diversity(player_matches)
+        aggression = self._analyze_aggression(games)
+        objective_focus = self._analyze_objective_focus(games)
+        team_play = self._analyze_team_play(games)
+        scaling = self._analyze_scaling_preference(games)
+        role_preference = self._analyze_role_preference(games)
+        champion_diversity = self._analyze_champion_diversity(games)
         
         # Identify playstyle archetype
         archetype = self._identify_archetype(
@@ -51,7 +41,7 @@ class PlaystyleAnalyzer:
             "objective_focus": objective_focus["score"],
             "team_play": team_play["score"],
             "scaling": scaling["score"],
-            "consistency": self._calculate_consistency(player_matches)
+            "consistency": self._calculate_consistency(games)
         }
         
         return {
@@ -72,43 +62,18 @@ class PlaystyleAnalyzer:
             "preferred_teammates": self._suggest_teammate_types(playstyle_vector)
         }
     
-    def _analyze_aggression(self, player_matches: List[Dict]) -> Dict:
+    def _analyze_aggression(self, games: PlayerGames) -> Dict:
         """Analyze player aggression level."""
-        kill_participation_rates = []
-        early_kills = []
-        deaths = []
-        
-        for match_data in player_matches:
-            player = match_data["player"]
-            team_id = player.get("teamId", 0)
-            
-            # Calculate kill participation
-            kills = player.get("kills", 0)
-            assists = player.get("assists", 0)
-            
-            # Get team total kills
-            team_kills = 0
-            participants = match_data["match"].get("info", {}).get("participants", [])
-            for p in participants:
-                if p.get("teamId") == team_id:
-                    team_kills += p.get("kills", 0)
-            
-            if team_kills > 0:
-                kp = ((kills + assists) / team_kills) * 100
-                kill_participation_rates.append(kp)
-            
-            # Early game aggression (first 15 minutes proxy - using first blood)
-            first_blood = player.get("firstBloodKill", False) or player.get("firstBloodAssist", False)
-            if first_blood:
-                early_kills.append(1)
-            else:
-                early_kills.append(0)
-            
-            deaths.append(player.get("deaths", 0))
+        # Kill participation, only for games where the team got kills
+        has_team_kills = games.team_kills > 0
+        kill_participation_rates = (
+            (games.kills + games.assists)[has_team_kills] / games.team_kills[has_team_kills] * 100
+        )
         
-        avg_kp = statistics.mean(kill_participation_rates) if kill_participation_rates else 50
-        early_aggro = statistics.mean(early_kills) * 100 if early_kills else 0
-        avg_deaths = statistics.mean(deaths) if deaths else 5
+        avg_kp = float(kill_participation_rates.mean()) if len(kill_participation_rates) else 50
+        # Early game aggression (first 15 minutes proxy - using first blood)
+        early_aggro = float(games.first_blood.mean() * 100) if len(games) else 0
+        avg_deaths = float(games.deaths.mean()) if len(games) else 5
         
         # Score: 0-100 (higher = more aggressive)
         # High KP, high early aggression, moderate deaths = aggressive
@@ -127,22 +92,11 @@ class PlaystyleAnalyzer:
             "level": "aggressive" if score > 60 else "passive" if score < 40 else "balanced"
         }
     
-    def _analyze_objective_focus(self, player_matches: List[Dict]) -> Dict:
+    def _analyze_objective_focus(self, games: PlayerGames) -> Dict:
         """Analyze player's focus on objectives."""
-        dragon_kills = []
-        baron_kills = []
-        turret_damage = []
-        
-        for match_data in player_matches:
-            player = match_data["player"]
-            
-            dragon_kills.append(player.get("dragonKills", 0))
-            baron_kills.append(player.get("baronKills", 0))
-            turret_damage.append(player.get("damageDealtToTurrets", 0))
-        
-        avg_dragons = statistics.mean(dragon_kills) if dragon_kills else 0
-        avg_barons = statistics.mean(baron_kills) if baron_kills else 0
-        avg_turret_damage = statistics.mean(turret_damage) if turret_damage else 0
+        avg_dragons = float(games.dragon_kills.mean()) if len(games) else 0
+        avg_barons = float(games.baron_kills.mean()) if len(games) else 0
+        avg_turret_damage = float(games.turret_damage.mean()) if len(games) else 0
         
         # Score: 0-100 (higher = more objective-focused)
         # Normalize: dragons (0-2 avg), barons (0-1 avg), turret damage (0-10000 avg)
@@ -160,29 +114,12 @@ class PlaystyleAnalyzer:
             "level": "objective_focused" if score > 60 else "kill_focused" if score < 40 else "balanced"
         }
     
-    def _analyze_team_play(self, player_matches: List[Dict]) -> Dict:
+    def _analyze_team_play(self, games: PlayerGames) -> Dict:
         """Analyze player's team play tendency."""
-        assists = []
-        vision_scores = []
-        team_fight_participation = []
-        
-        for match_data in player_matches:
-            player = match_data["player"]
-            
-            assists.append(player.get("assists", 0))
-            vision_scores.append(player.get("visionScore", 0))
-            
-            # Team fight participation (proxy: high assist games)
-            kills = player.get("kills", 0)
-            assists_count = player.get("assists", 0)
-            if kills + assists_count > 10:
-                team_fight_participation.append(1)
-            else:
-                team_fight_participation.append(0)
-        
-        avg_assists = statistics.mean(assists) if assists else 5
-        avg_vision = statistics.mean(vision_scores) if vision_scores else 20
-        team_fight_rate = statistics.mean(team_fight_participation) * 100 if team_fight_participation else 0
+        avg_assists = float(games.assists.mean()) if len(games) else 5
+        avg_vision = float(games.vision.mean()) if len(games) else 20
+        # Team fight participation (proxy: high assist games)
+        team_fight_rate = float(((games.kills + games.assists) > 10).mean() * 100) if len(games) else 0
         
         # Score: 0-100 (higher = more team-oriented)
         score = min(100, max(0, (
@@ -199,29 +136,16 @@ class PlaystyleAnalyzer:
             "level": "team_player" if score > 60 else "solo_carry" if score < 40 else "balanced"
         }
     
-    def _analyze_scaling_preference(self, player_matches: List[Dict]) -> Dict:
+    def _analyze_scaling_preference(self, games: PlayerGames) -> Dict:
         """Analyze preference for scaling vs early game champions."""
         # This is a proxy based on game duration and performance
         # Players who perform better in longer games may prefer scaling
+        game_durations = games.duration / 60.0
+        # Late game performance (damage in long games)
+        late_game_performance = games.damage[game_durations > 30]
         
-        game_durations = []
-        late_game_performance = []
-        
-        for match_data in player_matches:
-            player = match_data["player"]
-            match_info = match_data["match"].get("info", {})
-            
-            duration_sec = match_info.get("gameDuration", 0)
-            duration_min = duration_sec / 60.0
-            game_durations.append(duration_min)
-            
-            # Late game performance (damage in long games)
-            if duration_min > 30:
-                damage = player.get("totalDamageDealtToChampions", 0)
-                late_game_performance.append(damage)
-        
-        avg_duration = statistics.mean(game_durations) if game_durations else 25
-        avg_late_damage = statistics.mean(late_game_performance) if late_game_performance else 0
+        avg_duration = float(game_durations.mean()) if len(games) else 25
+        avg_late_damage = float(late_game_performance.mean()) if len(late_game_performance) else 0
         
         # Score: 0-100 (higher = prefers scaling)
         # Players with longer games and good late game damage = scaling preference
@@ -237,15 +161,13 @@ class PlaystyleAnalyzer:
             "level": "scaling" if score > 60 else "early_game" if score < 40 else "balanced"
         }
     
-    def _analyze_role_preference(self, player_matches: List[Dict]) -> Dict:
+    def _analyze_role_preference(self, games: PlayerGames) -> Dict:
         """Analyze preferred roles."""
         role_counts = Counter()
         
-        for match_data in player_matches:
-            player = match_data["player"]
-            role = player.get("teamPosition", "UNKNOWN")
-            if role != "UNKNOWN":
-                role_counts[role] += 1
+        for code, rows in games.group_by(games.role_codes):
+            if games.roles[code] != "UNKNOWN":
+                role_counts[games.roles[code]] = len(rows)
         
         total = sum(role_counts.values())
         if total == 0:
@@ -264,14 +186,11 @@ class PlaystyleAnalyzer:
             "flexibility": 100 - (role_counts.most_common(1)[0][1] / total * 100) if role_counts else 0
         }
     
-    def _analyze_champion_diversity(self, player_matches: List[Dict]) -> Dict:
+    def _analyze_champion_diversity(self, games: PlayerGames) -> Dict:
         """Analyze champion pool diversity."""
-        champion_counts = Counter()
-        
-        for match_data in player_matches:
-            player = match_data["player"]
-            champion = player.get("championName", "Unknown")
-            champion_counts[champion] += 1
+        champion_counts = Counter({
+            games.champions[code]: len(rows) for code, rows in games.group_by(games.champion_codes)
+        })
         
         total_games = sum(champion_counts.values())
         unique_champions = len(champion_counts)
@@ -320,33 +239,25 @@ class PlaystyleAnalyzer:
         else:
             return "Balanced Player"
     
-    def _calculate_consistency(self, player_matches: List[Dict]) -> float:
+    def _calculate_consistency(self, games: PlayerGames) -> float:
         """Calculate performance consistency."""
-        kdas = []
-        
-        for match_data in player_matches:
-            player = match_data["player"]
-            kills = player.get("kills", 0)
-            deaths = player.get("deaths", 0)
-            assists = player.get("assists", 0)
-            kda = (kills + assists) / max(deaths, 1)
-            kdas.append(kda)
+        kdas = games.kda
         
-        if not kdas:
+        if not len(kdas):
             return 0
         
         # Consistency = inverse of coefficient of variation
-        mean_kda = statistics.mean(kdas)
+        mean_kda = float(kdas.mean())
         if mean_kda == 0:
             return 0
         
-        try:
-            std_kda = statistics.stdev(kdas)
-            cv = std_kda / mean_kda  # Coefficient of variation
-            consistency = max(0, min(100, (1 - min(cv, 1)) * 100))
-            return consistency
-        except:
+        if len(kdas) < 2:
             return 50  # Default if calculation fails
+        
+        std_kda = float(kdas.std(ddof=1))
+        cv = std_kda / mean_kda  # Coefficient of variation
+        consistency = max(0, min(100, (1 - min(cv, 1)) * 100))
+        return consistency
     
     def _identify_playstyle_strengths(self, aggression: Dict, objective_focus: Dict,
                                      team_play: Dict, scaling: Dict) -> List[str]:
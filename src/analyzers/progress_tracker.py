@@ -1,11 +1,14 @@
 """
 Track persistent strengths and weaknesses over time periods.
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta
 from collections import defaultdict
 import statistics
+import numpy as np
 from src.analyzers.match_analyzer import MatchAnalyzer
+from src.analyzers.player_games import PlayerGames
+from src.analyzers.analysis_state import AnalysisState
 
 
 class ProgressTracker:
@@ -14,7 +17,8 @@ class ProgressTracker:
     def __init__(self):
         self.match_analyzer = MatchAnalyzer()
     
-    def track_persistent_patterns(self, matches: List[Dict], puuid: str, time_period: str = "month") -> Dict:
+    def track_persistent_patterns(self, matches: Union[List[Dict], PlayerGames], puuid: str,
+                                  time_period: str = "month") -> Dict:
         """
         Track persistent strengths and weaknesses over time periods.
         
@@ -26,16 +30,15 @@ class ProgressTracker:
         Returns:
             Dict with persistent patterns, trends, and evolution
         """
-        # Group matches by time period
-        period_matches = self._group_matches_by_period(matches, puuid, time_period)
+        period_states = self.build_period_states(matches, puuid, time_period)
         
-        if not period_matches:
+        if not period_states:
             return {}
         
         # Analyze each period
         period_analyses = {}
-        for period, period_match_list in period_matches.items():
-            analysis = self.match_analyzer.analyze_player_matches(period_match_list, puuid)
+        for period in sorted(period_states):
+            analysis = self.match_analyzer.analyze_state(period_states[period])
             period_analyses[period] = {
                 "analysis": analysis,
                 "strengths": analysis.get("strengths", []),
@@ -83,12 +86,42 @@ class ProgressTracker:
             )
         }
     
-    def _group_matches_by_period(self, matches: List[Dict], puuid: str, period: str) -> Dict[str, List[Dict]]:
-        """Group matches by time period."""
-        period_matches = defaultdict(list)
+    def build_period_states(self, matches: Union[List[Dict], PlayerGames], puuid: str,
+                            period: str = "month") -> Dict[str, AnalysisState]:
+        """
+        Build one aggregate state per period.
+        
+        Quarters are merged from monthly states, so callers that keep monthly
+        states around can roll them up with merge_period_states instead.
+        """
+        base_period = "week" if period == "week" else "month"
+        period_games = self._group_matches_by_period(PlayerGames.ensure(matches, puuid), base_period)
+        states = {key: AnalysisState.from_games(games) for key, games in period_games.items()}
+        
+        if period == "quarter":
+            states = self.merge_period_states(states, "quarter")
+        return states
+    
+    def merge_period_states(self, monthly_states: Dict[str, AnalysisState], period: str) -> Dict[str, AnalysisState]:
+        """Roll monthly states ("YYYY-MM") up into quarters ("YYYY-Qn") or years ("YYYY")."""
+        grouped = defaultdict(list)
+        for month_key in sorted(monthly_states):
+            year, month = month_key.split("-")
+            if period == "quarter":
+                key = f"{year}-Q{(int(month) - 1) // 3 + 1}"
+            elif period == "year":
+                key = year
+            else:
+                key = month_key
+            grouped[key].append(monthly_states[month_key])
+        
+        return {key: AnalysisState.merge_all(states) for key, states in grouped.items()}
+    
+    def _group_matches_by_period(self, games: PlayerGames, period: str) -> Dict[str, PlayerGames]:
+        """Group a player's games by time period."""
+        period_rows = defaultdict(list)
         
-        for match in matches:
-            game_creation = match.get("info", {}).get("gameCreation", 0)
+        for row, game_creation in enumerate(games.timestamp.tolist()):
             if game_creation == 0:
                 continue
             
@@ -111,11 +144,11 @@ class ProgressTracker:
                 # Default to month
                 period_key = f"{game_date.year}-{game_date.month:02d}"
             
-            period_matches[period_key].append(match)
+            period_rows[period_key].append(row)
         
         # Sort periods
-        sorted_periods = sorted(period_matches.keys())
-        return {period: period_matches[period] for period in sorted_periods}
+        sorted_periods = sorted(period_rows.keys())
+        return {period: games.take(np.array(period_rows[period], dtype=np.int64)) for period in sorted_periods}
     
     def _identify_persistent_patterns(self, period_analyses: Dict, pattern_type: str) -> List[Dict]:
         """Identify patterns that appear consistently across multiple periods."""
@@ -1,8 +1,10 @@
 """
 Rank-based comparison metrics for player statistics.
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import math
+import numpy as np
+from src.analyzers.player_games import PlayerGames
 
 
 class RankComparisonAnalyzer:
@@ -152,61 +154,36 @@ class RankComparisonAnalyzer:
             "champion": champion_name
         }
     
-    def calculate_player_cs_per_min(self, matches: List[Dict], puuid: str) -> float:
+    def calculate_player_cs_per_min(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> float:
         """Calculate average CS per minute for a player."""
-        total_cs = 0
-        total_minutes = 0
+        games = PlayerGames.ensure(matches, puuid)
+        # Games without a recorded duration count as one minute
+        minutes = np.where(games.duration > 0, games.duration / 60.0, 1)
+        total_minutes = float(minutes.sum())
         
-        for match in matches:
-            player_data = self._extract_player_data(match, puuid)
-            if player_data:
-                cs = player_data.get("totalMinionsKilled", 0) + player_data.get("neutralMinionsKilled", 0)
-                game_duration = match.get("info", {}).get("gameDuration", 0)  # in seconds
-                minutes = game_duration / 60.0 if game_duration > 0 else 1
-                
-                total_cs += cs
-                total_minutes += minutes
-        
-        return (total_cs / total_minutes) if total_minutes > 0 else 0.0
-    
-    def _extract_player_data(self, match: Dict, puuid: str) -> Optional[Dict]:
-        """Extract player-specific data from match."""
-        participants = match.get("info", {}).get("participants", [])
-        for participant in participants:
-            if participant.get("puuid") == puuid:
-                return participant
-        return None
+        return (int(games.cs.sum()) / total_minutes) if total_minutes > 0 else 0.0
     
-    def get_champion_win_rate(self, matches: List[Dict], puuid: str, champion_name: str) -> Optional[float]:
+    def get_champion_win_rate(self, matches: Union[List[Dict], PlayerGames], puuid: str,
+                              champion_name: str) -> Optional[float]:
         """Get win rate for a specific champion."""
-        champion_matches = []
-        wins = 0
-        
-        for match in matches:
-            player_data = self._extract_player_data(match, puuid)
-            if player_data and player_data.get("championName") == champion_name:
-                champion_matches.append(player_data)
-                if player_data.get("win", False):
-                    wins += 1
+        games = PlayerGames.ensure(matches, puuid)
+        if champion_name not in games.champions:
+            return None
         
-        if len(champion_matches) == 0:
+        champion_wins = games.win[games.champion_codes == games.champions.index(champion_name)]
+        if len(champion_wins) == 0:
             return None
         
-        return (wins / len(champion_matches)) * 100.0
+        return float(champion_wins.mean() * 100.0)
     
-    def get_most_played_champion(self, matches: List[Dict], puuid: str) -> Optional[str]:
+    def get_most_played_champion(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> Optional[str]:
         """Get the most played champion from matches."""
-        champion_counts = {}
-        
-        for match in matches:
-            player_data = self._extract_player_data(match, puuid)
-            if player_data:
-                champ = player_data.get("championName")
-                if champ:
-                    champion_counts[champ] = champion_counts.get(champ, 0) + 1
+        games = PlayerGames.ensure(matches, puuid)
+        champion_counts = {
+            games.champions[code]: len(rows) for code, rows in games.group_by(games.champion_codes)
+        }
         
         if not champion_counts:
             return None
         
         return max(champion_counts.items(), key=lambda x: x[1])[0]
-
@@ -1,10 +1,12 @@
 """
 Year-end summary generation and analysis.
 """
-from typing import Dict, List
-from collections import Counter
-from datetime import datetime
+from typing import Dict, List, Union
+import numpy as np
 from src.analyzers.match_analyzer import MatchAnalyzer
+from src.analyzers.player_games import PlayerGames
+from src.analyzers.analysis_state import AnalysisState
+from src.analyzers.progress_tracker import ProgressTracker
 
 
 class YearSummaryGenerator:
@@ -12,18 +14,29 @@ class YearSummaryGenerator:
     
     def __init__(self):
         self.analyzer = MatchAnalyzer()
+        self.progress_tracker = ProgressTracker()
     
-    def generate_year_summary(self, matches: List[Dict], puuid: str, year: int = 2024) -> Dict:
-        """Generate comprehensive year-end summary."""
-        analysis = self.analyzer.analyze_player_matches(matches, puuid)
+    def generate_year_summary(self, matches: Union[List[Dict], PlayerGames], puuid: str, year: int = 2024) -> Dict:
+        """
+        Generate comprehensive year-end summary.
+        
+        Games are aggregated once per month; the monthly states are merged
+        into quarters for the quarterly breakdown and into the whole year for
+        the analysis, without aggregating the games again.
+        """
+        games = PlayerGames.ensure(matches, puuid)
+        monthly_states = self.progress_tracker.build_period_states(games, puuid, "month")
+        if sum(state.games for state in monthly_states.values()) == len(games):
+            year_state = AnalysisState.merge_all(monthly_states[key] for key in sorted(monthly_states))
+        else:
+            # Games without a creation time belong to no month; aggregate the year directly
+            year_state = self.analyzer.build_state(games, puuid)
+        analysis = self.analyzer.analyze_state(year_state)
         
         # Get most played champions
-        champion_games = {}
-        for match in matches:
-            player_data = self.analyzer._extract_player_data(match, puuid)
-            if player_data:
-                champ = player_data.get("championName", "Unknown")
-                champion_games[champ] = champion_games.get(champ, 0) + 1
+        champion_games = {
+            games.champions[code]: len(rows) for code, rows in games.group_by(games.champion_codes)
+        }
         
         most_played = sorted(champion_games.items(), key=lambda x: x[1], reverse=True)[:5]
         
@@ -35,11 +48,12 @@ class YearSummaryGenerator:
             "best_champion": most_played[0][0] if most_played else "N/A",
             "key_metrics": analysis.get("key_metrics", {}),
             "improvement": analysis.get("performance_trends", {}).get("improvement", 0),
-            "achievements": analysis.get("achievements", [])
+            "achievements": analysis.get("achievements", []),
+            "quarterly": self._quarterly_breakdown(monthly_states)
         }
         
         # Generate highlights
-        highlights = self._generate_highlights(matches, puuid, analysis)
+        highlights = self._generate_highlights(games, analysis)
         
         return {
             "year": year,
@@ -50,44 +64,48 @@ class YearSummaryGenerator:
             "growth_areas": self._identify_growth_areas(analysis)
         }
     
-    def _generate_highlights(self, matches: List[Dict], puuid: str, analysis: Dict) -> List[Dict]:
+    def _quarterly_breakdown(self, monthly_states: Dict[str, AnalysisState]) -> Dict[str, Dict]:
+        """Games, win rate and average KDA per quarter, merged from the monthly states."""
+        breakdown = {}
+        for quarter, state in self.progress_tracker.merge_period_states(monthly_states, "quarter").items():
+            analysis = self.analyzer.analyze_state(state)
+            breakdown[quarter] = {
+                "games": analysis.get("total_matches", 0),
+                "win_rate": analysis.get("win_rate", {}).get("win_rate", 0),
+                "avg_kda": analysis.get("key_metrics", {}).get("avg_kda", 0)
+            }
+        return breakdown
+    
+    def _generate_highlights(self, games: PlayerGames, analysis: Dict) -> List[Dict]:
         """Generate key highlights from the year."""
         highlights = []
         
-        # Best game (by KDA)
+        # Best game (by KDA) and best damage game; first occurrence wins ties
         best_game = None
-        best_kda = 0
         best_damage_game = None
         best_damage = 0
         
-        for match in matches:
-            player_data = self.analyzer._extract_player_data(match, puuid)
-            if player_data:
-                kills = player_data.get("kills", 0)
-                deaths = player_data.get("deaths", 0)
-                assists = player_data.get("assists", 0)
-                kda = (kills + assists) / max(deaths, 1)
-                damage = player_data.get("totalDamageDealtToChampions", 0)
-                
-                if kda > best_kda:
-                    best_kda = kda
-                    best_game = {
-                        "match_id": match.get("metadata", {}).get("matchId", "unknown"),
-                        "kda": f"{kills}/{deaths}/{assists}",
-                        "champion": player_data.get("championName", "Unknown"),
-                        "win": player_data.get("win", False),
-                        "damage": damage,
-                        "timestamp": match.get("info", {}).get("gameCreation", 0)
-                    }
-                
-                if damage > best_damage:
-                    best_damage = damage
-                    best_damage_game = {
-                        "match_id": match.get("metadata", {}).get("matchId", "unknown"),
-                        "damage": damage,
-                        "champion": player_data.get("championName", "Unknown"),
-                        "kda": f"{kills}/{deaths}/{assists}"
-                    }
+        if len(games):
+            i = int(np.argmax(games.kda))
+            if games.kda[i] > 0:
+                best_game = {
+                    "match_id": games.match_ids[i],
+                    "kda": f"{games.kills[i]}/{games.deaths[i]}/{games.assists[i]}",
+                    "champion": games.champions[games.champion_codes[i]],
+                    "win": bool(games.win[i]),
+                    "damage": int(games.damage[i]),
+                    "timestamp": int(games.timestamp[i])
+                }
+            
+            i = int(np.argmax(games.damage))
+            if games.damage[i] > 0:
+                best_damage = int(games.damage[i])
+                best_damage_game = {
+                    "match_id": games.match_ids[i],
+                    "damage": best_damage,
+                    "champion": games.champions[games.champion_codes[i]],
+                    "kda": f"{games.kills[i]}/{games.deaths[i]}/{games.assists[i]}"
+                }
         
         if best_game:
             highlights.append({
@@ -109,20 +127,18 @@ class YearSummaryGenerator:
         current_streak_start = None
         max_streak_start = None
         
-        sorted_matches = sorted(matches, key=lambda m: m.get("info", {}).get("gameCreation", 0))
-        for match in sorted_matches:
-            player_data = self.analyzer._extract_player_data(match, puuid)
-            if player_data:
-                if player_data.get("win", False):
-                    if win_streak == 0:
-                        current_streak_start = match.get("info", {}).get("gameCreation", 0)
-                    win_streak += 1
-                    if win_streak > max_streak:
-                        max_streak = win_streak
-                        max_streak_start = current_streak_start
-                else:
-                    win_streak = 0
-                    current_streak_start = None
+        order = games.time_order()
+        for win, timestamp in zip(games.win[order].tolist(), games.timestamp[order].tolist()):
+            if win:
+                if win_streak == 0:
+                    current_streak_start = timestamp
+                win_streak += 1
+                if win_streak > max_streak:
+                    max_streak = win_streak
+                    max_streak_start = current_streak_start
+            else:
+                win_streak = 0
+                current_streak_start = None
         
         if max_streak >= 3:
             highlights.append({
@@ -132,7 +148,7 @@ class YearSummaryGenerator:
             })
         
         # Most improved champion
-        champion_improvements = self._calculate_champion_improvements(matches, puuid)
+        champion_improvements = self._calculate_champion_improvements(games)
         if champion_improvements:
             top_improvement = max(champion_improvements, key=lambda x: x.get("improvement", 0))
             if top_improvement.get("improvement", 0) > 10:
@@ -143,7 +159,7 @@ class YearSummaryGenerator:
                 })
         
         # Perfect games (no deaths with kills/assists)
-        perfect_games = self._find_perfect_games(matches, puuid)
+        perfect_games = self._find_perfect_games(games)
         if perfect_games:
             highlights.append({
                 "type": "Perfect Game",
@@ -173,36 +189,23 @@ class YearSummaryGenerator:
         
         return highlights[:10]  # Top 10 highlights
     
-    def _calculate_champion_improvements(self, matches: List[Dict], puuid: str) -> List[Dict]:
+    def _calculate_champion_improvements(self, games: PlayerGames) -> List[Dict]:
         """Calculate which champions improved most over time."""
         # Split matches into halves
-        sorted_matches = sorted(matches, key=lambda m: m.get("info", {}).get("gameCreation", 0))
-        first_half = sorted_matches[:len(sorted_matches)//2]
-        second_half = sorted_matches[len(sorted_matches)//2:]
+        order = games.time_order()
+        halves = [order[:len(order)//2], order[len(order)//2:]]
         
         # Calculate win rates per champion in each half
         first_half_stats = {}
         second_half_stats = {}
         
-        for match in first_half:
-            player_data = self.analyzer._extract_player_data(match, puuid)
-            if player_data:
-                champ = player_data.get("championName", "Unknown")
-                if champ not in first_half_stats:
-                    first_half_stats[champ] = {"wins": 0, "games": 0}
-                first_half_stats[champ]["games"] += 1
-                if player_data.get("win", False):
-                    first_half_stats[champ]["wins"] += 1
-        
-        for match in second_half:
-            player_data = self.analyzer._extract_player_data(match, puuid)
-            if player_data:
-                champ = player_data.get("championName", "Unknown")
-                if champ not in second_half_stats:
-                    second_half_stats[champ] = {"wins": 0, "games": 0}
-                second_half_stats[champ]["games"] += 1
-                if player_data.get("win", False):
-                    second_half_stats[champ]["wins"] += 1
+        for half, half_stats in zip(halves, [first_half_stats, second_half_stats]):
+            half_games = games.take(half)
+            for code, rows in half_games.group_by(half_games.champion_codes):
+                half_stats[games.champions[code]] = {
+                    "wins": int(half_games.win[rows].sum()),
+                    "games": len(rows)
+                }
         
         # Calculate improvements
         improvements = []
@@ -225,24 +228,17 @@ class YearSummaryGenerator:
         
         return improvements
     
-    def _find_perfect_games(self, matches: List[Dict], puuid: str) -> List[Dict]:
+    def _find_perfect_games(self, games: PlayerGames) -> List[Dict]:
         """Find games with 0 deaths and positive KDA."""
         perfect_games = []
         
-        for match in matches:
-            player_data = self.analyzer._extract_player_data(match, puuid)
-            if player_data:
-                deaths = player_data.get("deaths", 0)
-                kills = player_data.get("kills", 0)
-                assists = player_data.get("assists", 0)
-                
-                if deaths == 0 and (kills > 0 or assists > 0):
-                    perfect_games.append({
-                        "match_id": match.get("metadata", {}).get("matchId", "unknown"),
-                        "kda": f"{kills}/{deaths}/{assists}",
-                        "champion": player_data.get("championName", "Unknown"),
-                        "win": player_data.get("win", False)
-                    })
+        for i in np.flatnonzero((games.deaths == 0) & ((games.kills > 0) | (games.assists > 0))):
+            perfect_games.append({
+                "match_id": games.match_ids[i],
+                "kda": f"{games.kills[i]}/{games.deaths[i]}/{games.assists[i]}",
+                "champion": games.champions[games.champion_codes[i]],
+                "win": bool(games.win[i])
+            })
         
         return perfect_games
     
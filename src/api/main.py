@@ -3,13 +3,16 @@ FastAPI application main file.
 """
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from pydantic import BaseModel
 import uvicorn
+import asyncio
+import json
 import os
 import logging
+import threading
 
 # Configure logging
 logging.basicConfig(
@@ -20,15 +23,24 @@ logger = logging.getLogger(__name__)
 
 from config.settings import settings
 from src.services.riot_api import RiotAPIClient
+from src.services.riot_api_async import AsyncRiotAPIClient
+from src.services.rate_limiter import RiotRateLimiter
+from src.services.match_store import MatchStore
+from src.services.ttl_cache import TTLCache, SQLiteCacheBackend
+from src.services.match_sync import MatchSyncService
+from src.services.job_queue import Job, JobQueue
+from src.services.executors import BoundedExecutor
 from src.services.aws_bedrock import BedrockService
 from src.services.aws_comprehend import ComprehendService
 from src.analyzers.match_analyzer import MatchAnalyzer
 from src.analyzers.year_summary import YearSummaryGenerator
 from src.analyzers.rank_comparison import RankComparisonAnalyzer
+from src.analyzers.player_games import PlayerGames
 from src.generators.visualizations import VisualizationGenerator
 from src.generators.social_content import SocialContentGenerator
 from src.generators.weekly_summary import WeeklySummaryGenerator
 from src.agents.context_manager import ContextManager
+from src.agents.events import EventBus, JsonLinesEventSink, parse_sample_rates
 from src.agents.registry import AgentRegistry
 from src.agents.orchestrator import Orchestrator
 from src.agents.match_analysis_agent import MatchAnalysisAgent
@@ -54,29 +66,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Worker pools for blocking work, so async routes never block the event loop
+io_pool = BoundedExecutor("io", settings.io_pool_workers)  # boto3, sync Riot client, match sync
+compute_pool = BoundedExecutor("compute", settings.compute_pool_workers)  # analysis and agent workflows
+render_pool = (BoundedExecutor("render", settings.render_pool_processes, kind="process")
+               if settings.render_pool_processes > 0 else None)  # kaleido PNG rendering
+
 # Initialize services
-riot_client = RiotAPIClient()
-bedrock_service = BedrockService()
+riot_rate_limiter = RiotRateLimiter(settings.riot_app_rate_limit)
+match_store = MatchStore(
+    settings.match_cache_path,
+    max_bytes=settings.match_cache_max_mb * 1024 * 1024
+) if settings.match_cache_enabled else None
+lookup_cache = TTLCache(
+    settings.lookup_cache_max_entries,
+    backend=SQLiteCacheBackend(
+        settings.lookup_cache_path, max_entries=settings.lookup_cache_max_rows
+    ) if settings.lookup_cache_path else None,
+    namespace="riot-lookup"
+)
+riot_client = RiotAPIClient(rate_limiter=riot_rate_limiter, match_store=match_store, lookup_cache=lookup_cache)
+async_riot_client = AsyncRiotAPIClient(rate_limiter=riot_rate_limiter, match_store=match_store,
+                                       lookup_cache=lookup_cache, io_executor=io_pool)
+match_sync = MatchSyncService(riot_client, match_store)
+bedrock_service = BedrockService(io_executor=io_pool)  # Shared by the agents below, so they share its response cache
+year_summary_jobs = JobQueue(settings.year_summary_job_workers, settings.job_result_ttl, name="year-summary")
 comprehend_service = ComprehendService()
 match_analyzer = MatchAnalyzer()
 year_summary_gen = YearSummaryGenerator()
 rank_comparison = RankComparisonAnalyzer()
-viz_generator = VisualizationGenerator()
+viz_generator = VisualizationGenerator(render_pool=render_pool)
 social_generator = SocialContentGenerator()
 weekly_summary_gen = WeeklySummaryGenerator()
 
 # Initialize multi-agent system
+# The global context only holds cross-request data; each workflow runs in its own request-scoped context
 context_manager = ContextManager()
+# One event bus shared by the orchestrator and every agent
+event_bus = EventBus(
+    history_size=settings.event_history_size,
+    async_dispatch=settings.event_async_dispatch,
+    sample_rates=parse_sample_rates(settings.event_sample_rates),
+    sinks=[JsonLinesEventSink(settings.event_log_path)] if settings.event_log_path else None,
+    sink_batch_size=settings.event_sink_batch_size
+)
 agent_registry = AgentRegistry()
-orchestrator = Orchestrator(context_manager, agent_registry)
+orchestrator = Orchestrator(context_manager, agent_registry, event_bus)
 
 # Register agents
-agent_registry.register(MatchAnalysisAgent(context_manager))
-agent_registry.register(InsightsAgent(context_manager))
-agent_registry.register(VisualizationAgent(context_manager))
-agent_registry.register(SocialContentAgent(context_manager))
-agent_registry.register(YearSummaryAgent(context_manager))
-agent_registry.register(ComparisonAgent(context_manager))
+agent_registry.register(MatchAnalysisAgent(context_manager, event_bus))
+agent_registry.register(InsightsAgent(context_manager, event_bus, bedrock_service))
+agent_registry.register(VisualizationAgent(context_manager, event_bus, viz_generator))
+agent_registry.register(SocialContentAgent(context_manager, event_bus))
+agent_registry.register(YearSummaryAgent(context_manager, event_bus, bedrock_service))
+agent_registry.register(ComparisonAgent(context_manager, event_bus, bedrock_service))
 
 
 # Request/Response Models
@@ -90,6 +133,7 @@ class PlayerInsightsResponse(BaseModel):
     rank_info: Optional[dict] = None
     rank_comparisons: Optional[dict] = None
     visualizations: Optional[dict] = None
+    partial: bool = False  # True if insights or charts failed or timed out
 
 
 class WeeklySummaryResponse(BaseModel):
@@ -144,12 +188,41 @@ logger.info(f"Static dir exists: {os.path.exists(static_dir)}")
 logger.info(f"Angular dir exists: {os.path.exists(angular_dir)}")
 
 
+@app.on_event("shutdown")
+async def close_clients():
+    """Close pooled HTTP connections, worker pools and the event log on shutdown."""
+    await async_riot_client.close()
+    year_summary_jobs.shutdown()
+    comprehend_service.shutdown()
+    event_bus.close()
+    for pool in (io_pool, compute_pool, render_pool):
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Worker pool saturation plus cache, coalescing, event bus and job counters."""
+    return {
+        "pools": {pool.name: pool.stats() for pool in (io_pool, compute_pool, render_pool) if pool is not None},
+        "match_store": await io_pool.run(match_store.stats) if match_store is not None else None,
+        "lookup_cache": lookup_cache.stats(),
+        "bedrock": bedrock_service.stats(),
+        "comprehend": comprehend_service.stats(),
+        "agent_result_cache": context_manager.result_cache_stats(),
+        "orchestrator": orchestrator.stats(),
+        "riot_coalesced_requests": riot_client.single_flight.coalesced + async_riot_client.single_flight.coalesced,
+        "event_bus": event_bus.stats(),
+        "year_summary_jobs": year_summary_jobs.stats()
+    }
+
+
 @app.get("/api/player/{summoner_name}/insights", response_model=PlayerInsightsResponse)
 async def get_player_insights(
     summoner_name: str,
@@ -161,25 +234,22 @@ async def get_player_insights(
     logger.info(f"Summoner name: {summoner_name}, Region: {region}, Match count: {match_count}")
     try:
         # Get summoner info
-        summoner = riot_client.get_summoner_by_name(summoner_name, region)
+        summoner = await async_riot_client.get_summoner_by_name(summoner_name, region)
         puuid = summoner.get("puuid")
         
         if not puuid:
             raise HTTPException(status_code=404, detail="Summoner not found")
         
         # Get match history
-        match_ids = riot_client.get_match_history(puuid, count=match_count)
-        matches = [riot_client.get_match_details(mid) for mid in match_ids[:match_count]]
+        match_ids = await async_riot_client.get_match_history(puuid, count=match_count)
+        matches = await async_riot_client.get_match_details_many(match_ids[:match_count])
         
-        # Get player-specific match data
-        player_matches = []
-        for match in matches:
-            player_data = riot_client.get_player_match_data(match, puuid)
-            if player_data:
-                player_matches.append(player_data)
+        # Extract the player's data from every match once for all analyzers below
+        games = PlayerGames.from_matches(matches, puuid)
+        player_matches = games.participants
         
         # Use multi-agent system to generate insights
-        result = orchestrator.get_player_insights_workflow(matches, puuid, player_matches[:20])
+        result = await compute_pool.run(orchestrator.get_player_insights_workflow, games, puuid, player_matches[:20])
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result.get("details", "Agent workflow failed"))
@@ -194,7 +264,7 @@ async def get_player_insights(
         rank_tier = None
         try:
             # Try to get rank info from Riot API (optional, may not be available)
-            rank_info = riot_client.get_rank_info(puuid, region) if hasattr(riot_client, 'get_rank_info') else None
+            rank_info = await io_pool.run(riot_client.get_rank_info, puuid, region) if hasattr(riot_client, 'get_rank_info') else None
             if rank_info and rank_info.get("solo_queue"):
                 rank_tier = rank_info["solo_queue"].get("tier", "GOLD")
         except Exception:
@@ -203,7 +273,7 @@ async def get_player_insights(
         
         # Calculate rank comparisons
         rank_comparisons = None
-        if rank_tier and matches:
+        if rank_tier and len(games):
             try:
                 player_metrics = result.get("key_metrics", {})
                 player_kda = player_metrics.get("avg_kda", 0)
@@ -212,14 +282,14 @@ async def get_player_insights(
                 kda_comparison = rank_comparison.compare_kda(player_kda, rank_tier)
                 
                 # CS/min comparison
-                player_cs_per_min = rank_comparison.calculate_player_cs_per_min(matches, puuid)
+                player_cs_per_min = rank_comparison.calculate_player_cs_per_min(games, puuid)
                 cs_comparison = rank_comparison.compare_cs_per_min(player_cs_per_min, rank_tier)
                 
                 # Champion win rate comparison (use most played champion)
-                most_played_champ = rank_comparison.get_most_played_champion(matches, puuid)
+                most_played_champ = rank_comparison.get_most_played_champion(games, puuid)
                 champ_win_rate_comparison = None
                 if most_played_champ:
-                    champ_win_rate = rank_comparison.get_champion_win_rate(matches, puuid, most_played_champ)
+                    champ_win_rate = rank_comparison.get_champion_win_rate(games, puuid, most_played_champ)
                     if champ_win_rate is not None:
                         champ_win_rate_comparison = rank_comparison.compare_champion_win_rate(
                             champ_win_rate, most_played_champ, rank_tier
@@ -243,13 +313,115 @@ async def get_player_insights(
             key_metrics=result.get("key_metrics", {}),
             rank_info=rank_info,
             rank_comparisons=rank_comparisons,
-            visualizations=visualizations
+            visualizations=visualizations,
+            partial=result.get("partial", False)
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# How long a finished insights stream waits for results still on their way to it (seconds)
+STREAM_DRAIN_TIMEOUT = 0.1
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/api/player/{summoner_name}/insights/stream")
+async def stream_player_insights(
+    summoner_name: str,
+    region: str = Query(default="na1", description="League region"),
+    match_count: int = Query(default=50, ge=1, le=100, description="Number of matches to analyze")
+):
+    """
+    Stream player insights as server-sent events while the agent workflow runs.
+    
+    Sends "key_metrics" as soon as match analysis finishes, then "insights"
+    and one "visualization" event per chart as each is ready, and finally
+    "complete" (or "error").
+    """
+    try:
+        summoner = await async_riot_client.get_summoner_by_name(summoner_name, region)
+        puuid = summoner.get("puuid")
+        if not puuid:
+            raise HTTPException(status_code=404, detail="Summoner not found")
+        
+        match_ids = await async_riot_client.get_match_history(puuid, count=match_count)
+        matches = await async_riot_client.get_match_details_many(match_ids[:match_count])
+        games = PlayerGames.from_matches(matches, puuid)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+    # The workflow's own context; its agents hand every result (charts included) to this request's queue
+    context = ContextManager()
+    
+    def on_result(result):
+        # Runs on an agent's worker thread; hand the result over to this request's loop
+        loop.call_soon_threadsafe(results.put_nowait, result)
+    
+    async def stream():
+        context.add_result_listener(on_result)
+        workflow = asyncio.wrap_future(compute_pool.submit(
+            orchestrator.get_player_insights_workflow, games, puuid, games.participants[:20], context
+        ))
+        sent_charts = set()
+        try:
+            # The finished workflow future ends the stream; results already on their way are drained first
+            while True:
+                if workflow.done():
+                    try:
+                        data = await asyncio.wait_for(results.get(), STREAM_DRAIN_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    getter = asyncio.ensure_future(results.get())
+                    await asyncio.wait({getter, workflow}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        continue
+                    data = getter.result()
+                
+                if data.get("chart"):
+                    sent_charts.add(data["chart"])
+                    yield _sse_event("visualization", {"name": data["chart"], "chart": data["visualization"]})
+                elif data["agent"] == "match_analysis":
+                    analysis = data["result"]["analysis"]
+                    yield _sse_event("key_metrics", {
+                        "key_metrics": analysis.get("key_metrics", {}),
+                        "win_rate": analysis.get("win_rate"),
+                        "total_matches": analysis.get("total_matches")
+                    })
+                elif data["agent"] == "insights_generation":
+                    yield _sse_event("insights", data["result"]["insights"])
+                elif data["agent"] == "visualization":
+                    # Cached results skip per-chart events; send whatever wasn't streamed yet
+                    for name, chart in data["result"]["visualizations"].items():
+                        if name not in sent_charts:
+                            yield _sse_event("visualization", {"name": name, "chart": chart})
+            
+            try:
+                result = await workflow
+            except Exception as e:
+                yield _sse_event("error", {"detail": str(e)})
+                return
+            if "error" in result:
+                yield _sse_event("error", {"detail": result.get("details", "Agent workflow failed")})
+            else:
+                yield _sse_event("complete", {"partial": result.get("partial", False)})
+        finally:
+            context.remove_result_listener(on_result)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.get("/api/player/{summoner_name}/weekly-summary", response_model=WeeklySummaryResponse)
 async def get_weekly_summary(
     summoner_name: str,
@@ -259,18 +431,18 @@ async def get_weekly_summary(
     """Get weekly summary with highlights and signature moves."""
     try:
         # Get summoner info
-        summoner = riot_client.get_summoner_by_name(summoner_name, region)
+        summoner = await async_riot_client.get_summoner_by_name(summoner_name, region)
         puuid = summoner.get("puuid")
         
         if not puuid:
             raise HTTPException(status_code=404, detail="Summoner not found")
         
         # Get match history (more matches for weekly summary)
-        match_ids = riot_client.get_match_history(puuid, count=100)
-        matches = [riot_client.get_match_details(mid) for mid in match_ids[:100]]
+        match_ids = await async_riot_client.get_match_history(puuid, count=100)
+        matches = await async_riot_client.get_match_details_many(match_ids[:100])
         
         # Generate weekly summary
-        weekly_summary = weekly_summary_gen.generate_weekly_summary(matches, puuid, days=days)
+        weekly_summary = await compute_pool.run(weekly_summary_gen.generate_weekly_summary, matches, puuid, days=days)
         
         return WeeklySummaryResponse(**weekly_summary)
     
@@ -287,39 +459,84 @@ async def get_year_summary(
     """Get year-end summary for a player."""
     try:
         # Get summoner info
-        summoner = riot_client.get_summoner_by_name(summoner_name, region)
+        summoner = await async_riot_client.get_summoner_by_name(summoner_name, region)
         puuid = summoner.get("puuid")
         
         if not puuid:
             raise HTTPException(status_code=404, detail="Summoner not found")
         
         # Get full year matches
-        matches = riot_client.get_full_year_matches(puuid, year)
+        matches = await io_pool.run(match_sync.get_year_matches, puuid, year)
         
         # Use multi-agent system to generate year summary
-        result = orchestrator.get_year_summary_workflow(matches, puuid, year)
+        result = await compute_pool.run(orchestrator.get_year_summary_workflow, matches, puuid, year)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result.get("details", "Agent workflow failed"))
         
-        # Extract results
-        year_summary = result.get("year_summary", {})
-        ai_summary = result.get("ai_summary", "")
-        shareable = result.get("social_content", {})
-        
-        return YearSummaryResponse(
-            year=year,
-            summary=year_summary.get("summary", {}),
-            highlights=year_summary.get("highlights", []),
-            strengths=year_summary.get("strengths", []),
-            weaknesses=year_summary.get("weaknesses", []),
-            growth_areas=year_summary.get("growth_areas", []),
-            ai_generated_summary=ai_summary,
-            shareable_content=shareable
-        )
+        return _year_summary_response(year, result)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _year_summary_response(year: int, result: dict) -> YearSummaryResponse:
+    """Build the year summary response from the year summary workflow's result."""
+    year_summary = result.get("year_summary", {})
+    return YearSummaryResponse(
+        year=year,
+        summary=year_summary.get("summary", {}),
+        highlights=year_summary.get("highlights", []),
+        strengths=year_summary.get("strengths", []),
+        weaknesses=year_summary.get("weaknesses", []),
+        growth_areas=year_summary.get("growth_areas", []),
+        ai_generated_summary=result.get("ai_summary", ""),
+        shareable_content=result.get("social_content", {})
+    )
+
+
+def _run_year_summary_job(job: Job, puuid: str, year: int) -> dict:
+    """Background job: crawl the player's year, then run the year summary workflow."""
+    job.set_progress("fetching_matches")
+    matches = match_sync.get_year_matches(puuid, year)
     
+    job.set_progress("generating_summary", match_count=len(matches))
+    result = orchestrator.get_year_summary_workflow(matches, puuid, year)
+    if "error" in result:
+        raise RuntimeError(result.get("details", "Agent workflow failed"))
+    
+    job.set_progress("done", match_count=len(matches))
+    return _year_summary_response(year, result).model_dump()
+
+
+@app.post("/api/player/{summoner_name}/year-summary/jobs", status_code=202)
+async def submit_year_summary_job(
+    summoner_name: str,
+    year: int = Query(default=2024, ge=2020, le=2025, description="Year to analyze"),
+    region: str = Query(default="na1", description="League region")
+):
+    """Start generating a year-end summary in the background; poll /api/jobs/{job_id} for the result."""
+    try:
+        summoner = await async_riot_client.get_summoner_by_name(summoner_name, region)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    puuid = summoner.get("puuid")
+    if not puuid:
+        raise HTTPException(status_code=404, detail="Summoner not found")
+    
+    # One job per player and year: repeat submissions share the running (or recently finished) job
+    job = year_summary_jobs.submit(("year-summary", puuid, year), _run_year_summary_job, puuid, year)
+    return job.to_dict(include_result=False)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get a background job's status and progress, and its result once it has succeeded."""
+    job = year_summary_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
 @app.get("/api/match/{match_id}/analysis", response_model=MatchAnalysisResponse)
@@ -329,17 +546,17 @@ async def get_match_analysis(
 ):
     """Get detailed analysis for a specific match."""
     try:
-        match = riot_client.get_match_details(match_id)
+        match = await async_riot_client.get_match_details(match_id)
         player_data = riot_client.get_player_match_data(match, puuid)
         
         if not player_data:
             raise HTTPException(status_code=404, detail="Player not found in match")
         
         # Generate AI analysis
-        analysis = bedrock_service.generate_match_analysis(match, player_data)
+        analysis = await bedrock_service.generate_match_analysis_async(match, player_data)
         
         # Use Comprehend for additional insights
-        comprehend_analysis = comprehend_service.analyze_match_commentary(analysis)
+        comprehend_analysis = await io_pool.run(comprehend_service.analyze_match_commentary, analysis)
         
         return MatchAnalysisResponse(
             match_id=match_id,
@@ -352,42 +569,42 @@ async def get_match_analysis(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _comparison_player(name: str, region: str, match_count: int) -> Dict[str, Any]:
+    """Fetch and analyze one side of a comparison: summoner, match history, details, then analysis."""
+    summoner = await async_riot_client.get_summoner_by_name(name, region)
+    puuid = summoner.get("puuid")
+    if not puuid:
+        raise HTTPException(status_code=404, detail="One or both summoners not found")
+    
+    match_ids = await async_riot_client.get_match_history(puuid, count=match_count)
+    matches = await async_riot_client.get_match_details_many(match_ids[:match_count])
+    games = PlayerGames.from_matches(matches, puuid)
+    
+    # Reuses a cached analysis of the same player and matches (e.g. from an insights request)
+    analysis = await compute_pool.run(orchestrator.get_player_analysis, games, puuid)
+    if "error" in analysis:
+        raise HTTPException(status_code=500, detail=analysis.get("details", "Match analysis failed"))
+    
+    return {"name": name, "puuid": puuid, "matches": games, "analysis": analysis}
+
+
 @app.get("/api/player/{summoner_name}/compare")
 async def compare_players(
     summoner_name: str,
     friend_name: str = Query(description="Friend's summoner name"),
-    region: str = Query(default="na1", description="League region")
+    region: str = Query(default="na1", description="League region"),
+    match_count: int = Query(default=20, ge=1, le=100, description="Number of matches to compare per player")
 ):
     """Compare two players."""
     try:
-        # Get both players' info
-        player1 = riot_client.get_summoner_by_name(summoner_name, region)
-        player2 = riot_client.get_summoner_by_name(friend_name, region)
-        
-        puuid1 = player1.get("puuid")
-        puuid2 = player2.get("puuid")
-        
-        if not puuid1 or not puuid2:
-            raise HTTPException(status_code=404, detail="One or both summoners not found")
-        
-        # Get match histories
-        matches1 = riot_client.get_match_history(puuid1, count=50)
-        matches2 = riot_client.get_match_history(puuid2, count=50)
-        
-        # Prepare player data
-        player1_data = {
-            "name": summoner_name,
-            "puuid": puuid1,
-            "matches": [riot_client.get_match_details(mid) for mid in matches1[:20]]
-        }
-        player2_data = {
-            "name": friend_name,
-            "puuid": puuid2,
-            "matches": [riot_client.get_match_details(mid) for mid in matches2[:20]]
-        }
+        # Each player's fetch-and-analyze pipeline runs concurrently with the other's
+        player1_data, player2_data = await asyncio.gather(
+            _comparison_player(summoner_name, region, match_count),
+            _comparison_player(friend_name, region, match_count)
+        )
         
         # Use multi-agent system for comparison
-        result = orchestrator.get_comparison_workflow(player1_data, player2_data)
+        result = await compute_pool.run(orchestrator.get_comparison_workflow, player1_data, player2_data)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result.get("details", "Agent workflow failed"))
@@ -401,6 +618,8 @@ async def compare_players(
             "shareable_content": comparison_data.get("shareable_content", "")
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -413,37 +632,33 @@ async def get_social_content(
 ):
     """Get shareable social media content."""
     try:
-        summoner = riot_client.get_summoner_by_name(summoner_name, region)
+        summoner = await async_riot_client.get_summoner_by_name(summoner_name, region)
         puuid = summoner.get("puuid")
         
         if content_type == "year-end":
-            matches = riot_client.get_full_year_matches(puuid, 2024)
-            result = orchestrator.get_year_summary_workflow(matches, puuid, 2024)
+            matches = await io_pool.run(match_sync.get_year_matches, puuid, 2024)
+            result = await compute_pool.run(orchestrator.get_year_summary_workflow, matches, puuid, 2024)
             if "error" in result:
                 raise HTTPException(status_code=500, detail=result.get("details", "Agent workflow failed"))
             return result.get("social_content", {})
         
         elif content_type == "insights":
-            match_ids = riot_client.get_match_history(puuid, count=50)
-            matches = [riot_client.get_match_details(mid) for mid in match_ids[:50]]
-            
-            player_matches = []
-            for match in matches:
-                player_data = riot_client.get_player_match_data(match, puuid)
-                if player_data:
-                    player_matches.append(player_data)
+            match_ids = await async_riot_client.get_match_history(puuid, count=50)
+            matches = await async_riot_client.get_match_details_many(match_ids[:50])
+            games = PlayerGames.from_matches(matches, puuid)
             
-            result = orchestrator.get_player_insights_workflow(matches, puuid, player_matches[:20])
+            result = await compute_pool.run(orchestrator.get_player_insights_workflow, games, puuid,
+                                            games.participants[:20])
             if "error" in result:
                 raise HTTPException(status_code=500, detail=result.get("details", "Agent workflow failed"))
             
             # Generate social content from insights
             insights = result.get("insights", {})
-            social_response = orchestrator.delegate(
+            social_response = await compute_pool.run(
+                orchestrator.delegate,
                 "social_content",
                 "generate_content",
-                {"content_type": "insights"},
-                context_keys=["insights"],
+                {"content_type": "insights", "insights": insights},
                 output_keys=["social_content"]
             )
             
@@ -459,23 +674,25 @@ async def get_social_content(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _chat_history(chat_request: ChatRequest) -> Optional[List[Dict[str, str]]]:
+    """Convert conversation history to the format expected by BedrockService."""
+    if not chat_request.conversation_history:
+        return None
+    return [
+        {"role": msg.role, "content": msg.content}
+        for msg in chat_request.conversation_history
+    ]
+
+
 @app.post("/api/agent/chat", response_model=ChatResponse)
 async def chat_with_agent(chat_request: ChatRequest):
     """Chat with the AI agent using Amazon Bedrock."""
     try:
-        # Convert conversation history to the format expected by BedrockService
-        conversation_history = None
-        if chat_request.conversation_history:
-            conversation_history = [
-                {"role": msg.role, "content": msg.content}
-                for msg in chat_request.conversation_history
-            ]
-        
         # Get response from Bedrock
-        response = bedrock_service.chat(
+        response = await bedrock_service.chat_async(
             user_message=chat_request.message,
             context=chat_request.context,
-            conversation_history=conversation_history
+            conversation_history=_chat_history(chat_request)
         )
         
         return ChatResponse(
@@ -488,6 +705,58 @@ async def chat_with_agent(chat_request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Failed to get response from agent: {str(e)}")
 
 
+@app.post("/api/agent/chat/stream")
+async def stream_chat_with_agent(chat_request: ChatRequest):
+    """
+    Stream the AI agent's reply as server-sent events.
+    
+    Sends a "token" event for each chunk of text as the model generates it,
+    then "complete" with the full response (or "error").
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    
+    def pump():
+        # Runs on the io pool; hands each chunk to this request's loop, then None when done
+        tokens = bedrock_service.chat_stream(
+            chat_request.message,
+            context=chat_request.context,
+            conversation_history=_chat_history(chat_request)
+        )
+        try:
+            for text in tokens:
+                if stop.is_set():
+                    break  # The client went away; closing the generator closes the Bedrock stream
+                loop.call_soon_threadsafe(chunks.put_nowait, text)
+        except Exception as e:
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+        finally:
+            tokens.close()
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+    
+    async def stream():
+        io_pool.submit(pump)
+        parts = []
+        try:
+            while True:
+                item = await chunks.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    logger.error(f"Error in chat stream: {item}")
+                    yield _sse_event("error", {"detail": f"Failed to get response from agent: {str(item)}"})
+                    return
+                parts.append(item)
+                yield _sse_event("token", {"text": item})
+            yield _sse_event("complete", {"response": "".join(parts), "message_id": None})
+        finally:
+            stop.set()
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # Serve Angular app static files and handle routing (must be last, after all API routes)
 # This allows Angular routing to work on the client side
 if os.path.exists(angular_dir):
@@ -0,0 +1,11 @@
+"""
+PNG rendering for plotly figures.
+
+Kept free of heavy imports so render worker processes start quickly.
+"""
+import plotly.io as pio
+
+
+def render_png(figure: dict, width: int = 800, height: int = 400) -> bytes:
+    """Render a plotly figure, given as a dict, to PNG bytes."""
+    return pio.to_image(figure, format="png", width=width, height=height)
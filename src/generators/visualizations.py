@@ -5,36 +5,36 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.graph_objects as go
 import plotly.express as px
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 import base64
 from io import BytesIO
 import pandas as pd
+from src.analyzers.player_games import PlayerGames
+from src.generators.chart_render import render_png
 
 
 class VisualizationGenerator:
     """Generates visualizations for player data."""
     
-    def __init__(self):
+    def __init__(self, render_pool=None):
+        # Optional process pool (BoundedExecutor) for PNG rendering; kaleido renders one figure at a time per process
+        self.render_pool = render_pool
         sns.set_style("darkgrid")
         plt.style.use('seaborn-v0_8-darkgrid')
     
-    def generate_win_rate_chart(self, matches: List[Dict], puuid: str) -> str:
+    def generate_win_rate_chart(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> str:
         """Generate win rate over time chart."""
         # Extract win/loss data over time
-        match_data = []
-        for match in sorted(matches, key=lambda m: m.get("info", {}).get("gameCreation", 0)):
-            player_data = self._extract_player_data(match, puuid)
-            if player_data:
-                match_data.append({
-                    "date": match.get("info", {}).get("gameCreation", 0),
-                    "win": 1 if player_data.get("win", False) else 0,
-                    "kda": self._calculate_kda(player_data)
-                })
-        
-        if not match_data:
+        games = PlayerGames.ensure(matches, puuid)
+        if not len(games):
             return None
         
-        df = pd.DataFrame(match_data)
+        order = games.time_order()
+        df = pd.DataFrame({
+            "date": games.timestamp[order],
+            "win": games.win[order].astype(int),
+            "kda": games.kda[order]
+        })
         df['date'] = pd.to_datetime(df['date'], unit='ms')
         df['win_rate_rolling'] = df['win'].rolling(window=10, min_periods=1).mean() * 100
         
@@ -94,24 +94,20 @@ class VisualizationGenerator:
         
         return self._fig_to_base64(fig)
     
-    def generate_kda_trend(self, matches: List[Dict], puuid: str) -> str:
+    def generate_kda_trend(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> str:
         """Generate KDA trend over time."""
-        match_data = []
-        for match in sorted(matches, key=lambda m: m.get("info", {}).get("gameCreation", 0)):
-            player_data = self._extract_player_data(match, puuid)
-            if player_data:
-                match_data.append({
-                    "date": match.get("info", {}).get("gameCreation", 0),
-                    "kda": self._calculate_kda(player_data),
-                    "kills": player_data.get("kills", 0),
-                    "deaths": player_data.get("deaths", 0),
-                    "assists": player_data.get("assists", 0)
-                })
-        
-        if not match_data:
+        games = PlayerGames.ensure(matches, puuid)
+        if not len(games):
             return None
         
-        df = pd.DataFrame(match_data)
+        order = games.time_order()
+        df = pd.DataFrame({
+            "date": games.timestamp[order],
+            "kda": games.kda[order],
+            "kills": games.kills[order],
+            "deaths": games.deaths[order],
+            "assists": games.assists[order]
+        })
         df['date'] = pd.to_datetime(df['date'], unit='ms')
         df['kda_rolling'] = df['kda'].rolling(window=10, min_periods=1).mean()
         
@@ -161,69 +157,30 @@ class VisualizationGenerator:
         
         return self._fig_to_base64(fig)
     
-    def _extract_player_data(self, match: Dict, puuid: str):
-        """Extract player data from match."""
-        participants = match.get("info", {}).get("participants", [])
-        for participant in participants:
-            if participant.get("puuid") == puuid:
-                return participant
-        return None
-    
-    def _calculate_kda(self, player_data: Dict) -> float:
-        """Calculate KDA ratio."""
-        kills = player_data.get("kills", 0)
-        deaths = player_data.get("deaths", 0)
-        assists = player_data.get("assists", 0)
-        return (kills + assists) / max(deaths, 1)
-    
-    def generate_phase_performance_heatmap(self, matches: List[Dict], puuid: str) -> str:
+    def generate_phase_performance_heatmap(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> str:
         """Generate heatmap of performance by game phase (early/mid/late)."""
+        games = PlayerGames.ensure(matches, puuid)
+        
         # Categorize games by phase based on duration
-        phase_data = {
-            "early": {"kda": [], "win_rate": [], "damage": [], "gold": []},
-            "mid": {"kda": [], "win_rate": [], "damage": [], "gold": []},
-            "late": {"kda": [], "win_rate": [], "damage": [], "gold": []}
+        game_duration_min = games.duration / 60
+        phase_rows = {
+            "early": game_duration_min <= 15,
+            "mid": (game_duration_min > 15) & (game_duration_min <= 30),
+            "late": game_duration_min > 30
         }
         
-        for match in matches:
-            player_data = self._extract_player_data(match, puuid)
-            if not player_data:
-                continue
-            
-            # Get game duration in minutes
-            game_duration_sec = match.get("info", {}).get("gameDuration", 0)
-            game_duration_min = game_duration_sec / 60
-            
-            # Determine phase
-            if game_duration_min <= 15:
-                phase = "early"
-            elif game_duration_min <= 30:
-                phase = "mid"
-            else:
-                phase = "late"
-            
-            # Extract metrics
-            kda = self._calculate_kda(player_data)
-            win = 1 if player_data.get("win", False) else 0
-            damage = player_data.get("totalDamageDealtToChampions", 0)
-            gold = player_data.get("goldEarned", 0)
-            
-            phase_data[phase]["kda"].append(kda)
-            phase_data[phase]["win_rate"].append(win)
-            phase_data[phase]["damage"].append(damage)
-            phase_data[phase]["gold"].append(gold)
-        
         # Calculate averages for each phase
         phases = ["early", "mid", "late"]
         metrics = ["KDA", "Win Rate", "Damage", "Gold"]
         
         heatmap_data = []
         for phase in phases:
-            if phase_data[phase]["kda"]:
-                avg_kda = sum(phase_data[phase]["kda"]) / len(phase_data[phase]["kda"])
-                avg_win_rate = (sum(phase_data[phase]["win_rate"]) / len(phase_data[phase]["win_rate"])) * 100
-                avg_damage = sum(phase_data[phase]["damage"]) / len(phase_data[phase]["damage"])
-                avg_gold = sum(phase_data[phase]["gold"]) / len(phase_data[phase]["gold"])
+            rows = phase_rows[phase]
+            if rows.any():
+                avg_kda = float(games.kda[rows].mean())
+                avg_win_rate = float(games.win[rows].mean()) * 100
+                avg_damage = float(games.damage[rows].mean())
+                avg_gold = float(games.gold[rows].mean())
                 
                 # Normalize values for heatmap (0-100 scale)
                 # For KDA: assume max is 5, normalize to 0-100
@@ -264,21 +221,17 @@ class VisualizationGenerator:
         
         return self._fig_to_base64(fig)
     
-    def generate_win_rate_trend_line(self, matches: List[Dict], puuid: str) -> str:
+    def generate_win_rate_trend_line(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> str:
         """Generate win rate trend line over time."""
-        match_data = []
-        for match in sorted(matches, key=lambda m: m.get("info", {}).get("gameCreation", 0)):
-            player_data = self._extract_player_data(match, puuid)
-            if player_data:
-                match_data.append({
-                    "date": match.get("info", {}).get("gameCreation", 0),
-                    "win": 1 if player_data.get("win", False) else 0
-                })
-        
-        if not match_data:
+        games = PlayerGames.ensure(matches, puuid)
+        if not len(games):
             return None
         
-        df = pd.DataFrame(match_data)
+        order = games.time_order()
+        df = pd.DataFrame({
+            "date": games.timestamp[order],
+            "win": games.win[order].astype(int)
+        })
         df['date'] = pd.to_datetime(df['date'], unit='ms')
         
         # Calculate cumulative win rate
@@ -321,46 +274,14 @@ class VisualizationGenerator:
         
         return self._fig_to_base64(fig)
     
-    def generate_champion_radar_chart(self, matches: List[Dict], puuid: str) -> str:
+    def generate_champion_radar_chart(self, matches: Union[List[Dict], PlayerGames], puuid: str) -> str:
         """Generate radar chart for champion performance."""
-        # Group matches by champion
-        champion_data = {}
-        
-        for match in matches:
-            player_data = self._extract_player_data(match, puuid)
-            if not player_data:
-                continue
-            
-            champion = player_data.get("championName", "Unknown")
-            if champion not in champion_data:
-                champion_data[champion] = {
-                    "kda": [],
-                    "win_rate": [],
-                    "damage": [],
-                    "gold": [],
-                    "cs": [],
-                    "vision": []
-                }
-            
-            # Extract metrics
-            kda = self._calculate_kda(player_data)
-            win = 1 if player_data.get("win", False) else 0
-            damage = player_data.get("totalDamageDealtToChampions", 0)
-            gold = player_data.get("goldEarned", 0)
-            cs = player_data.get("totalMinionsKilled", 0) + player_data.get("neutralMinionsKilled", 0)
-            vision = player_data.get("visionScore", 0)
-            
-            champion_data[champion]["kda"].append(kda)
-            champion_data[champion]["win_rate"].append(win)
-            champion_data[champion]["damage"].append(damage)
-            champion_data[champion]["gold"].append(gold)
-            champion_data[champion]["cs"].append(cs)
-            champion_data[champion]["vision"].append(vision)
+        games = PlayerGames.ensure(matches, puuid)
         
         # Get top 5 champions by games played
         sorted_champions = sorted(
-            champion_data.items(),
-            key=lambda x: len(x[1]["kda"]),
+            games.group_by(games.champion_codes),
+            key=lambda x: len(x[1]),
             reverse=True
         )[:5]
         
@@ -384,17 +305,16 @@ class VisualizationGenerator:
         
         colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8']
         
-        for idx, (champion, data) in enumerate(sorted_champions):
-            if not data["kda"]:
-                continue
+        for idx, (code, rows) in enumerate(sorted_champions):
+            champion = games.champions[code]
             
             # Calculate averages
-            avg_kda = sum(data["kda"]) / len(data["kda"])
-            avg_win_rate = (sum(data["win_rate"]) / len(data["win_rate"])) * 100
-            avg_damage = sum(data["damage"]) / len(data["damage"])
-            avg_gold = sum(data["gold"]) / len(data["gold"])
-            avg_cs = sum(data["cs"]) / len(data["cs"])
-            avg_vision = sum(data["vision"]) / len(data["vision"])
+            avg_kda = float(games.kda[rows].mean())
+            avg_win_rate = float(games.win[rows].mean()) * 100
+            avg_damage = float(games.damage[rows].mean())
+            avg_gold = float(games.gold[rows].mean())
+            avg_cs = float(games.cs[rows].mean())
+            avg_vision = float(games.vision[rows].mean())
             
             # Normalize to 0-100
             normalized_values = [
@@ -435,7 +355,10 @@ class VisualizationGenerator:
     def _fig_to_base64(self, fig) -> str:
         """Convert plotly figure to base64 string."""
         try:
-            img_bytes = fig.to_image(format="png", width=800, height=400)
+            if self.render_pool is not None:
+                img_bytes = self.render_pool.submit(render_png, fig.to_plotly_json(), 800, 400).result()
+            else:
+                img_bytes = fig.to_image(format="png", width=800, height=400)
             return base64.b64encode(img_bytes).decode('utf-8')
         except Exception as e:
             print(f"Error converting figure to base64: {e}")
@@ -1,10 +1,10 @@
 """
 Weekly summary generator with highlights and signature moves.
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Union
 from datetime import datetime, timedelta
-from collections import Counter, defaultdict
-import statistics
+import numpy as np
+from src.analyzers.player_games import PlayerGames
 
 
 class WeeklySummaryGenerator:
@@ -13,19 +13,16 @@ class WeeklySummaryGenerator:
     def __init__(self):
         pass
     
-    def generate_weekly_summary(self, matches: List[Dict], puuid: str, days: int = 7) -> Dict:
+    def generate_weekly_summary(self, matches: Union[List[Dict], PlayerGames], puuid: str, days: int = 7) -> Dict:
         """Generate a condensed weekly summary."""
         # Filter matches from the last N days
         cutoff_date = datetime.now() - timedelta(days=days)
         cutoff_timestamp = cutoff_date.timestamp() * 1000
         
-        recent_matches = []
-        for match in matches:
-            game_creation = match.get("info", {}).get("gameCreation", 0)
-            if game_creation >= cutoff_timestamp:
-                recent_matches.append(match)
+        games = PlayerGames.ensure(matches, puuid)
+        games = games.take(games.timestamp >= cutoff_timestamp)
         
-        if not recent_matches:
+        if not len(games):
             return {
                 "summary_30_seconds": "No matches played this week.",
                 "total_games": 0,
@@ -33,76 +30,48 @@ class WeeklySummaryGenerator:
                 "signature_moves": []
             }
         
-        # Extract player data
-        player_matches = []
-        for match in recent_matches:
-            player_data = self._extract_player_data(match, puuid)
-            if player_data:
-                player_matches.append({
-                    "match": match,
-                    "player": player_data
-                })
-        
         # Generate 30-second summary
-        summary_30_seconds = self._generate_30_second_summary(player_matches)
+        summary_30_seconds = self._generate_30_second_summary(games)
         
         # Generate highlight reel
-        highlights = self._generate_highlight_reel(player_matches)
+        highlights = self._generate_highlight_reel(games)
         
         # Identify signature moves
-        signature_moves = self._identify_signature_moves(player_matches)
+        signature_moves = self._identify_signature_moves(games)
         
         return {
             "summary_30_seconds": summary_30_seconds,
-            "total_games": len(player_matches),
+            "total_games": len(games),
             "highlights": highlights,
             "signature_moves": signature_moves,
-            "week_stats": self._calculate_week_stats(player_matches)
+            "week_stats": self._calculate_week_stats(games)
         }
     
-    def _generate_30_second_summary(self, player_matches: List[Dict]) -> str:
+    def _generate_30_second_summary(self, games: PlayerGames) -> str:
         """Generate a condensed 30-second summary of the week."""
-        if not player_matches:
+        if not len(games):
             return "No matches this week."
         
-        total_games = len(player_matches)
-        wins = sum(1 for m in player_matches if m["player"].get("win", False))
+        total_games = len(games)
+        wins = int(games.win.sum())
         win_rate = (wins / total_games * 100) if total_games > 0 else 0
         
         # Calculate average KDA
-        kdas = []
-        for m in player_matches:
-            p = m["player"]
-            kills = p.get("kills", 0)
-            deaths = p.get("deaths", 0)
-            assists = p.get("assists", 0)
-            kda = (kills + assists) / max(deaths, 1)
-            kdas.append(kda)
-        avg_kda = statistics.mean(kdas) if kdas else 0
+        avg_kda = float(games.kda.mean())
         
         # Most played champion
-        champion_counts = Counter()
-        for m in player_matches:
-            champ = m["player"].get("championName", "Unknown")
-            champion_counts[champ] += 1
-        most_played = champion_counts.most_common(1)[0][0] if champion_counts else "Unknown"
-        
-        # Best performance
-        best_kda = max(kdas) if kdas else 0
-        best_match = None
-        for m in player_matches:
-            p = m["player"]
-            kills = p.get("kills", 0)
-            deaths = p.get("deaths", 0)
-            assists = p.get("assists", 0)
-            kda = (kills + assists) / max(deaths, 1)
-            if kda == best_kda:
-                best_match = {
-                    "champion": p.get("championName", "Unknown"),
-                    "kda": f"{kills}/{deaths}/{assists}",
-                    "win": p.get("win", False)
-                }
-                break
+        champion_counts = {
+            games.champions[code]: len(rows) for code, rows in games.group_by(games.champion_codes)
+        }
+        most_played = max(champion_counts.items(), key=lambda x: x[1])[0]
+        
+        # Best performance (first game with the best KDA)
+        best = int(np.argmax(games.kda))
+        best_match = {
+            "champion": games.champions[games.champion_codes[best]],
+            "kda": f"{games.kills[best]}/{games.deaths[best]}/{games.assists[best]}",
+            "win": bool(games.win[best])
+        }
         
         # Build summary
         summary_parts = [
@@ -118,54 +87,34 @@ class WeeklySummaryGenerator:
         
         return ". ".join(summary_parts) + "."
     
-    def _generate_highlight_reel(self, player_matches: List[Dict]) -> List[Dict]:
+    def _generate_highlight_reel(self, games: PlayerGames) -> List[Dict]:
         """Generate text-based highlight moments."""
         highlights = []
         
         # Sort by game creation time (most recent first)
-        sorted_matches = sorted(
-            player_matches,
-            key=lambda m: m["match"].get("info", {}).get("gameCreation", 0),
-            reverse=True
-        )
+        recent_first = games.time_order(descending=True)
         
         # 1. Best KDA game
-        best_kda = 0
-        best_kda_match = None
-        for m in player_matches:
-            p = m["player"]
-            kills = p.get("kills", 0)
-            deaths = p.get("deaths", 0)
-            assists = p.get("assists", 0)
-            kda = (kills + assists) / max(deaths, 0.5)  # Avoid division by zero
-            if kda > best_kda:
-                best_kda = kda
-                best_kda_match = m
-        
-        if best_kda_match and best_kda >= 3.0:
-            p = best_kda_match["player"]
-            champ = p.get("championName", "Unknown")
-            result = "Victory" if p.get("win", False) else "Defeat"
+        kdas = (games.kills + games.assists) / np.maximum(games.deaths, 0.5)  # Avoid division by zero
+        best = int(np.argmax(kdas)) if len(games) else None
+        best_kda = float(kdas[best]) if best is not None else 0
+        
+        if best is not None and best_kda >= 3.0:
+            champ = games.champions[games.champion_codes[best]]
+            result = "Victory" if games.win[best] else "Defeat"
             highlights.append({
                 "type": "Best Performance",
-                "moment": f"{p.get('kills', 0)}/{p.get('deaths', 0)}/{p.get('assists', 0)} KDA on {champ}",
+                "moment": f"{games.kills[best]}/{games.deaths[best]}/{games.assists[best]} KDA on {champ}",
                 "description": f"Dominant {result.lower()} with {best_kda:.2f} KDA",
                 "champion": champ
             })
         
         # 2. Highest damage game
-        max_damage = 0
-        max_damage_match = None
-        for m in player_matches:
-            p = m["player"]
-            damage = p.get("totalDamageDealtToChampions", 0)
-            if damage > max_damage:
-                max_damage = damage
-                max_damage_match = m
-        
-        if max_damage_match and max_damage >= 20000:
-            p = max_damage_match["player"]
-            champ = p.get("championName", "Unknown")
+        top = int(np.argmax(games.damage)) if len(games) else None
+        max_damage = int(games.damage[top]) if top is not None else 0
+        
+        if top is not None and max_damage >= 20000:
+            champ = games.champions[games.champion_codes[top]]
             highlights.append({
                 "type": "Damage Dealer",
                 "moment": f"{max_damage:,} damage dealt",
@@ -174,28 +123,20 @@ class WeeklySummaryGenerator:
             })
         
         # 3. Perfect KDA (no deaths)
-        for m in sorted_matches[:5]:  # Check recent 5 games
-            p = m["player"]
-            deaths = p.get("deaths", 0)
-            if deaths == 0 and p.get("kills", 0) + p.get("assists", 0) > 0:
-                champ = p.get("championName", "Unknown")
-                kills = p.get("kills", 0)
-                assists = p.get("assists", 0)
+        for i in recent_first[:5]:  # Check recent 5 games
+            if games.deaths[i] == 0 and games.kills[i] + games.assists[i] > 0:
+                champ = games.champions[games.champion_codes[i]]
                 highlights.append({
                     "type": "Perfect Game",
-                    "moment": f"{kills}/{deaths}/{assists} KDA",
+                    "moment": f"{games.kills[i]}/{games.deaths[i]}/{games.assists[i]} KDA",
                     "description": f"Deathless game on {champ} - flawless execution",
                     "champion": champ
                 })
                 break
         
         # 4. Win streak
-        win_streak = 0
-        for m in sorted_matches:
-            if m["player"].get("win", False):
-                win_streak += 1
-            else:
-                break
+        recent_wins = games.win[recent_first]
+        win_streak = int(np.argmin(recent_wins)) if not recent_wins.all() else len(recent_wins)
         
         if win_streak >= 3:
             highlights.append({
@@ -206,14 +147,13 @@ class WeeklySummaryGenerator:
             })
         
         # 5. Comeback victory (low early, high late)
-        for m in sorted_matches[:3]:
-            p = m["player"]
-            if p.get("win", False):
-                gold_earned = p.get("goldEarned", 0)
-                damage = p.get("totalDamageDealtToChampions", 0)
+        for i in recent_first[:3]:
+            if games.win[i]:
+                gold_earned = games.gold[i]
+                damage = games.damage[i]
                 # High damage relative to gold suggests comeback
                 if gold_earned > 0 and (damage / gold_earned) > 2.5:
-                    champ = p.get("championName", "Unknown")
+                    champ = games.champions[games.champion_codes[i]]
                     highlights.append({
                         "type": "Comeback",
                         "moment": "Efficient damage output",
@@ -224,44 +164,23 @@ class WeeklySummaryGenerator:
         
         return highlights[:5]  # Return top 5 highlights
     
-    def _identify_signature_moves(self, player_matches: List[Dict]) -> List[Dict]:
+    def _identify_signature_moves(self, games: PlayerGames) -> List[Dict]:
         """Identify what the player does best (signature moves)."""
         signature_moves = []
         
-        if not player_matches:
+        if not len(games):
             return signature_moves
         
         # Calculate averages
-        total_damage = 0
-        total_gold = 0
-        total_vision = 0
-        total_kills = 0
-        total_assists = 0
-        total_deaths = 0
-        total_cs = 0
-        total_minutes = 0
-        
-        for m in player_matches:
-            p = m["player"]
-            total_damage += p.get("totalDamageDealtToChampions", 0)
-            total_gold += p.get("goldEarned", 0)
-            total_vision += p.get("visionScore", 0)
-            total_kills += p.get("kills", 0)
-            total_assists += p.get("assists", 0)
-            total_deaths += p.get("deaths", 0)
-            total_cs += p.get("totalMinionsKilled", 0) + p.get("neutralMinionsKilled", 0)
-            
-            game_duration = m["match"].get("info", {}).get("gameDuration", 0)
-            total_minutes += game_duration / 60.0 if game_duration > 0 else 1
-        
-        num_games = len(player_matches)
-        avg_damage = total_damage / num_games if num_games > 0 else 0
-        avg_gold = total_gold / num_games if num_games > 0 else 0
-        avg_vision = total_vision / num_games if num_games > 0 else 0
-        avg_kills = total_kills / num_games if num_games > 0 else 0
-        avg_assists = total_assists / num_games if num_games > 0 else 0
-        avg_deaths = total_deaths / num_games if num_games > 0 else 0
-        avg_cs_per_min = (total_cs / total_minutes) if total_minutes > 0 else 0
+        avg_damage = float(games.damage.mean())
+        avg_gold = float(games.gold.mean())
+        avg_vision = float(games.vision.mean())
+        avg_kills = float(games.kills.mean())
+        avg_assists = float(games.assists.mean())
+        avg_deaths = float(games.deaths.mean())
+        # Games without a recorded duration count as one minute
+        total_minutes = float(np.where(games.duration > 0, games.duration / 60.0, 1).sum())
+        avg_cs_per_min = (int(games.cs.sum()) / total_minutes) if total_minutes > 0 else 0
         
         # Identify strengths
         # 1. High damage dealer
@@ -319,18 +238,11 @@ class WeeklySummaryGenerator:
             })
         
         # 7. Consistent performer (low variance in KDA)
-        kdas = []
-        for m in player_matches:
-            p = m["player"]
-            kills = p.get("kills", 0)
-            deaths = p.get("deaths", 0)
-            assists = p.get("assists", 0)
-            kda = (kills + assists) / max(deaths, 1)
-            kdas.append(kda)
+        kdas = games.kda
         
         if len(kdas) >= 5:
-            kda_variance = statistics.stdev(kdas) if len(kdas) > 1 else 0
-            avg_kda = statistics.mean(kdas)
+            kda_variance = float(kdas.std(ddof=1))
+            avg_kda = float(kdas.mean())
             if kda_variance < 0.5 and avg_kda >= 2.0:
                 signature_moves.append({
                     "move": "Consistent Performer",
@@ -341,37 +253,19 @@ class WeeklySummaryGenerator:
         
         return signature_moves[:5]  # Return top 5 signature moves
     
-    def _calculate_week_stats(self, player_matches: List[Dict]) -> Dict:
+    def _calculate_week_stats(self, games: PlayerGames) -> Dict:
         """Calculate weekly statistics."""
-        if not player_matches:
+        if not len(games):
             return {}
         
-        wins = sum(1 for m in player_matches if m["player"].get("win", False))
-        total = len(player_matches)
-        
-        kdas = []
-        for m in player_matches:
-            p = m["player"]
-            kills = p.get("kills", 0)
-            deaths = p.get("deaths", 0)
-            assists = p.get("assists", 0)
-            kda = (kills + assists) / max(deaths, 1)
-            kdas.append(kda)
+        wins = int(games.win.sum())
+        total = len(games)
         
         return {
             "total_games": total,
             "wins": wins,
             "losses": total - wins,
             "win_rate": (wins / total * 100) if total > 0 else 0,
-            "avg_kda": statistics.mean(kdas) if kdas else 0,
-            "best_kda": max(kdas) if kdas else 0
+            "avg_kda": float(games.kda.mean()),
+            "best_kda": float(games.kda.max())
         }
-    
-    def _extract_player_data(self, match: Dict, puuid: str) -> Optional[Dict]:
-        """Extract player-specific data from match."""
-        participants = match.get("info", {}).get("participants", [])
-        for participant in participants:
-            if participant.get("puuid") == puuid:
-                return participant
-        return None
-
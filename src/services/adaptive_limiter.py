@@ -0,0 +1,158 @@
+"""
+Adaptive (AIMD) concurrency limiting for calls to a throttled service.
+
+The limiter caps how many calls run at once. Every successful call raises
+the cap a little (additive increase, about +1 per limit's worth of
+successes); a throttled call cuts it by a factor (multiplicative decrease,
+at most once per cooldown so one burst of throttles counts once). The cap
+converges on what the service's quota allows. Callers beyond the cap wait
+in FIFO order; threads block on an Event and coroutines await a Future, so
+queued async callers hold no thread.
+"""
+import asyncio
+import time
+from collections import deque
+from threading import Event, Lock
+from typing import Any, Deque, Dict, Optional
+
+
+class SlotTimeout(TimeoutError):
+    """Raised when a slot was not granted within the allowed time."""
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency cap that grows on success and shrinks on throttling."""
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 decrease_factor: float = 0.5, decrease_cooldown: float = 1.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.failed = 0
+        self.decreases = 0
+        self.peak_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self._last_decrease = 0.0
+        # Threading Events, or (loop, Future) pairs for coroutines
+        self._waiters: Deque[Any] = deque()
+        self._lock = Lock()
+
+    def _has_room(self) -> bool:
+        """Whether a new call may start now. Caller holds the lock."""
+        return not self._waiters and self.in_flight < int(self.limit)
+
+    def _enqueue(self, waiter: Any) -> None:
+        """Queue a waiter. Caller holds the lock."""
+        self._waiters.append(waiter)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._waiters))
+
+    def _granted(self, started: float) -> None:
+        """Count a granted slot. Caller holds the lock."""
+        self.acquired += 1
+        self.total_wait_seconds += time.monotonic() - started
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """Block until a slot is free; raises SlotTimeout after timeout seconds."""
+        started = time.monotonic()
+        with self._lock:
+            if self._has_room():
+                self.in_flight += 1
+                self._granted(started)
+                return
+            event = Event()
+            self._enqueue(event)
+
+        if not event.wait(timeout):
+            with self._lock:
+                if event in self._waiters:
+                    self._waiters.remove(event)
+                    raise SlotTimeout("Timed out waiting for a concurrency slot")
+            # The slot was handed over just as the wait timed out; keep it
+        with self._lock:
+            self._granted(started)
+
+    async def acquire_async(self) -> None:
+        """Wait for a slot without blocking the event loop or holding a thread."""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_room():
+                self.in_flight += 1
+                self._granted(started)
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._enqueue(waiter)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was already handed to us; give it back
+            self._release_slot()
+            raise
+        with self._lock:
+            self._granted(started)
+
+    def release(self, throttled: bool = False, failed: bool = False) -> None:
+        """
+        Give a slot back and adapt the limit to how the call went.
+
+        Successful calls grow the limit, throttled calls shrink it, and calls
+        that failed for other reasons leave it alone.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if throttled:
+                self.throttled += 1
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif failed:
+                self.failed += 1
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        """Free a slot and hand free slots to waiters in FIFO order."""
+        with self._lock:
+            self.in_flight -= 1
+            while self._waiters and self.in_flight < int(self.limit):
+                waiter = self._waiters.popleft()
+                self.in_flight += 1
+                if isinstance(waiter, Event):
+                    waiter.set()
+                else:
+                    loop, future = waiter
+                    loop.call_soon_threadsafe(_resolve, future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current limit, queue depth and throttling counters."""
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "peak_queue_depth": self.peak_queue_depth,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "limit_decreases": self.decreases,
+                "avg_wait_seconds": (self.total_wait_seconds / self.acquired) if self.acquired else 0
+            }
+
+
+def _resolve(future: asyncio.Future) -> None:
+    """Wake an async waiter, unless it has already given up."""
+    if not future.done():
+        future.set_result(None)
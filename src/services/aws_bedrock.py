@@ -1,64 +1,294 @@
 """
 AWS Bedrock integration for generative AI insights.
 """
+import asyncio
+import hashlib
 import json
+import random
+import time
 import boto3
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from config.settings import settings
+from src.services.adaptive_limiter import AdaptiveConcurrencyLimiter, SlotTimeout
+from src.services.deadline import DeadlineExceeded, cap_timeout, check_deadline, remaining
+from src.services.prompt_builder import CHARS_PER_TOKEN, PromptBuilder, estimate_tokens, match_summary
+from src.services.single_flight import AsyncSingleFlight, SingleFlight
+from src.services.ttl_cache import SQLiteCacheBackend, TTLCache
+
+
+# Error codes that mean "slow down" rather than "this request is bad"
+THROTTLING_ERRORS = ("ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException")
+
+
+def _is_throttled(error: ClientError) -> bool:
+    """Whether a Bedrock error is throttling."""
+    return error.response.get("Error", {}).get("Code") in THROTTLING_ERRORS
+
+
+# System prompt for the League of Legends coaching chat agent
+CHAT_SYSTEM_PROMPT = """You are Zaahen, an expert League of Legends coaching agent in the Rift Rewind Hall of Legends. 
+Your role is to help players improve their gameplay, understand their statistics, analyze their matches, 
+and provide personalized coaching advice. Be friendly, knowledgeable, and encouraging. 
+Focus on actionable insights and help players reflect on their gameplay. 
+You are a wise and experienced coach who guides summoners to greatness on the Rift."""
 
 
 class BedrockService:
-    """Service for interacting with AWS Bedrock for AI-generated insights."""
+    """
+    Service for interacting with AWS Bedrock for AI-generated insights.
     
-    def __init__(self):
+    Responses for the task types in settings.llm_cache_tasks are cached,
+    keyed by a hash of the model ID, prompt and sampling parameters, and
+    concurrent identical requests share one model call.
+    
+    Every model call, sync or async, runs in a slot of one adaptive
+    concurrency limiter: throttling shrinks the number of concurrent calls,
+    successes grow it back, and throttled calls are retried with jittered
+    exponential backoff. Share one instance per process so the limit is
+    shared too.
+    """
+    
+    def __init__(self, response_cache: Optional[TTLCache] = None, io_executor: Optional[Any] = None):
         self.region = settings.bedrock_region
         self.model_id = settings.bedrock_model_id
         
+        if response_cache is None and settings.llm_cache_ttl > 0:
+            backend = SQLiteCacheBackend(
+                settings.llm_cache_path, table="llm_responses", max_entries=settings.llm_cache_max_rows
+            ) if settings.llm_cache_path else None
+            response_cache = TTLCache(settings.llm_cache_max_entries, backend=backend, namespace="bedrock")
+        self.response_cache = response_cache
+        self.cached_tasks = frozenset(task.strip() for task in settings.llm_cache_tasks.split(",") if task.strip())
+        self.single_flight = SingleFlight()
+        self.async_single_flight = AsyncSingleFlight()
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=settings.bedrock_concurrency_initial,
+            min_limit=settings.bedrock_concurrency_min,
+            max_limit=settings.bedrock_concurrency_max
+        )
+        self.retries = 0
+        # Runs the blocking boto3 calls of the async methods; anything with submit() returning a
+        # concurrent.futures.Future (e.g. the shared io BoundedExecutor)
+        self.io_executor = io_executor or ThreadPoolExecutor(max_workers=settings.bedrock_concurrency_max,
+                                                             thread_name_prefix="bedrock")
+        
         # Initialize Bedrock runtime client
         self.client = boto3.client(
             'bedrock-runtime',
             region_name=self.region,
             aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key
+            aws_secret_access_key=settings.aws_secret_access_key,
+            # Bound how long a hung model call can hold a worker thread. Throttled calls are
+            # retried here, under the limiter, so botocore makes a single attempt
+            config=Config(read_timeout=settings.bedrock_read_timeout, connect_timeout=10,
+                          retries={"total_max_attempts": 1, "mode": "standard"})
         )
     
-    def _invoke_model(self, prompt: str, max_tokens: int = 4000) -> str:
-        """Invoke the Bedrock model with a prompt."""
-        try:
-            body = json.dumps({
-                "prompt": f"\n\nHuman: {prompt}\n\nAssistant:",
-                "max_tokens_to_sample": max_tokens,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "stop_sequences": ["\n\nHuman:"]
-            })
-            
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                body=body,
-                contentType="application/json",
-                accept="application/json"
-            )
-            
-            response_body = json.loads(response['body'].read())
-            return response_body.get('completion', '')
+    def _request_body(self, prompt: str, max_tokens: int, temperature: float = 0.7) -> str:
+        """Build the model request body for a prompt."""
+        return json.dumps({
+            "prompt": f"\n\nHuman: {prompt}\n\nAssistant:",
+            "max_tokens_to_sample": max_tokens,
+            "temperature": temperature,
+            "top_p": 0.9,
+            "stop_sequences": ["\n\nHuman:"]
+        })
+    
+    def _prepare(self, prompt: str, max_tokens: int, task: Optional[str]) -> tuple:
+        """Build the request body and, if the task type is cacheable, its cache key (else None)."""
+        cacheable = self.response_cache is not None and task in self.cached_tasks
+        temperature = 0.7
+        if cacheable and settings.llm_cache_temperature is not None:
+            temperature = settings.llm_cache_temperature
+        body = self._request_body(prompt, max_tokens, temperature)
+        return body, (self.response_fingerprint(body) if cacheable else None)
+    
+    def _invoke_model(self, prompt: str, max_tokens: int = 4000, task: Optional[str] = None) -> str:
+        """Invoke the Bedrock model with a prompt, through the response cache if the task type is cacheable."""
+        body, key = self._prepare(prompt, max_tokens, task)
+        if key is None:
+            return self._call_model(body)
         
-        except ClientError as e:
-            print(f"Error invoking Bedrock model: {e}")
-            raise
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached
+        completion = self.single_flight.do(key, self._call_model, body)
+        if completion:
+            self.response_cache.set(key, completion, settings.llm_cache_ttl)
+        return completion
+    
+    async def _invoke_model_async(self, prompt: str, max_tokens: int = 4000, task: Optional[str] = None) -> str:
+        """Async variant of _invoke_model; waiting for a limiter slot holds no thread."""
+        body, key = self._prepare(prompt, max_tokens, task)
+        if key is None:
+            return await self._call_model_async(body)
+        
+        cached = await self._cache_call(self.response_cache.get, key)
+        if cached is not None:
+            return cached
+        completion = await self.async_single_flight.do(key, self._call_model_async, body)
+        if completion:
+            await self._cache_call(self.response_cache.set, key, completion, settings.llm_cache_ttl)
+        return completion
+    
+    async def _cache_call(self, fn: Callable[..., Any], *args) -> Any:
+        """Call a response cache method, on the io executor when it may reach the SQLite backend."""
+        if self.response_cache.backend is None:
+            return fn(*args)
+        return await asyncio.wrap_future(self.io_executor.submit(fn, *args))
+    
+    def stats(self) -> Dict:
+        """Get response cache, request coalescing, concurrency limit and retry counters."""
+        return {
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            "coalesced_requests": self.single_flight.coalesced + self.async_single_flight.coalesced,
+            "concurrency": self.limiter.stats(),
+            "throttle_retries": self.retries
+        }
+    
+    def response_fingerprint(self, body: str) -> str:
+        """Cache key for a request: hash of the model ID and the request body (prompt and sampling parameters)."""
+        return hashlib.sha256(f"{self.model_id}\n{body}".encode("utf-8")).hexdigest()
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number attempt + 1."""
+        return random.uniform(0, min(settings.bedrock_retry_max_delay,
+                                     settings.bedrock_retry_base_delay * 2 ** attempt))
+    
+    def _send(self, operation: Callable[[], Any], hold: bool = False) -> Any:
+        """
+        Run a Bedrock call in a limiter slot, retrying throttled attempts with jittered backoff.
+        
+        With hold, the slot is still held when the result is returned (e.g. a
+        response stream still being read) and the caller must release it.
+        """
+        attempts = settings.bedrock_max_attempts
+        for attempt in range(attempts):
+            # Don't start a slow model call for a request that has already run out of time
+            check_deadline("invoking Bedrock")
+            try:
+                self.limiter.acquire(timeout=remaining())
+            except SlotTimeout:
+                raise DeadlineExceeded("Deadline exceeded waiting for a Bedrock slot")
+            try:
+                result = operation()
+            except ClientError as e:
+                throttled = _is_throttled(e)
+                self.limiter.release(throttled=throttled, failed=not throttled)
+                if not throttled or attempt == attempts - 1:
+                    print(f"Error invoking Bedrock model: {e}")
+                    raise
+                self.retries += 1
+                time.sleep(cap_timeout(self._backoff(attempt)))
+                continue
+            except BaseException:
+                self.limiter.release(failed=True)
+                raise
+            if not hold:
+                self.limiter.release()
+            return result
+    
+    async def _send_async(self, operation: Callable[[], Any]) -> Any:
+        """
+        Async variant of _send: waits for the slot on the event loop and runs operation on the io executor.
+        
+        The slot is released when the call itself finishes, not when the awaiting coroutine does: a
+        cancelled coroutine can't stop a boto3 call already running, and the limiter must keep
+        counting it until Bedrock is done with it.
+        """
+        attempts = settings.bedrock_max_attempts
+        for attempt in range(attempts):
+            check_deadline("invoking Bedrock")
+            try:
+                await asyncio.wait_for(self.limiter.acquire_async(), remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("Deadline exceeded waiting for a Bedrock slot")
+            future = self.io_executor.submit(operation)
+            future.add_done_callback(self._release_call)
+            try:
+                # Cancelling the wrapper only cancels the call if it hasn't started yet
+                return await asyncio.wrap_future(future)
+            except ClientError as e:
+                if not _is_throttled(e) or attempt == attempts - 1:
+                    print(f"Error invoking Bedrock model: {e}")
+                    raise
+                self.retries += 1
+                await asyncio.sleep(cap_timeout(self._backoff(attempt)))
+    
+    def _release_call(self, future: Future) -> None:
+        """Release the limiter slot of a finished (or never started) call, adapting to how it went."""
+        if future.cancelled():
+            self.limiter.release(failed=True)
+            return
+        error = future.exception()
+        if isinstance(error, ClientError):
+            throttled = _is_throttled(error)
+            self.limiter.release(throttled=throttled, failed=not throttled)
+        else:
+            self.limiter.release(failed=error is not None)
+    
+    def _invoke_once(self, body: str) -> str:
+        """Send a request body to Bedrock once and return the completion."""
+        response = self.client.invoke_model(
+            modelId=self.model_id,
+            body=body,
+            contentType="application/json",
+            accept="application/json"
+        )
+        
+        response_body = json.loads(response['body'].read())
+        return response_body.get('completion', '')
+    
+    def _call_model(self, body: str) -> str:
+        """Send a request body to Bedrock and return the completion."""
+        return self._send(lambda: self._invoke_once(body))
+    
+    async def _call_model_async(self, body: str) -> str:
+        """Send a request body to Bedrock without blocking the event loop and return the completion."""
+        return await self._send_async(lambda: self._invoke_once(body))
+    
+    def _invoke_model_stream(self, prompt: str, max_tokens: int = 4000) -> Iterator[str]:
+        """
+        Invoke the Bedrock model and yield completion text as it is generated.
+        
+        Closing the generator early closes the response stream, so an
+        abandoned request stops reading from Bedrock.
+        """
+        body = self._request_body(prompt, max_tokens)
+        # The limiter slot stays held until the stream has been read
+        response = self._send(lambda: self.client.invoke_model_with_response_stream(
+            modelId=self.model_id,
+            body=body,
+            contentType="application/json",
+            accept="application/json"
+        ), hold=True)
+        
+        stream = response['body']
+        finished = False
+        try:
+            for event in stream:
+                chunk = event.get('chunk')
+                if chunk:
+                    text = json.loads(chunk['bytes']).get('completion', '')
+                    if text:
+                        yield text
+            finished = True
+        finally:
+            stream.close()
+            self.limiter.release(failed=not finished)
     
     def generate_insights(self, match_data: List[Dict], player_stats: Dict) -> Dict:
         """Generate personalized insights from match data."""
-        prompt = f"""
+        prompt = PromptBuilder().text("""
 Analyze the following League of Legends player statistics and match history to generate personalized insights that help players reflect, learn, and improve.
-
-Player Statistics:
-{json.dumps(player_stats, indent=2)}
-
-Recent Match History (last 20 matches):
-{json.dumps(match_data[:20], indent=2)}
-
+""").data(
+            "Player Statistics", player_stats
+        ).participants(
+            "Recent Match History (most recent first, one row per match)", match_data[:20]
+        ).text("""
 Please provide:
 1. Key strengths (top 3) - highlight what the player does well consistently
 2. Areas for improvement (top 3) - identify specific growth opportunities
@@ -74,16 +304,16 @@ Look for:
 - Opportunities for growth that go beyond basic stats
 
 Format your response as JSON with the following structure:
-{{
+{
     "strengths": ["strength1", "strength2", "strength3"],
     "weaknesses": ["weakness1", "weakness2", "weakness3"],
     "trends": "description of trends",
     "unexpected_insights": ["insight1", "insight2", "insight3"],
     "recommendations": ["rec1", "rec2", "rec3"]
-}}
-"""
+}
+""").build()
         
-        response = self._invoke_model(prompt)
+        response = self._invoke_model(prompt, task="insights")
         try:
             # Extract JSON from response
             json_start = response.find('{')
@@ -104,15 +334,9 @@ Format your response as JSON with the following structure:
     
     def generate_year_end_summary(self, year_stats: Dict, highlights: List[Dict]) -> str:
         """Generate a fun, shareable year-end summary."""
-        prompt = f"""
+        prompt = PromptBuilder().text("""
 Create an engaging, fun, and shareable year-end retrospective for a League of Legends player that they can celebrate, learn from, and share.
-
-Year Statistics:
-{json.dumps(year_stats, indent=2)}
-
-Key Highlights:
-{json.dumps(highlights, indent=2)}
-
+""").data("Year Statistics", year_stats).data("Key Highlights", highlights).text("""
 Write a creative, celebratory retrospective (2-3 paragraphs) that:
 - Highlights achievements and milestones worth celebrating
 - Surfaces unexpected insights and surprising patterns from their year
@@ -124,52 +348,48 @@ Write a creative, celebratory retrospective (2-3 paragraphs) that:
 - Sparks reflection on their gameplay evolution
 
 Be creative, personal, and exciting! This should feel like a personalized year-in-review that goes beyond basic stats.
-"""
+""").build()
         
-        return self._invoke_model(prompt, max_tokens=2000)
+        return self._invoke_model(prompt, max_tokens=2000, task="year_end_summary")
     
     def generate_creative_year_summary(self, year_stats: Dict, highlights: List[Dict], 
                                        persistent_strengths: List[Dict], 
                                        improvements: List[Dict]) -> Dict:
         """Generate a creative, fun year-end summary with multiple formats."""
-        prompt = f"""
+        prompt = PromptBuilder().text("""
 Create a fun, engaging, and highly shareable year-end summary for a League of Legends player. 
 Make it creative, celebratory, and personalized using AWS Bedrock's generative AI capabilities.
-
-Year Statistics:
-{json.dumps(year_stats, indent=2)}
-
-Key Highlights:
-{json.dumps(highlights, indent=2)}
-
-Persistent Strengths (patterns that appeared consistently):
-{json.dumps(persistent_strengths, indent=2)}
-
-Improvements Made:
-{json.dumps(improvements, indent=2)}
-
+""").data(
+            "Year Statistics", year_stats
+        ).data(
+            "Key Highlights", highlights
+        ).data(
+            "Persistent Strengths (patterns that appeared consistently)", persistent_strengths
+        ).data(
+            "Improvements Made", improvements
+        ).text("""
 Generate the following in JSON format:
-{{
+{
     "narrative_summary": "A 2-3 paragraph engaging story of their year, written in a celebratory and reflective tone",
     "fun_facts": ["fact1", "fact2", "fact3"],
     "achievement_highlights": ["highlight1", "highlight2", "highlight3"],
     "memorable_moments": ["moment1", "moment2", "moment3"],
     "personalized_title": "A creative, personalized title for their year (e.g., 'The Year of the Carry', 'The Climb Chronicles')",
     "social_media_caption": "A short, shareable caption for social media (1-2 sentences)",
-    "year_in_numbers": {{
+    "year_in_numbers": {
         "most_played_champion": "champion name",
         "total_games": number,
         "win_rate": percentage,
         "biggest_improvement": "description",
         "longest_streak": number
-    }},
+    },
     "reflection_questions": ["question1", "question2", "question3"]
-}}
+}
 
 Make it fun, personal, and exciting! Use emojis where appropriate. This should be something they want to share with friends.
-"""
+""").build()
         
-        response = self._invoke_model(prompt, max_tokens=3000)
+        response = self._invoke_model(prompt, max_tokens=3000, task="creative_year_summary")
         try:
             # Extract JSON from response
             json_start = response.find('{')
@@ -191,18 +411,15 @@ Make it fun, personal, and exciting! Use emojis where appropriate. This should b
     def generate_playstyle_comparison(self, player1_playstyle: Dict, player2_playstyle: Dict,
                                      comparison_data: Dict) -> str:
         """Generate a creative playstyle comparison narrative."""
-        prompt = f"""
+        prompt = PromptBuilder().text("""
 Create an engaging, fun comparison between two League of Legends players that highlights how their playstyles complement each other or differ.
-
-Player 1 Playstyle:
-{json.dumps(player1_playstyle, indent=2)}
-
-Player 2 Playstyle:
-{json.dumps(player2_playstyle, indent=2)}
-
-Comparison Data:
-{json.dumps(comparison_data, indent=2)}
-
+""").data(
+            "Player 1 Playstyle", player1_playstyle
+        ).data(
+            "Player 2 Playstyle", player2_playstyle
+        ).data(
+            "Comparison Data", comparison_data
+        ).text("""
 Write a 2-3 paragraph comparison that:
 - Highlights how their playstyles complement each other (if they do)
 - Shows what makes each player unique
@@ -212,18 +429,15 @@ Write a 2-3 paragraph comparison that:
 - Identifies synergy points and complementary strengths
 
 Be creative and focus on the fun aspects of comparing playstyles!
-"""
+""").build()
         
-        return self._invoke_model(prompt, max_tokens=2000)
+        return self._invoke_model(prompt, max_tokens=2000, task="playstyle_comparison")
     
     def generate_progress_narrative(self, progress_data: Dict) -> str:
         """Generate a narrative about player progress over time."""
-        prompt = f"""
+        prompt = PromptBuilder().text("""
 Create an engaging narrative about a League of Legends player's progress over time, highlighting their journey, improvements, and persistent patterns.
-
-Progress Data:
-{json.dumps(progress_data, indent=2)}
-
+""").data("Progress Data", progress_data).text("""
 Write a 2-3 paragraph narrative that:
 - Tells the story of their progress journey
 - Highlights persistent strengths that define their playstyle
@@ -234,31 +448,28 @@ Write a 2-3 paragraph narrative that:
 - Sparks motivation for continued improvement
 
 Be personal, encouraging, and celebratory of their growth!
-"""
+""").build()
         
-        return self._invoke_model(prompt, max_tokens=2000)
+        return self._invoke_model(prompt, max_tokens=2000, task="progress_narrative")
     
     def generate_shareable_moment(self, moment_data: Dict, moment_type: str = "achievement") -> Dict:
         """Generate creative shareable content for a specific moment."""
-        prompt = f"""
+        prompt = PromptBuilder().text(f"""
 Create fun, engaging, shareable social media content for a League of Legends {moment_type}.
-
-Moment Data:
-{json.dumps(moment_data, indent=2)}
-
+""").data("Moment Data", moment_data).text("""
 Generate the following in JSON format:
-{{
+{
     "title": "Creative, catchy title",
     "caption": "Engaging social media caption (1-2 sentences)",
     "hashtags": ["tag1", "tag2", "tag3"],
     "celebration_text": "Short celebration message",
     "fun_fact": "A fun fact about this achievement/moment"
-}}
+}
 
 Make it exciting, celebratory, and shareable! Use emojis and make it fun.
-"""
+""").build()
         
-        response = self._invoke_model(prompt, max_tokens=1000)
+        response = self._invoke_model(prompt, max_tokens=1000, task="shareable_moment")
         try:
             json_start = response.find('{')
             json_end = response.rfind('}') + 1
@@ -276,15 +487,26 @@ Make it exciting, celebratory, and shareable! Use emojis and make it fun.
     
     def generate_match_analysis(self, match: Dict, player_data: Dict) -> str:
         """Generate detailed analysis for a specific match."""
-        prompt = f"""
+        prompt = self._match_analysis_prompt(match, player_data)
+        return self._invoke_model(prompt, max_tokens=1500, task="match_analysis")
+    
+    async def generate_match_analysis_async(self, match: Dict, player_data: Dict) -> str:
+        """Async variant of generate_match_analysis for use from the event loop."""
+        prompt = self._match_analysis_prompt(match, player_data)
+        return await self._invoke_model_async(prompt, max_tokens=1500, task="match_analysis")
+    
+    def _match_analysis_prompt(self, match: Dict, player_data: Dict) -> str:
+        """Build the single-match analysis prompt."""
+        # The match's full participant list is replaced by one table row per player
+        return PromptBuilder().text("""
 Analyze this League of Legends match and provide insights for the player.
-
-Match Data:
-{json.dumps(match, indent=2)}
-
-Player Performance:
-{json.dumps(player_data, indent=2)}
-
+""").data(
+            "Match", match_summary(match)
+        ).participants(
+            "Player Performance", [player_data]
+        ).participants(
+            "All Players", match.get("info", {}).get("participants", [])
+        ).text("""
 Provide:
 1. What went well
 2. What could be improved
@@ -292,21 +514,13 @@ Provide:
 4. Specific actionable advice
 
 Keep it concise but insightful (3-4 paragraphs).
-"""
-        
-        return self._invoke_model(prompt, max_tokens=1500)
+""").build()
     
     def generate_social_comparison(self, player_stats: Dict, friend_stats: Dict) -> str:
         """Generate a comparison between player and friend."""
-        prompt = f"""
+        prompt = PromptBuilder().text("""
 Compare two League of Legends players and create an engaging comparison.
-
-Player 1 Stats:
-{json.dumps(player_stats, indent=2)}
-
-Player 2 Stats:
-{json.dumps(friend_stats, indent=2)}
-
+""").data("Player 1 Stats", player_stats).data("Player 2 Stats", friend_stats).text("""
 Create a friendly, engaging comparison that:
 - Highlights complementary playstyles
 - Shows how they stack up in different areas
@@ -314,9 +528,9 @@ Create a friendly, engaging comparison that:
 - Uses a fun, social media-friendly tone
 
 Keep it positive and engaging (2-3 paragraphs).
-"""
+""").build()
         
-        return self._invoke_model(prompt, max_tokens=1500)
+        return self._invoke_model(prompt, max_tokens=1500, task="social_comparison")
     
     def chat(self, user_message: str, context: Optional[str] = None, conversation_history: Optional[List[Dict[str, str]]] = None) -> str:
         """
@@ -330,31 +544,65 @@ Keep it positive and engaging (2-3 paragraphs).
         Returns:
             The AI agent's response
         """
-        # Build system prompt for League of Legends coaching agent
-        system_prompt = """You are Zaahen, an expert League of Legends coaching agent in the Rift Rewind Hall of Legends. 
-Your role is to help players improve their gameplay, understand their statistics, analyze their matches, 
-and provide personalized coaching advice. Be friendly, knowledgeable, and encouraging. 
-Focus on actionable insights and help players reflect on their gameplay. 
-You are a wise and experienced coach who guides summoners to greatness on the Rift."""
+        prompt = self._chat_prompt(user_message, context, conversation_history)
+        
+        return self._invoke_model(prompt, max_tokens=4000)
+    
+    async def chat_async(self, user_message: str, context: Optional[str] = None,
+                         conversation_history: Optional[List[Dict[str, str]]] = None) -> str:
+        """Async variant of chat for use from the event loop."""
+        prompt = self._chat_prompt(user_message, context, conversation_history)
         
-        # Build conversation context
-        conversation_text = ""
-        if conversation_history:
-            for msg in conversation_history[-10:]:  # Keep last 10 messages for context
-                role = "Human" if msg.get("role") == "user" else "Assistant"
-                conversation_text += f"\n\n{role}: {msg.get('content', '')}"
+        return await self._invoke_model_async(prompt, max_tokens=4000)
+    
+    def chat_stream(self, user_message: str, context: Optional[str] = None,
+                    conversation_history: Optional[List[Dict[str, str]]] = None) -> Iterator[str]:
+        """
+        Chat with the AI agent, yielding the response text in chunks as the model generates it.
+        
+        Takes the same arguments as chat(); joining the chunks gives the full response.
+        """
+        prompt = self._chat_prompt(user_message, context, conversation_history)
+        
+        return self._invoke_model_stream(prompt, max_tokens=4000)
+    
+    def _chat_prompt(self, user_message: str, context: Optional[str],
+                     conversation_history: Optional[List[Dict[str, str]]]) -> str:
+        """
+        Build the chat prompt within the prompt token budget.
+        
+        The player context is capped at half the budget; then the oldest of
+        the last 10 history messages are dropped until the prompt fits.
+        """
+        system_prompt = CHAT_SYSTEM_PROMPT
+        budget = settings.prompt_token_budget
         
         # Add optional context about the player
         context_text = ""
         if context:
-            context_text = f"\n\nContext about the player:\n{context}"
+            max_chars = int(budget / 2 * CHARS_PER_TOKEN)
+            context_text = f"\n\nContext about the player:\n{context[:max_chars]}"
         
-        # Build the full prompt
-        prompt = f"""{system_prompt}{context_text}{conversation_text}
+        fixed = f"""{system_prompt}{context_text}
 
 Human: {user_message}
 
 Assistant:"""
         
-        return self._invoke_model(prompt, max_tokens=4000)
+        # Build conversation context, newest messages first, while they fit
+        turns = []
+        used = estimate_tokens(fixed)
+        for msg in reversed((conversation_history or [])[-10:]):  # Keep at most the last 10 messages
+            role = "Human" if msg.get("role") == "user" else "Assistant"
+            turn = f"\n\n{role}: {msg.get('content', '')}"
+            used += estimate_tokens(turn)
+            if used > budget:
+                break
+            turns.append(turn)
+        conversation_text = "".join(reversed(turns))
+        
+        return f"""{system_prompt}{context_text}{conversation_text}
 
+Human: {user_message}
+
+Assistant:"""
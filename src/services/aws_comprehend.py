@@ -1,61 +1,214 @@
 """
 AWS Comprehend integration for sentiment analysis and key phrase extraction.
+
+Texts are analyzed in batches: each text is split into documents within
+Comprehend's 5,000-byte limit (between sentences where possible), documents
+already analyzed are served from a cache keyed by a hash of their text, and
+the rest go out as batch_detect_* calls of up to 25 documents, run
+concurrently. Results for a split text are merged back into one.
 """
+import hashlib
+import re
 import boto3
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 from botocore.exceptions import ClientError
 from config.settings import settings
+from src.services.deadline import submit_with_context
+from src.services.ttl_cache import TTLCache
+
+
+MAX_DOCUMENT_BYTES = 5000  # Comprehend's per-document limit (UTF-8 bytes)
+MAX_BATCH_SIZE = 25  # Documents per batch_detect_* call
+
+SENTIMENT = "sentiment"
+KEY_PHRASES = "key_phrases"
+
+NEUTRAL_SENTIMENT = {"sentiment": "NEUTRAL", "scores": {}}
+
+
+def _pieces(text: str, max_bytes: int) -> Iterator[str]:
+    """Sentences of text (with trailing whitespace); a sentence longer than max_bytes is cut up."""
+    for sentence in re.findall(r"[^.!?\n]*(?:[.!?\n]+|$)\s*", text):
+        encoded = sentence.encode("utf-8")
+        while len(encoded) > max_bytes:
+            # Cut on a character boundary
+            head = encoded[:max_bytes].decode("utf-8", "ignore")
+            yield head
+            encoded = encoded[len(head.encode("utf-8")):]
+        if encoded:
+            yield encoded.decode("utf-8")
+
+
+def split_document(text: str, max_bytes: int = MAX_DOCUMENT_BYTES) -> List[str]:
+    """Split text into documents of at most max_bytes UTF-8 bytes, breaking between sentences where possible."""
+    documents, current, size = [], [], 0
+    for piece in _pieces(text, max_bytes):
+        piece_size = len(piece.encode("utf-8"))
+        if current and size + piece_size > max_bytes:
+            documents.append("".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += piece_size
+    if current:
+        documents.append("".join(current))
+    return [document.strip() for document in documents if document.strip()]
+
+
+def _digest(document: str) -> str:
+    """Cache key for a document's text."""
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def _merge_sentiment(parts: Sequence[Tuple[str, Optional[Dict]]]) -> Dict:
+    """Combine per-document sentiments of one text, weighting scores by document length."""
+    parts = [(document, result) for document, result in parts if result is not None and result["scores"]]
+    if not parts:
+        return dict(NEUTRAL_SENTIMENT)
+    if len(parts) == 1:
+        return parts[0][1]
+    total = sum(len(document) for document, _ in parts)
+    scores = {
+        name: sum(result["scores"].get(name, 0.0) * len(document) for document, result in parts) / total
+        for name in parts[0][1]["scores"]
+    }
+    return {"sentiment": max(scores, key=scores.get).upper(), "scores": scores}
+
+
+def _merge_key_phrases(parts: Sequence[Tuple[str, Optional[List[str]]]]) -> List[str]:
+    """Concatenate per-document key phrases of one text, dropping repeats."""
+    seen, phrases = set(), []
+    for _, result in parts:
+        for phrase in result or []:
+            if phrase.lower() not in seen:
+                seen.add(phrase.lower())
+                phrases.append(phrase)
+    return phrases
 
 
 class ComprehendService:
     """Service for AWS Comprehend text analysis."""
-    
-    def __init__(self):
+
+    def __init__(self, cache: Optional[TTLCache] = None):
         self.client = boto3.client(
             'comprehend',
             region_name=settings.aws_region,
             aws_access_key_id=settings.aws_access_key_id,
             aws_secret_access_key=settings.aws_secret_access_key
         )
-    
+        self.cache = cache if cache is not None else TTLCache(settings.comprehend_cache_max_entries)
+        self.batch_calls = 0
+        self._lock = Lock()  # Guards batch_calls, counted on worker threads
+        self._executor = ThreadPoolExecutor(max_workers=settings.comprehend_max_concurrency,
+                                            thread_name_prefix="comprehend")
+
     def analyze_sentiment(self, text: str) -> Dict:
         """Analyze sentiment of text."""
-        try:
-            response = self.client.detect_sentiment(
-                Text=text,
-                LanguageCode='en'
-            )
-            return {
-                "sentiment": response['Sentiment'],
-                "scores": response['SentimentScore']
-            }
-        except ClientError as e:
-            print(f"Error analyzing sentiment: {e}")
-            return {"sentiment": "NEUTRAL", "scores": {}}
-    
+        return self.analyze_sentiment_batch([text])[0]
+
     def extract_key_phrases(self, text: str) -> List[str]:
         """Extract key phrases from text."""
-        try:
-            response = self.client.detect_key_phrases(
-                Text=text,
-                LanguageCode='en'
-            )
-            return [phrase['Text'] for phrase in response['KeyPhrases']]
-        except ClientError as e:
-            print(f"Error extracting key phrases: {e}")
-            return []
-    
+        return self.extract_key_phrases_batch([text])[0]
+
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict]:
+        """Analyze the sentiment of each text, in as few Comprehend calls as possible."""
+        results = self._analyze(texts, (SENTIMENT,))[SENTIMENT]
+        return [_merge_sentiment(parts) for parts in results]
+
+    def extract_key_phrases_batch(self, texts: List[str]) -> List[List[str]]:
+        """Extract the key phrases of each text, in as few Comprehend calls as possible."""
+        results = self._analyze(texts, (KEY_PHRASES,))[KEY_PHRASES]
+        return [_merge_key_phrases(parts) for parts in results]
+
     def analyze_match_commentary(self, match_analysis: str) -> Dict:
         """Analyze match commentary for insights."""
-        sentiment = self.analyze_sentiment(match_analysis)
-        key_phrases = self.extract_key_phrases(match_analysis)
-        
+        return self.analyze_match_commentary_batch([match_analysis])[0]
+
+    def analyze_match_commentary_batch(self, match_analyses: List[str]) -> List[Dict]:
+        """Analyze several match commentaries; sentiment and key phrase calls all run concurrently."""
+        results = self._analyze(match_analyses, (SENTIMENT, KEY_PHRASES))
+        commentaries = []
+        for sentiment_parts, phrase_parts in zip(results[SENTIMENT], results[KEY_PHRASES]):
+            sentiment = _merge_sentiment(sentiment_parts)
+            key_phrases = _merge_key_phrases(phrase_parts)
+            commentaries.append({
+                "sentiment": sentiment,
+                "key_phrases": key_phrases,
+                "insights": {
+                    "tone": sentiment["sentiment"],
+                    "focus_areas": key_phrases[:5]
+                }
+            })
+        return commentaries
+
+    def _analyze(self, texts: List[str], kinds: Sequence[str]) -> Dict[str, List[List[Tuple[str, Any]]]]:
+        """
+        Run each analysis kind over every text.
+
+        Returns, per kind and per text, (document, result) pairs for the
+        text's documents; result is None where Comprehend failed. Every
+        uncached batch of every kind is submitted before any is waited on.
+        """
+        split = [split_document(text) for text in texts]
+        documents = {_digest(document): document for parts in split for document in parts}
+
+        found: Dict[Tuple[str, str], Any] = {}
+        pending = []
+        for kind in kinds:
+            missing = []
+            for digest in documents:
+                cached = self.cache.get((kind, digest))
+                if cached is not None:
+                    found[(kind, digest)] = cached
+                else:
+                    missing.append(digest)
+            for start in range(0, len(missing), MAX_BATCH_SIZE):
+                batch = missing[start:start + MAX_BATCH_SIZE]
+                future = submit_with_context(self._executor, self._detect_batch, kind,
+                                             [documents[digest] for digest in batch])
+                pending.append((kind, batch, future))
+
+        for kind, batch, future in pending:
+            for digest, result in zip(batch, future.result()):
+                found[(kind, digest)] = result
+                if result is not None:
+                    self.cache.set((kind, digest), result, settings.comprehend_cache_ttl)
+
         return {
-            "sentiment": sentiment,
-            "key_phrases": key_phrases,
-            "insights": {
-                "tone": sentiment["sentiment"],
-                "focus_areas": key_phrases[:5]
-            }
+            kind: [[(document, found[(kind, _digest(document))]) for document in parts] for parts in split]
+            for kind in kinds
         }
 
+    def _detect_batch(self, kind: str, documents: List[str]) -> List[Any]:
+        """One batch_detect_* call; results are aligned with documents, None for failed documents."""
+        with self._lock:
+            self.batch_calls += 1
+        results: List[Any] = [None] * len(documents)
+        try:
+            if kind == SENTIMENT:
+                response = self.client.batch_detect_sentiment(TextList=documents, LanguageCode='en')
+                for item in response['ResultList']:
+                    results[item['Index']] = {
+                        "sentiment": item['Sentiment'],
+                        "scores": item['SentimentScore']
+                    }
+            else:
+                response = self.client.batch_detect_key_phrases(TextList=documents, LanguageCode='en')
+                for item in response['ResultList']:
+                    results[item['Index']] = [phrase['Text'] for phrase in item['KeyPhrases']]
+            for error in response.get('ErrorList', []):
+                print(f"Error analyzing {kind} of document {error['Index']}: {error.get('ErrorMessage')}")
+        except ClientError as e:
+            print(f"Error analyzing {kind}: {e}")
+        return results
+
+    def stats(self) -> Dict:
+        """Get cache and batch call counters."""
+        with self._lock:
+            batch_calls = self.batch_calls
+        return {"cache": self.cache.stats(), "batch_calls": batch_calls}
+
+    def shutdown(self) -> None:
+        """Stop the batch worker pool."""
+        self._executor.shutdown(wait=False)
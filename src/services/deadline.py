@@ -0,0 +1,67 @@
+"""
+Request deadlines.
+
+A workflow sets a deadline once; it is carried in a context variable, so the
+agents it runs and the Riot/Bedrock clients they call can check how much time
+is left without threading a parameter through every signature. Executor
+threads don't inherit context variables, so work submitted to a pool must go
+through submit_with_context.
+"""
+import contextvars
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+# Absolute deadline on the time.monotonic() clock, or None for no deadline
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started or continued after the request's deadline."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Run the block with a deadline seconds from now; an earlier enclosing deadline still wins."""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Get the current absolute deadline (time.monotonic() seconds), if any."""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (never negative), or None without a deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def check_deadline(what: str = "operation") -> None:
+    """Raise DeadlineExceeded if the current deadline has passed."""
+    if remaining() == 0.0:
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+
+def cap_timeout(timeout: float) -> float:
+    """Limit a per-call timeout to the time left before the deadline."""
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
+
+
+def submit_with_context(executor: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """Submit fn to an executor so it runs with the caller's context variables (including the deadline)."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
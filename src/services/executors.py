@@ -0,0 +1,89 @@
+"""
+Bounded worker pools for keeping blocking work off the event loop.
+
+Async routes hand synchronous calls (boto3, the requests-based Riot client,
+SQLite-backed sync, CPU-heavy analysis and chart rendering) to one of these
+pools instead of running them on the loop. Each pool counts in-flight work
+so saturation can be watched from the metrics endpoint.
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict
+
+
+class BoundedExecutor:
+    """A fixed-size thread or process pool with in-flight and latency counters."""
+
+    def __init__(self, name: str, max_workers: int, kind: str = "thread"):
+        self.name = name
+        self.max_workers = max_workers
+        self.kind = kind
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_seconds = 0.0  # Submit-to-done time, including time spent queued
+        self._lock = Lock()
+        if kind == "process":
+            # spawn, not fork: forking a process that runs threads can deadlock the child
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        elif kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        else:
+            raise ValueError(f"Unknown executor kind '{kind}'")
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Submit fn(*args, **kwargs); thread pools run it with the caller's context variables."""
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.monotonic()
+
+        if self.kind == "thread":
+            future = self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        else:
+            future = self._executor.submit(fn, *args, **kwargs)
+
+        def finished(done: Future) -> None:
+            with self._lock:
+                self.in_flight -= 1
+                self.total_seconds += time.monotonic() - started
+                if done.cancelled() or done.exception() is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+        future.add_done_callback(finished)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn in the pool and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get saturation and throughput counters."""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.max_workers),
+                "saturation": self.in_flight / self.max_workers,
+                "peak_in_flight": self.peak_in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_seconds": (self.total_seconds / finished) if finished else 0
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,130 @@
+"""
+In-process background job queue.
+
+Long-running work (e.g. a full-year match crawl plus AI summary) runs on a
+small worker pool instead of inside the HTTP request. Jobs are deduplicated
+by key: submitting a key that is queued, running, or finished within the
+result TTL returns the existing job rather than starting another one.
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class Job:
+    """A unit of background work and its progress."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(self, key: Hashable):
+        self.job_id = str(uuid.uuid4())
+        self.key = key
+        self.status = Job.QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def set_progress(self, stage: str, **details) -> None:
+        """Record the stage the job has reached, with optional details (e.g. match counts)."""
+        self.progress = {"stage": stage, **details}
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished, successfully or not."""
+        return self.status in (Job.SUCCEEDED, Job.FAILED)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """Status view of the job, with its result once it has succeeded."""
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.status == Job.SUCCEEDED:
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    """Runs jobs on a bounded worker pool and keeps finished jobs for result_ttl seconds."""
+
+    def __init__(self, max_workers: int = 2, result_ttl: float = 3600, name: str = "jobs"):
+        self.result_ttl = result_ttl
+        self.deduplicated = 0
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[Hashable, Job] = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Queue fn(job, *args, **kwargs) unless a job for key is active or recently succeeded.
+
+        fn receives its Job so it can report progress; its return value becomes
+        the job's result. Failed jobs are not reused, so a retry starts afresh.
+        """
+        with self._lock:
+            self._purge_expired()
+            existing = self._by_key.get(key)
+            if existing is not None and existing.status != Job.FAILED:
+                self.deduplicated += 1
+                return existing
+            job = Job(key)
+            self._jobs[job.job_id] = job
+            self._by_key[key] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        """Run a job and record its outcome."""
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            status = Job.SUCCEEDED
+        except Exception as e:
+            job.error = str(e)
+            status = Job.FAILED
+        # finished_at first: a job only counts as done once it has one
+        job.finished_at = time.time()
+        job.status = status
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID, or None if unknown or expired."""
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def _purge_expired(self) -> None:
+        """Forget jobs that finished more than result_ttl seconds ago. Caller holds the lock."""
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.done and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get job counts by status."""
+        with self._lock:
+            counts = {status: 0 for status in (Job.QUEUED, Job.RUNNING, Job.SUCCEEDED, Job.FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {"jobs": counts, "deduplicated": self.deduplicated}
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker pool."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,243 @@
+"""
+Persistent on-disk store for Riot match-v5 payloads.
+
+Match details never change once a game has ended, so they are kept in a local
+SQLite database keyed by match ID (zlib-compressed JSON) and evicted
+least-recently-used once the store grows past its size limit. The same
+database holds a per-player index of known match IDs and each player's sync
+state, which are not subject to eviction.
+"""
+import json
+import os
+import sqlite3
+import time
+import zlib
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+
+class MatchStore:
+    """SQLite-backed, size-bounded store of match details keyed by match ID."""
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS matches (
+                match_id TEXT PRIMARY KEY,
+                game_creation INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                payload BLOB NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_last_access ON matches (last_access)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS player_matches (
+                puuid TEXT NOT NULL,
+                match_id TEXT NOT NULL,
+                game_creation INTEGER NOT NULL,
+                PRIMARY KEY (puuid, match_id)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_player_matches_time ON player_matches (puuid, game_creation)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS player_sync (
+                puuid TEXT PRIMARY KEY,
+                covered_from INTEGER NOT NULL,
+                covered_until INTEGER NOT NULL,
+                newest_match_id TEXT,
+                newest_game_creation INTEGER,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Disjoint synced time ranges per player; player_sync keeps their overall span and the high-water mark
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS player_sync_ranges (
+                puuid TEXT NOT NULL,
+                covered_from INTEGER NOT NULL,
+                covered_until INTEGER NOT NULL,
+                PRIMARY KEY (puuid, covered_from)
+            )
+        """)
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM matches").fetchone()[0]
+
+    def get(self, match_id: str) -> Optional[Dict]:
+        """Get a stored match, or None if it has not been stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM matches WHERE match_id = ?", (match_id,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE matches SET last_access = ? WHERE match_id = ?", (time.time(), match_id)
+            )
+        return json.loads(zlib.decompress(row[0]))
+
+    def get_many(self, match_ids: List[str]) -> Dict[str, Dict]:
+        """Get all stored matches among match_ids, keyed by match ID."""
+        found = {}
+        for match_id in match_ids:
+            match = self.get(match_id)
+            if match is not None:
+                found[match_id] = match
+        return found
+
+    def put(self, match_id: str, match: Dict) -> None:
+        """Store a finished match."""
+        payload = zlib.compress(json.dumps(match, separators=(",", ":")).encode("utf-8"))
+        game_creation = match.get("info", {}).get("gameCreation", 0)
+
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM matches WHERE match_id = ?", (match_id,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO matches (match_id, game_creation, size, last_access, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (match_id, game_creation, len(payload), time.time(), payload)
+            )
+            self._total_bytes += len(payload) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used matches until the store is back under 90% of its limit."""
+        # Other worker processes may share the file, so re-read the real size first
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM matches").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT match_id, size FROM matches ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.execute("BEGIN")
+            for match_id, size in rows:
+                self._conn.execute("DELETE FROM matches WHERE match_id = ?", (match_id,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= target:
+                    break
+            self._conn.execute("COMMIT")
+
+    def add_player_matches(self, puuid: str, matches: List[Dict]) -> None:
+        """Record matches as part of a player's history."""
+        rows = [
+            (puuid, match.get("metadata", {}).get("matchId"), match.get("info", {}).get("gameCreation", 0))
+            for match in matches
+            if match.get("metadata", {}).get("matchId")
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO player_matches (puuid, match_id, game_creation) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def get_player_match_ids(self, puuid: str, start_ms: int, end_ms: int) -> List[str]:
+        """Get a player's known match IDs with gameCreation in [start_ms, end_ms), newest first like match-v5."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT match_id FROM player_matches "
+                "WHERE puuid = ? AND game_creation >= ? AND game_creation < ? ORDER BY game_creation DESC",
+                (puuid, start_ms, end_ms)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_sync_state(self, puuid: str) -> Optional[Dict]:
+        """Get the overall synced span and high-water mark for a player."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT covered_from, covered_until, newest_match_id, newest_game_creation, updated_at "
+                "FROM player_sync WHERE puuid = ?", (puuid,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "covered_from": row[0],
+            "covered_until": row[1],
+            "newest_match_id": row[2],
+            "newest_game_creation": row[3],
+            "updated_at": row[4]
+        }
+
+    def get_sync_ranges(self, puuid: str) -> List[Tuple[int, int]]:
+        """Get a player's synced [from, until) ranges (epoch seconds), oldest first and disjoint."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT covered_from, covered_until FROM player_sync_ranges WHERE puuid = ? ORDER BY covered_from",
+                (puuid,)
+            ).fetchall()
+            if not rows:
+                # Stores written before ranges were tracked separately have only the overall span
+                rows = self._conn.execute(
+                    "SELECT covered_from, covered_until FROM player_sync WHERE puuid = ?", (puuid,)
+                ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def add_sync_range(self, puuid: str, covered_from: int, covered_until: int) -> None:
+        """Record [covered_from, covered_until) as synced, merging it with ranges it overlaps or touches."""
+        ranges = self.get_sync_ranges(puuid) + [(covered_from, covered_until)]
+        merged: List[List[int]] = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        with self._lock:
+            newest = self._conn.execute(
+                "SELECT match_id, game_creation FROM player_matches WHERE puuid = ? "
+                "ORDER BY game_creation DESC LIMIT 1", (puuid,)
+            ).fetchone()
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM player_sync_ranges WHERE puuid = ?", (puuid,))
+            self._conn.executemany(
+                "INSERT INTO player_sync_ranges (puuid, covered_from, covered_until) VALUES (?, ?, ?)",
+                [(puuid, start, end) for start, end in merged]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO player_sync "
+                "(puuid, covered_from, covered_until, newest_match_id, newest_game_creation, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (puuid, merged[0][0], merged[-1][1],
+                 newest[0] if newest else None, newest[1] if newest else None, time.time())
+            )
+            self._conn.execute("COMMIT")
+
+    def stats(self) -> Dict:
+        """Get hit/miss counters and size information."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total * 100) if total > 0 else 0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,100 @@
+"""
+Incremental per-player match history sync.
+
+Each player's synced time ranges are recorded in the match store. Later
+requests only ask Riot for match IDs in the gaps between those ranges —
+normally just the games played since the last sync — and answer the rest
+from local history. Ranges are kept separately, so asking for a year far
+from what is stored fetches that year only, not the years in between.
+"""
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from src.services.riot_api import RiotAPIClient
+from src.services.match_store import MatchStore
+
+
+class MatchSyncService:
+    """Keeps a local per-player match history in sync with Riot using a high-water mark."""
+
+    def __init__(self, riot_client: RiotAPIClient, match_store: Optional[MatchStore] = None,
+                 overlap_seconds: int = 3600):
+        self.riot_client = riot_client
+        self.match_store = match_store
+        # Games still in progress at the last sync only show up in the ID list once they
+        # end, so each incremental fetch re-scans this much before the high-water mark
+        self.overlap_seconds = overlap_seconds
+
+    def get_matches_in_range(self, puuid: str, start_time: int, end_time: int) -> List[Dict]:
+        """Get a player's matches in an epoch-seconds window, syncing only what is not stored yet."""
+        if self.match_store is None:
+            return self.riot_client.get_matches_in_range(puuid, start_time, end_time)
+
+        self.sync(puuid, start_time, end_time)
+
+        matches = []
+        for match_id in self.match_store.get_player_match_ids(puuid, start_time * 1000, end_time * 1000):
+            try:
+                # Reads through the store; only evicted payloads go back to Riot
+                matches.append(self.riot_client.get_match_details(match_id))
+            except Exception as e:
+                print(f"Error fetching match {match_id}: {e}")
+        return matches
+
+    def get_year_matches(self, puuid: str, year: int = 2024) -> List[Dict]:
+        """Get all matches for a specific year."""
+        year_start = int(datetime(year, 1, 1).timestamp())
+        year_end = int(datetime(year + 1, 1, 1).timestamp())
+        return self.get_matches_in_range(puuid, year_start, year_end)
+
+    def sync(self, puuid: str, start_time: int, end_time: int) -> int:
+        """Sync the parts of [start_time, end_time) not synced yet; returns new match count."""
+        end_time = min(end_time, int(time.time()))
+        if start_time >= end_time:
+            # Nothing has been played in a window that starts in the future
+            return 0
+        windows = self._gaps(self.match_store.get_sync_ranges(puuid), start_time, end_time)
+        if not windows:
+            return 0
+
+        new_count = 0
+        complete = True
+        for window_start, window_end in windows:
+            known_ids = set(self.match_store.get_player_match_ids(puuid, window_start * 1000, window_end * 1000))
+            new_matches = []
+            for match_id in self.riot_client.get_match_ids_in_range(puuid, window_start, window_end):
+                if match_id in known_ids:
+                    continue
+                try:
+                    new_matches.append(self.riot_client.get_match_details(match_id))
+                except Exception as e:
+                    print(f"Error fetching match {match_id}: {e}")
+                    complete = False
+            self.match_store.add_player_matches(puuid, new_matches)
+            new_count += len(new_matches)
+
+        # Leave the ranges untouched if anything failed so the next sync retries the gaps
+        if complete:
+            self.match_store.add_sync_range(puuid, start_time, end_time)
+        return new_count
+
+    def _gaps(self, ranges: List[Tuple[int, int]], start_time: int, end_time: int) -> List[Tuple[int, int]]:
+        """
+        The parts of [start_time, end_time) not covered by the synced ranges.
+
+        A gap right after a synced range starts overlap_seconds early, to pick
+        up games that were still in progress when that range was synced.
+        """
+        windows = []
+        cursor, after_range = start_time, False
+        for covered_from, covered_until in ranges:
+            if covered_until < cursor:
+                continue
+            if covered_from >= end_time:
+                break
+            if covered_from > cursor:
+                windows.append((cursor - self.overlap_seconds if after_range else cursor, covered_from))
+            cursor, after_range = max(cursor, covered_until), True
+        if cursor < end_time:
+            windows.append((cursor - self.overlap_seconds if after_range else cursor, end_time))
+        return windows
@@ -0,0 +1,179 @@
+"""
+Compact prompt packing for Bedrock.
+
+Raw Riot participant dicts carry 100+ fields (nested challenges, perks,
+pings...), and pretty-printed JSON spends much of a prompt on whitespace.
+PromptBuilder projects match data to a curated set of columns, encodes rows
+as a pipe-separated table with a single header line, serializes other data
+as minified JSON with long lists capped, and trims table rows until the
+prompt fits a token budget.
+"""
+import json
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from config.settings import settings
+
+
+# Rough characters per token for English text, JSON and tables; errs towards overestimating tokens
+CHARS_PER_TOKEN = 3.5
+
+
+def _cs(participant: Dict) -> int:
+    """Lane plus jungle minions."""
+    return (participant.get("totalMinionsKilled") or 0) + (participant.get("neutralMinionsKilled") or 0)
+
+
+# Per-player columns sent to the model: header name -> value from a match-v5 participant
+PARTICIPANT_COLUMNS: Tuple[Tuple[str, Callable[[Dict], Any]], ...] = (
+    ("champion", lambda p: p.get("championName")),
+    ("role", lambda p: p.get("teamPosition") or p.get("individualPosition")),
+    ("win", lambda p: p.get("win")),
+    ("kills", lambda p: p.get("kills")),
+    ("deaths", lambda p: p.get("deaths")),
+    ("assists", lambda p: p.get("assists")),
+    ("cs", _cs),
+    ("gold", lambda p: p.get("goldEarned")),
+    ("damage", lambda p: p.get("totalDamageDealtToChampions")),
+    ("damage_taken", lambda p: p.get("totalDamageTaken")),
+    ("objective_damage", lambda p: p.get("damageDealtToObjectives")),
+    ("vision", lambda p: p.get("visionScore")),
+    ("wards_placed", lambda p: p.get("wardsPlaced")),
+    ("largest_multikill", lambda p: p.get("largestMultiKill")),
+    ("kill_participation", lambda p: (p.get("challenges") or {}).get("killParticipation")),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _cell(value: Any) -> str:
+    """Format one table cell compactly."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def _cap(value: Any, max_items: int) -> Any:
+    """Cap lists (recursively) to max_items and round floats, for compact JSON."""
+    if isinstance(value, dict):
+        return {key: _cap(item, max_items) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_cap(item, max_items) for item in value[:max_items]]
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+def compact_json(value: Any, max_items: Optional[int] = None) -> str:
+    """Minified JSON with lists capped at max_items entries and floats rounded to 2 places."""
+    max_items = max_items if max_items is not None else settings.prompt_max_list_items
+    return json.dumps(_cap(value, max_items), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def participant_row(participant: Dict) -> List[Any]:
+    """Project a match-v5 participant to the PARTICIPANT_COLUMNS values."""
+    return [getter(participant) for _, getter in PARTICIPANT_COLUMNS]
+
+
+def participant_columns() -> List[str]:
+    """Header names for participant_row."""
+    return [name for name, _ in PARTICIPANT_COLUMNS]
+
+
+def match_summary(match: Dict) -> Dict[str, Any]:
+    """The match-level facts worth sending: mode, duration and each team's result and objectives."""
+    info = match.get("info", {})
+    teams = {}
+    for team in info.get("teams", []):
+        objectives = team.get("objectives", {})
+        teams[str(team.get("teamId"))] = {
+            "win": team.get("win"),
+            **{name: objective.get("kills") for name, objective in objectives.items()}
+        }
+    return {
+        "match_id": match.get("metadata", {}).get("matchId"),
+        "mode": info.get("gameMode"),
+        "duration_minutes": round((info.get("gameDuration") or 0) / 60, 1),
+        "teams": teams
+    }
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt from text, compact JSON and table sections under a token budget.
+
+    Text and JSON sections are always kept. Table sections share whatever
+    budget is left and keep their first rows, so put the most relevant rows
+    (e.g. the most recent matches) first. A table keeps at least min_rows
+    rows even if that overruns the budget.
+    """
+
+    def __init__(self, budget_tokens: Optional[int] = None):
+        self.budget_tokens = budget_tokens if budget_tokens is not None else settings.prompt_token_budget
+        # Section text, or for tables (title, header, rows, min_rows)
+        self._sections: List[Any] = []
+
+    def text(self, text: str) -> "PromptBuilder":
+        """Add literal text (instructions, response format)."""
+        self._sections.append(text.strip("\n"))
+        return self
+
+    def data(self, title: str, value: Any, max_items: Optional[int] = None) -> "PromptBuilder":
+        """Add a titled value as compact JSON."""
+        self._sections.append(f"{title}:\n{compact_json(value, max_items)}")
+        return self
+
+    def table(self, title: str, columns: Sequence[str], rows: Sequence[Sequence[Any]],
+              min_rows: int = 1) -> "PromptBuilder":
+        """Add a titled pipe-separated table with a single header line."""
+        header = "|".join(columns)
+        lines = ["|".join(_cell(value) for value in row) for row in rows]
+        self._sections.append((title, header, lines, min_rows))
+        return self
+
+    def participants(self, title: str, participants: Sequence[Dict], min_rows: int = 1) -> "PromptBuilder":
+        """Add match-v5 participants as a table of the curated PARTICIPANT_COLUMNS."""
+        return self.table(title, participant_columns(), [participant_row(p) for p in participants], min_rows)
+
+    def build(self) -> str:
+        """Render the prompt, dropping trailing table rows until it fits the budget."""
+        fixed = sum(estimate_tokens(section) + 1 for section in self._sections if isinstance(section, str))
+        tables = [section for section in self._sections if not isinstance(section, str)]
+        available = self.budget_tokens - fixed
+
+        # Start each table at min_rows, then hand out the rest a row at a time in turn
+        # so every table gets a fair share of what is left
+        kept = {}
+        used = 0
+        for table in tables:
+            title, header, lines, min_rows = table
+            kept[id(table)] = min(min_rows, len(lines))
+            used += estimate_tokens(f"{title} (000 of 000 rows):\n{header}") + 1
+            used += sum(estimate_tokens(line) + 1 for line in lines[:kept[id(table)]])
+        growing = True
+        while growing:
+            growing = False
+            for table in tables:
+                lines = table[2]
+                count = kept[id(table)]
+                if count < len(lines) and used + estimate_tokens(lines[count]) + 1 <= available:
+                    kept[id(table)] = count + 1
+                    used += estimate_tokens(lines[count]) + 1
+                    growing = True
+
+        rendered = []
+        for section in self._sections:
+            if isinstance(section, str):
+                rendered.append(section)
+                continue
+            title, header, lines, _ = section
+            shown = lines[:kept[id(section)]]
+            note = f"{len(shown)} rows" if len(shown) == len(lines) else f"{len(shown)} of {len(lines)} rows"
+            rendered.append("\n".join([f"{title} ({note}):", header] + shown))
+        return "\n\n".join(rendered)
@@ -0,0 +1,202 @@
+"""
+Header-driven rate limiting for the Riot Games API.
+
+Riot enforces an application limit per routing value / platform host and a
+method limit per endpoint per host, each made of several windows (for example
+"20:1,100:120" = 20 requests per second and 100 per two minutes). Limits and
+current counts are reported back in the X-App-Rate-Limit(-Count) and
+X-Method-Rate-Limit(-Count) response headers.
+"""
+import asyncio
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+def parse_rate_limit_header(header: Optional[str]) -> List[Tuple[int, int]]:
+    """Parse a "value:window,value:window" header into (value, window_seconds) pairs."""
+    pairs = []
+    if not header:
+        return pairs
+    for part in header.split(","):
+        try:
+            value, window = part.strip().split(":")
+            pairs.append((int(value), int(window)))
+        except ValueError:
+            continue
+    return pairs
+
+
+def get_host_key(url: str) -> str:
+    """Get the rate-limit host key (routing value or platform, e.g. "americas", "na1") for a URL."""
+    hostname = urlparse(url).hostname or ""
+    return hostname.split(".")[0]
+
+
+class _WindowBucket:
+    """Token bucket for one rate-limit window; refills completely when the window resets."""
+
+    def __init__(self, capacity: int, window: int):
+        self.capacity = capacity
+        self.window = window
+        self.tokens = capacity
+        self.reset_at: Optional[float] = None  # Window starts with the first request, like Riot's
+
+    def _refill(self, now: float) -> None:
+        if self.reset_at is not None and now >= self.reset_at:
+            self.tokens = self.capacity
+            self.reset_at = None
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens > 0:
+            return 0.0
+        return max(0.0, self.reset_at - now)
+
+    def take(self, now: float) -> None:
+        if self.reset_at is None:
+            self.reset_at = now + self.window
+        self.tokens -= 1
+
+    def sync_count(self, count: int, now: float) -> None:
+        """Align with the count the server reports, which includes other workers' requests."""
+        self._refill(now)
+        if self.reset_at is None and count > 0:
+            self.reset_at = now + self.window
+        self.tokens = min(self.tokens, self.capacity - count)
+
+
+class RateLimitBucket:
+    """Multi-window bucket for a single scope (one app or method limit on one host)."""
+
+    def __init__(self, limits: List[Tuple[int, int]]):
+        self.limits = list(limits)
+        self.windows: Dict[int, _WindowBucket] = {
+            window: _WindowBucket(capacity, window) for capacity, window in limits
+        }
+        self.blocked_until = 0.0
+
+    def wait_time(self, now: float) -> float:
+        waits = [bucket.wait_time(now) for bucket in self.windows.values()]
+        return max([self.blocked_until - now, 0.0] + waits)
+
+    def take(self, now: float) -> None:
+        for bucket in self.windows.values():
+            bucket.take(now)
+
+    def update_limits(self, limits: List[Tuple[int, int]]) -> None:
+        """Replace the windows if the server reports different limits, keeping current usage."""
+        if not limits or sorted(limits) == sorted(self.limits):
+            return
+        windows = {}
+        for capacity, window in limits:
+            bucket = _WindowBucket(capacity, window)
+            old = self.windows.get(window)
+            if old is not None:
+                bucket.tokens = min(capacity, capacity - (old.capacity - old.tokens))
+                bucket.reset_at = old.reset_at
+            windows[window] = bucket
+        self.limits = list(limits)
+        self.windows = windows
+
+    def sync_counts(self, counts: List[Tuple[int, int]], now: float) -> None:
+        for count, window in counts:
+            bucket = self.windows.get(window)
+            if bucket is not None:
+                bucket.sync_count(count, now)
+
+
+class RiotRateLimiter:
+    """Tracks app and method rate limits per routing value / platform host."""
+
+    def __init__(self, default_app_limits: str = "20:1,100:120", retry_after_default: float = 1.0):
+        self.default_app_limits = parse_rate_limit_header(default_app_limits)
+        self.retry_after_default = retry_after_default
+        self._app_buckets: Dict[str, RateLimitBucket] = {}
+        self._method_buckets: Dict[Tuple[str, str], RateLimitBucket] = {}
+        self._lock = Lock()
+
+    def _app_bucket(self, host: str) -> RateLimitBucket:
+        bucket = self._app_buckets.get(host)
+        if bucket is None:
+            bucket = RateLimitBucket(self.default_app_limits)
+            self._app_buckets[host] = bucket
+        return bucket
+
+    def _scopes(self, host: str, method: str) -> List[RateLimitBucket]:
+        scopes = [self._app_bucket(host)]
+        # Method limits vary per endpoint, so they are only enforced once the server has reported them
+        method_bucket = self._method_buckets.get((host, method))
+        if method_bucket is not None:
+            scopes.append(method_bucket)
+        return scopes
+
+    def try_acquire(self, host: str, method: str) -> float:
+        """Take a token from every scope if all have one; otherwise return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            scopes = self._scopes(host, method)
+            wait = max(scope.wait_time(now) for scope in scopes)
+            if wait > 0:
+                return wait
+            for scope in scopes:
+                scope.take(now)
+            return 0.0
+
+    def acquire(self, host: str, method: str) -> None:
+        """Block the calling thread until a request to host/method is allowed."""
+        while True:
+            wait = self.try_acquire(host, method)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, host: str, method: str) -> None:
+        """Wait on the event loop until a request to host/method is allowed."""
+        while True:
+            wait = self.try_acquire(host, method)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, host: str, method: str, headers) -> None:
+        """Adopt the limits and counts reported in a response's rate-limit headers."""
+        app_limits = parse_rate_limit_header(headers.get("X-App-Rate-Limit"))
+        app_counts = parse_rate_limit_header(headers.get("X-App-Rate-Limit-Count"))
+        method_limits = parse_rate_limit_header(headers.get("X-Method-Rate-Limit"))
+        method_counts = parse_rate_limit_header(headers.get("X-Method-Rate-Limit-Count"))
+
+        with self._lock:
+            now = time.monotonic()
+            app_bucket = self._app_bucket(host)
+            app_bucket.update_limits(app_limits)
+            app_bucket.sync_counts(app_counts, now)
+
+            if method_limits:
+                key = (host, method)
+                method_bucket = self._method_buckets.get(key)
+                if method_bucket is None:
+                    method_bucket = RateLimitBucket(method_limits)
+                    self._method_buckets[key] = method_bucket
+                else:
+                    method_bucket.update_limits(method_limits)
+                method_bucket.sync_counts(method_counts, now)
+
+    def on_rate_limited(self, host: str, method: str, headers) -> float:
+        """Record a 429 response; returns the Retry-After delay that was applied."""
+        try:
+            retry_after = float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            retry_after = self.retry_after_default
+
+        limit_type = (headers.get("X-Rate-Limit-Type") or "").lower()
+        with self._lock:
+            blocked_until = time.monotonic() + retry_after
+            if limit_type == "method" and (host, method) in self._method_buckets:
+                bucket = self._method_buckets[(host, method)]
+            else:
+                # Application and service (underlying) limits block the whole host
+                bucket = self._app_bucket(host)
+            bucket.blocked_until = max(bucket.blocked_until, blocked_until)
+        return retry_after
@@ -5,162 +5,194 @@ import requests
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import time
+from requests.adapters import HTTPAdapter
 from config.settings import settings
+from src.services.rate_limiter import RiotRateLimiter, get_host_key
+from src.services.match_store import MatchStore
+from src.services.single_flight import SingleFlight
+from src.services.ttl_cache import TTLCache
+from src.services.deadline import cap_timeout, check_deadline
+
+
+# Platform hosts for summoner-v4 / league-v4
+REGIONAL_BASE_URLS = {
+    "na1": "https://na1.api.riotgames.com",
+    "euw1": "https://euw1.api.riotgames.com",
+    "eun1": "https://eun1.api.riotgames.com",
+    "kr": "https://kr.api.riotgames.com",
+    "br1": "https://br1.api.riotgames.com",
+    "la1": "https://la1.api.riotgames.com",
+    "la2": "https://la2.api.riotgames.com",
+    "oc1": "https://oc1.api.riotgames.com",
+    "ru": "https://ru.api.riotgames.com",
+    "tr1": "https://tr1.api.riotgames.com",
+    "jp1": "https://jp1.api.riotgames.com"
+}
+
+# Platform -> regional routing value for account-v1 / match-v5
+ROUTING_MAP = {
+    "na1": "americas",
+    "br1": "americas",
+    "la1": "americas",
+    "la2": "americas",
+    "euw1": "europe",
+    "eun1": "europe",
+    "tr1": "europe",
+    "ru": "europe",
+    "kr": "asia",
+    "jp1": "asia",
+    "oc1": "sea"
+}
+
+
+def parse_riot_id(summoner_name: str) -> tuple:
+    """Split a Riot ID (gameName#tagLine) into its parts, defaulting the tag to NA1."""
+    if '#' in summoner_name:
+        game_name, tag_line = summoner_name.split('#', 1)
+        return game_name, tag_line
+    return summoner_name, "NA1"
+
+
+def get_routing_base_url(region: str) -> str:
+    """Get the regional routing base URL for a platform region."""
+    routing = ROUTING_MAP.get(region, "americas")
+    return f"https://{routing}.api.riotgames.com"
+
+
+class RiotAPIError(Exception):
+    """Error returned by the Riot Games API, carrying the HTTP status when there is one."""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class RiotAPIClient:
     """Client for interacting with Riot Games API."""
     
-    def __init__(self):
+    def __init__(self, rate_limiter: Optional[RiotRateLimiter] = None, match_store: Optional[MatchStore] = None,
+                 lookup_cache: Optional[TTLCache] = None):
         self.api_key = settings.riot_api_key
         self.base_url = settings.riot_api_base_url  # Americas routing for match-v5
-        self.regional_base_urls = {
-            "na1": "https://na1.api.riotgames.com",
-            "euw1": "https://euw1.api.riotgames.com",
-            "eun1": "https://eun1.api.riotgames.com",
-            "kr": "https://kr.api.riotgames.com",
-            "br1": "https://br1.api.riotgames.com",
-            "la1": "https://la1.api.riotgames.com",
-            "la2": "https://la2.api.riotgames.com",
-            "oc1": "https://oc1.api.riotgames.com",
-            "ru": "https://ru.api.riotgames.com",
-            "tr1": "https://tr1.api.riotgames.com",
-            "jp1": "https://jp1.api.riotgames.com"
-        }
+        self.regional_base_urls = REGIONAL_BASE_URLS
         self.headers = {
             "X-Riot-Token": self.api_key
         }
-        self.rate_limit_delay = 1.2  # Respect rate limits (100 requests per 2 minutes)
-        self.last_request_time = 0
+        
+        # Reuse TCP/TLS connections across calls instead of a fresh handshake per request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=len(REGIONAL_BASE_URLS) + len(set(ROUTING_MAP.values())),
+                              pool_maxsize=settings.riot_connections_per_host)
+        self.session.mount("https://", adapter)
+        # Shared with the async client so both count against the same per-host limits
+        self.rate_limiter = rate_limiter or RiotRateLimiter(settings.riot_app_rate_limit)
+        self.match_store = match_store
+        # Concurrent identical requests (same URL and params) share one outbound call
+        self.single_flight = SingleFlight()
+        # Account, summoner and league lookups, shared with the async client when passed in
+        self.lookup_cache = lookup_cache if lookup_cache is not None else TTLCache(settings.lookup_cache_max_entries)
         self.request_timeout = 30  # 30 second timeout for all requests
         self.max_retries = 3  # Maximum retry attempts
     
-    def _make_request(self, endpoint: str, params: Optional[Dict] = None, timeout: Optional[int] = None, retries: int = None) -> Dict:
-        """Make a rate-limited API request with timeout and retry logic."""
+    def _request(self, url: str, method: str, params: Optional[Dict] = None,
+                 timeout: Optional[int] = None, retries: Optional[int] = None) -> Any:
+        """Make a request to a full Riot API URL, coalescing identical in-flight requests."""
+        key = (url, tuple(sorted(params.items())) if params else ())
+        return self.single_flight.do(key, self._send, url, method, params, timeout, retries)
+    
+    def _send(self, url: str, method: str, params: Optional[Dict] = None,
+              timeout: Optional[int] = None, retries: Optional[int] = None) -> Any:
+        """Make a rate-limited request to a full Riot API URL with timeout and retry logic."""
         if timeout is None:
             timeout = self.request_timeout
         if retries is None:
             retries = self.max_retries
         
-        # Rate limiting
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - time_since_last)
-        
-        url = f"{self.base_url}{endpoint}"
+        host = get_host_key(url)
         
         for attempt in range(retries):
+            check_deadline("Riot API request")
+            self.rate_limiter.acquire(host, method)
             try:
-                response = requests.get(url, headers=self.headers, params=params, timeout=timeout)
-                response.raise_for_status()
-                self.last_request_time = time.time()
-                return response.json()
+                response = self.session.get(url, params=params, timeout=cap_timeout(timeout))
             except requests.exceptions.Timeout:
                 if attempt < retries - 1:
-                    wait_time = (attempt + 1) * 2  # Exponential backoff: 2s, 4s, 6s
-                    time.sleep(wait_time)
+                    time.sleep(cap_timeout((attempt + 1) * 2))  # Backoff: 2s, 4s, 6s
                     continue
-                raise Exception(f"Request to Riot API timed out after {timeout} seconds (attempt {attempt + 1}/{retries}). Please check your connection and try again.")
+                raise RiotAPIError(f"Request to Riot API timed out after {timeout} seconds (attempt {attempt + 1}/{retries}). Please check your connection and try again.")
             except requests.exceptions.RequestException as e:
                 if attempt < retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    time.sleep(wait_time)
+                    time.sleep(cap_timeout((attempt + 1) * 2))
                     continue
-                raise Exception(f"Riot API request failed: {str(e)}")
+                raise RiotAPIError(f"Riot API request failed: {str(e)}")
+            
+            self.rate_limiter.update_from_headers(host, method, response.headers)
+            
+            if response.status_code == 429:
+                # The limiter holds back further requests to this scope for Retry-After seconds
+                self.rate_limiter.on_rate_limited(host, method, response.headers)
+                if attempt < retries - 1:
+                    continue
+            elif response.status_code >= 500 and attempt < retries - 1:
+                time.sleep(cap_timeout((attempt + 1) * 2))
+                continue
+            
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                raise RiotAPIError(f"Riot API request failed: {str(e)}", response.status_code)
+            return response.json()
+        
+        raise RiotAPIError("Failed to complete request after all retry attempts.")
+    
+    def _cached_request(self, cache_key: tuple, ttl: int, url: str, method: str) -> Any:
+        """Make a request through the lookup cache, also remembering 404s for a short while."""
+        cached = self.lookup_cache.get(cache_key)
+        if cached is not None:
+            if cached.get("not_found"):
+                raise RiotAPIError(cached["message"], 404)
+            return cached["value"]
         
-        raise Exception("Failed to complete request after all retry attempts.")
+        try:
+            value = self._request(url, method)
+        except RiotAPIError as e:
+            if e.status_code == 404:
+                self.lookup_cache.set(cache_key, {"not_found": True, "message": str(e)},
+                                      settings.riot_not_found_cache_ttl)
+            raise
+        self.lookup_cache.set(cache_key, {"value": value}, ttl)
+        return value
+    
+    def _make_request(self, endpoint: str, params: Optional[Dict] = None, timeout: Optional[int] = None,
+                      retries: int = None, method: Optional[str] = None) -> Any:
+        """Make a rate-limited API request against the match-v5 routing host."""
+        return self._request(f"{self.base_url}{endpoint}", method or endpoint, params, timeout, retries)
     
     def get_summoner_by_name(self, summoner_name: str, region: str = "na1") -> Dict:
         """Get summoner information by Riot ID (gameName#tagLine)."""
         # Parse Riot ID format (gameName#tagLine)
-        if '#' in summoner_name:
-            game_name, tag_line = summoner_name.split('#', 1)
-        else:
-            # If no tag provided, assume NA1
-            game_name = summoner_name
-            tag_line = "NA1"
+        game_name, tag_line = parse_riot_id(summoner_name)
         
         # First, get account info using Riot ID
-        # Map region to routing value
-        routing_map = {
-            "na1": "americas",
-            "br1": "americas",
-            "la1": "americas",
-            "la2": "americas",
-            "euw1": "europe",
-            "eun1": "europe",
-            "tr1": "europe",
-            "ru": "europe",
-            "kr": "asia",
-            "jp1": "asia",
-            "oc1": "sea"
-        }
-        routing = routing_map.get(region, "americas")
-        routing_base = f"https://{routing}.api.riotgames.com"
-        
-        # Get account by Riot ID
-        account_endpoint = f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-        url = f"{routing_base}{account_endpoint}"
-        
-        # Rate limiting
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - time_since_last)
-        
-        # Retry logic for account lookup
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(url, headers=self.headers, timeout=self.request_timeout)
-                response.raise_for_status()
-                self.last_request_time = time.time()
-                account = response.json()
-                break
-            except requests.exceptions.Timeout:
-                if attempt < self.max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-                raise Exception(f"Request to Riot API timed out (attempt {attempt + 1}/{self.max_retries}). Please check your connection.")
-            except requests.exceptions.RequestException as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-                raise Exception(f"Riot API request failed: {str(e)}")
-        else:
-            raise Exception("Failed to get account info after all retry attempts.")
+        routing_base = get_routing_base_url(region)
+        account_url = f"{routing_base}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        # Riot IDs are case-insensitive, so normalize the cache key
+        account = self._cached_request(("account", routing_base, game_name.lower(), tag_line.lower()),
+                                       settings.riot_account_cache_ttl, account_url, "account-v1.getByRiotId")
         
         # Now get summoner info using PUUID
         puuid = account.get("puuid")
         if not puuid:
             raise Exception("PUUID not found in account response")
         
-        # Get summoner by PUUID
         regional_url = self.regional_base_urls.get(region, self.regional_base_urls["na1"])
-        summoner_endpoint = f"/lol/summoner/v4/summoners/by-puuid/{puuid}"
-        summoner_url = f"{regional_url}{summoner_endpoint}"
+        summoner_url = f"{regional_url}/lol/summoner/v4/summoners/by-puuid/{puuid}"
+        # Copy before merging: coalesced responses are shared with other callers
+        summoner = dict(self._cached_request(("summoner", regional_url, puuid), settings.riot_summoner_cache_ttl,
+                                             summoner_url, "summoner-v4.getByPUUID"))
         
-        # Retry logic for summoner lookup
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(summoner_url, headers=self.headers, timeout=self.request_timeout)
-                response.raise_for_status()
-                
-                # Merge account and summoner data
-                summoner = response.json()
-                break
-            except requests.exceptions.Timeout:
-                if attempt < self.max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-                raise Exception(f"Request to Riot API timed out (attempt {attempt + 1}/{self.max_retries}). Please check your connection.")
-            except requests.exceptions.RequestException as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-                raise Exception(f"Riot API request failed: {str(e)}")
-        else:
-            raise Exception("Failed to get summoner info after all retry attempts.")
+        # Merge account and summoner data
         summoner["puuid"] = puuid
         summoner["gameName"] = account.get("gameName")
         summoner["tagLine"] = account.get("tagLine")
@@ -170,59 +202,76 @@ class RiotAPIClient:
     def get_summoner_by_puuid(self, puuid: str) -> Dict:
         """Get summoner information by PUUID."""
         endpoint = f"/riot/account/v1/accounts/by-puuid/{puuid}"
-        return self._make_request(endpoint)
+        return self._make_request(endpoint, method="account-v1.getByPuuid")
     
-    def get_match_history(self, puuid: str, start: int = 0, count: int = 100) -> List[str]:
-        """Get match history IDs for a player."""
+    def get_match_history(self, puuid: str, start: int = 0, count: int = 100,
+                          start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[str]:
+        """Get match history IDs for a player, optionally limited to an epoch-seconds window."""
         endpoint = f"/lol/match/v5/matches/by-puuid/{puuid}/ids"
         params = {
             "start": start,
             "count": count
         }
-        return self._make_request(endpoint, params)
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        if end_time is not None:
+            params["endTime"] = int(end_time)
+        return self._make_request(endpoint, params, method="match-v5.getMatchIdsByPUUID")
     
     def get_match_details(self, match_id: str) -> Dict:
-        """Get detailed match information."""
+        """Get detailed match information, reading through the local match store."""
+        if self.match_store is not None:
+            match = self.match_store.get(match_id)
+            if match is not None:
+                return match
+        
         endpoint = f"/lol/match/v5/matches/{match_id}"
-        return self._make_request(endpoint)
+        match = self._make_request(endpoint, method="match-v5.getMatch")
+        
+        if self.match_store is not None and match.get("info"):
+            self.match_store.put(match_id, match)
+        return match
     
-    def get_full_year_matches(self, puuid: str, year: int = 2024) -> List[Dict]:
-        """Get all matches for a specific year."""
+    def get_match_ids_in_range(self, puuid: str, start_time: int, end_time: int) -> List[str]:
+        """Get all match IDs in an epoch-seconds window, letting match-v5 filter server-side."""
         all_match_ids = []
         start = 0
         batch_size = 100
         
-        # Fetch all match IDs
         while True:
-            match_ids = self.get_match_history(puuid, start=start, count=batch_size)
-            if not match_ids:
-                break
-            
+            match_ids = self.get_match_history(puuid, start=start, count=batch_size,
+                                               start_time=start_time, end_time=end_time)
             all_match_ids.extend(match_ids)
-            start += batch_size
             
-            # Rate limiting - be conservative
-            time.sleep(0.1)
+            # A short page is the last page
+            if len(match_ids) < batch_size:
+                break
+            start += batch_size
         
-        # Filter matches by year
-        year_matches = []
-        year_start = datetime(year, 1, 1).timestamp() * 1000
-        year_end = datetime(year + 1, 1, 1).timestamp() * 1000
+        return all_match_ids
+    
+    def get_matches_in_range(self, puuid: str, start_time: int, end_time: int) -> List[Dict]:
+        """Get match details for all of a player's matches in an epoch-seconds window."""
+        matches = []
         
-        for match_id in all_match_ids:
+        for match_id in self.get_match_ids_in_range(puuid, start_time, end_time):
             try:
                 match = self.get_match_details(match_id)
-                match_timestamp = match.get("info", {}).get("gameCreation", 0)
-                
-                if year_start <= match_timestamp < year_end:
-                    year_matches.append(match)
-                
-                time.sleep(0.1)  # Rate limiting
             except Exception as e:
                 print(f"Error fetching match {match_id}: {e}")
                 continue
+            
+            match_timestamp = match.get("info", {}).get("gameCreation", 0)
+            if start_time * 1000 <= match_timestamp < end_time * 1000:
+                matches.append(match)
         
-        return year_matches
+        return matches
+    
+    def get_full_year_matches(self, puuid: str, year: int = 2024) -> List[Dict]:
+        """Get all matches for a specific year."""
+        year_start = int(datetime(year, 1, 1).timestamp())
+        year_end = int(datetime(year + 1, 1, 1).timestamp())
+        return self.get_matches_in_range(puuid, year_start, year_end)
     
     def get_player_match_data(self, match: Dict, puuid: str) -> Optional[Dict]:
         """Extract player-specific data from a match."""
@@ -235,34 +284,9 @@ class RiotAPIClient:
     def get_league_entries_by_puuid(self, puuid: str, region: str = "na1") -> List[Dict]:
         """Get league entries for a player by PUUID."""
         regional_url = self.regional_base_urls.get(region, self.regional_base_urls["na1"])
-        endpoint = f"/lol/league/v4/entries/by-puuid/{puuid}"
-        url = f"{regional_url}{endpoint}"
-        
-        # Rate limiting
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - time_since_last)
-        
-        # Retry logic for league entries
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(url, headers=self.headers, timeout=self.request_timeout)
-                response.raise_for_status()
-                self.last_request_time = time.time()
-                return response.json()
-            except requests.exceptions.Timeout:
-                if attempt < self.max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-                raise Exception(f"Request to Riot API timed out (attempt {attempt + 1}/{self.max_retries}). Please check your connection.")
-            except requests.exceptions.RequestException as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-                raise Exception(f"Riot API request failed: {str(e)}")
-        else:
-            raise Exception("Failed to get league entries after all retry attempts.")
+        url = f"{regional_url}/lol/league/v4/entries/by-puuid/{puuid}"
+        return self._cached_request(("league", regional_url, puuid), settings.riot_league_cache_ttl,
+                                    url, "league-v4.getLeagueEntriesByPUUID")
     
     def get_rank_info(self, puuid: str, region: str = "na1") -> Dict:
         """Get formatted rank information for a player."""
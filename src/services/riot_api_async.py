@@ -0,0 +1,249 @@
+"""
+Asyncio Riot Games API client with pooled connections and concurrent match fetching.
+"""
+import asyncio
+import aiohttp
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import settings
+from src.services.rate_limiter import RiotRateLimiter, get_host_key
+from src.services.match_store import MatchStore
+from src.services.single_flight import AsyncSingleFlight
+from src.services.ttl_cache import TTLCache
+from src.services.deadline import cap_timeout, check_deadline
+from src.services.riot_api import REGIONAL_BASE_URLS, RiotAPIError, parse_riot_id, get_routing_base_url
+
+
+class AsyncRiotAPIClient:
+    """Asyncio client for the Riot Games API backed by per-host aiohttp connection pools."""
+
+    def __init__(self, max_concurrency: Optional[int] = None, connections_per_host: Optional[int] = None,
+                 rate_limiter: Optional[RiotRateLimiter] = None, match_store: Optional[MatchStore] = None,
+                 lookup_cache: Optional[TTLCache] = None, io_executor: Optional[Any] = None):
+        self.api_key = settings.riot_api_key
+        self.base_url = settings.riot_api_base_url  # Americas routing for match-v5
+        self.regional_base_urls = REGIONAL_BASE_URLS
+        self.headers = {
+            "X-Riot-Token": self.api_key
+        }
+        self.max_concurrency = max_concurrency or settings.riot_max_concurrency
+        self.connections_per_host = connections_per_host or settings.riot_connections_per_host
+        self.rate_limiter = rate_limiter or RiotRateLimiter(settings.riot_app_rate_limit)
+        self.match_store = match_store
+        # Concurrent identical requests (same URL and params) share one outbound call
+        self.single_flight = AsyncSingleFlight()
+        self.lookup_cache = lookup_cache if lookup_cache is not None else TTLCache(settings.lookup_cache_max_entries)
+        # Runs match store and SQLite-backed cache calls off the loop; anything with submit() returning
+        # a concurrent.futures.Future (e.g. a BoundedExecutor). None uses the loop's default executor.
+        self.io_executor = io_executor
+        self.request_timeout = 30  # 30 second timeout for all requests
+        self.max_retries = 3  # Maximum retry attempts
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the pooled session, creating it on the running event loop if needed."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # aiohttp keys its connection pool by host, so limit_per_host gives one pool per Riot host
+            connector = aiohttp.TCPConnector(
+                limit=0,
+                limit_per_host=self.connections_per_host,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    async def _blocking(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a blocking call (SQLite, compression) on the I/O executor instead of the event loop."""
+        if self.io_executor is None:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        return await asyncio.wrap_future(self.io_executor.submit(fn, *args))
+
+    async def _lookup_get(self, cache_key: tuple):
+        """Read the lookup cache, going to the executor only when a SQLite backend may be hit."""
+        if self.lookup_cache.backend is None:
+            return self.lookup_cache.get(cache_key)
+        return await self._blocking(self.lookup_cache.get, cache_key)
+
+    async def _lookup_set(self, cache_key: tuple, value: Dict, ttl: int) -> None:
+        """Write the lookup cache, going to the executor only when it writes through to SQLite."""
+        if self.lookup_cache.backend is None:
+            self.lookup_cache.set(cache_key, value, ttl)
+        else:
+            await self._blocking(self.lookup_cache.set, cache_key, value, ttl)
+
+    async def close(self) -> None:
+        """Close the underlying connection pools."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _make_request(self, url: str, method: str, params: Optional[Dict] = None,
+                            retries: Optional[int] = None):
+        """Make an API request, coalescing identical in-flight requests."""
+        key = (url, tuple(sorted(params.items())) if params else ())
+        return await self.single_flight.do(key, self._send, url, method, params, retries)
+
+    async def _send(self, url: str, method: str, params: Optional[Dict] = None,
+                    retries: Optional[int] = None):
+        """Make a rate-limited API request with timeout and retry logic."""
+        if retries is None:
+            retries = self.max_retries
+
+        session = self._get_session()
+        host = get_host_key(url)
+        async with self._semaphore:
+            for attempt in range(retries):
+                check_deadline("Riot API request")
+                await self.rate_limiter.acquire_async(host, method)
+                try:
+                    timeout = aiohttp.ClientTimeout(total=cap_timeout(self.request_timeout))
+                    async with session.get(url, params=params, timeout=timeout) as response:
+                        self.rate_limiter.update_from_headers(host, method, response.headers)
+                        if response.status == 429:
+                            self.rate_limiter.on_rate_limited(host, method, response.headers)
+                            if attempt < retries - 1:
+                                continue
+                        elif response.status >= 500 and attempt < retries - 1:
+                            await asyncio.sleep(cap_timeout((attempt + 1) * 2))
+                            continue
+                        if response.status >= 400:
+                            raise RiotAPIError(
+                                f"Riot API request failed: {response.status} {response.reason} for url: {response.url}",
+                                response.status
+                            )
+                        return await response.json()
+                except asyncio.TimeoutError:
+                    if attempt < retries - 1:
+                        await asyncio.sleep(cap_timeout((attempt + 1) * 2))  # Backoff: 2s, 4s, 6s
+                        continue
+                    raise RiotAPIError(f"Request to Riot API timed out after {self.request_timeout} seconds (attempt {attempt + 1}/{retries}). Please check your connection and try again.")
+                except aiohttp.ClientError as e:
+                    if attempt < retries - 1:
+                        await asyncio.sleep(cap_timeout((attempt + 1) * 2))
+                        continue
+                    raise RiotAPIError(f"Riot API request failed: {str(e)}")
+
+        raise RiotAPIError("Failed to complete request after all retry attempts.")
+
+    async def _cached_request(self, cache_key: tuple, ttl: int, url: str, method: str):
+        """Make a request through the lookup cache, also remembering 404s for a short while."""
+        cached = await self._lookup_get(cache_key)
+        if cached is not None:
+            if cached.get("not_found"):
+                raise RiotAPIError(cached["message"], 404)
+            return cached["value"]
+
+        try:
+            value = await self._make_request(url, method)
+        except RiotAPIError as e:
+            if e.status_code == 404:
+                await self._lookup_set(cache_key, {"not_found": True, "message": str(e)},
+                                       settings.riot_not_found_cache_ttl)
+            raise
+        await self._lookup_set(cache_key, {"value": value}, ttl)
+        return value
+
+    async def get_summoner_by_name(self, summoner_name: str, region: str = "na1") -> Dict:
+        """Get summoner information by Riot ID (gameName#tagLine)."""
+        game_name, tag_line = parse_riot_id(summoner_name)
+
+        routing_base = get_routing_base_url(region)
+        account_url = f"{routing_base}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        account = await self._cached_request(("account", routing_base, game_name.lower(), tag_line.lower()),
+                                             settings.riot_account_cache_ttl, account_url, "account-v1.getByRiotId")
+
+        puuid = account.get("puuid")
+        if not puuid:
+            raise Exception("PUUID not found in account response")
+
+        regional_url = self.regional_base_urls.get(region, self.regional_base_urls["na1"])
+        # Copy before merging: coalesced responses are shared with other callers
+        summoner = dict(await self._cached_request(("summoner", regional_url, puuid), settings.riot_summoner_cache_ttl,
+                                                   f"{regional_url}/lol/summoner/v4/summoners/by-puuid/{puuid}",
+                                                   "summoner-v4.getByPUUID"))
+        summoner["puuid"] = puuid
+        summoner["gameName"] = account.get("gameName")
+        summoner["tagLine"] = account.get("tagLine")
+
+        return summoner
+
+    async def get_match_history(self, puuid: str, start: int = 0, count: int = 100,
+                                start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[str]:
+        """Get match history IDs for a player, optionally limited to an epoch-seconds window."""
+        url = f"{self.base_url}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        params = {"start": start, "count": count}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        if end_time is not None:
+            params["endTime"] = int(end_time)
+        return await self._make_request(url, "match-v5.getMatchIdsByPUUID", params)
+
+    async def get_match_ids_in_range(self, puuid: str, start_time: int, end_time: int) -> List[str]:
+        """Get all match IDs in an epoch-seconds window, letting match-v5 filter server-side."""
+        all_match_ids = []
+        start = 0
+        batch_size = 100
+
+        while True:
+            match_ids = await self.get_match_history(puuid, start=start, count=batch_size,
+                                                     start_time=start_time, end_time=end_time)
+            all_match_ids.extend(match_ids)
+            if len(match_ids) < batch_size:
+                break
+            start += batch_size
+
+        return all_match_ids
+
+    async def get_matches_in_range(self, puuid: str, start_time: int, end_time: int) -> List[Dict]:
+        """Get match details for all of a player's matches in an epoch-seconds window."""
+        match_ids = await self.get_match_ids_in_range(puuid, start_time, end_time)
+        matches = await self.get_match_details_many(match_ids, skip_errors=True)
+        return [
+            match for match in matches
+            if start_time * 1000 <= match.get("info", {}).get("gameCreation", 0) < end_time * 1000
+        ]
+
+    async def get_match_details(self, match_id: str) -> Dict:
+        """Get detailed match information, reading through the local match store."""
+        # The store reads SQLite and decompresses, so it runs on the I/O executor, not the loop
+        if self.match_store is not None:
+            match = await self._blocking(self.match_store.get, match_id)
+            if match is not None:
+                return match
+
+        match = await self._make_request(f"{self.base_url}/lol/match/v5/matches/{match_id}", "match-v5.getMatch")
+
+        if self.match_store is not None and match.get("info"):
+            await self._blocking(self.match_store.put, match_id, match)
+        return match
+
+    async def get_match_details_many(self, match_ids: List[str], skip_errors: bool = False) -> List[Dict]:
+        """
+        Fetch many matches concurrently, bounded by max_concurrency.
+
+        Results keep the order of match_ids. With skip_errors, failed matches are
+        dropped instead of failing the whole batch.
+        """
+        results = await asyncio.gather(
+            *(self.get_match_details(match_id) for match_id in match_ids),
+            return_exceptions=True
+        )
+
+        matches = []
+        for match_id, result in zip(match_ids, results):
+            if isinstance(result, BaseException):
+                if not skip_errors:
+                    raise result
+                print(f"Error fetching match {match_id}: {result}")
+                continue
+            matches.append(result)
+        return matches
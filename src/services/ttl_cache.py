@@ -0,0 +1,179 @@
+"""
+Tiered time-to-live cache.
+
+Entries live in a bounded in-process LRU and, optionally, in a shared
+SQLite key/value table so several worker processes see each other's
+entries. Each entry carries its own expiry, so one cache can hold data with
+different lifetimes (e.g. PUUIDs for a day, rank for a few minutes).
+"""
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class SQLiteCacheBackend:
+    """
+    Shared key/value table with per-entry expiry; values are stored as JSON.
+
+    With max_entries, every PRUNE_INTERVAL writes expired rows are deleted
+    and, if the table is still too big, the rows closest to expiry go next.
+    """
+
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, path: str, table: str = "kv_cache", max_entries: Optional[int] = None):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_expires ON {table} (expires_at)")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Get (value, expires_at) for a live entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Store a JSON-serializable value until expires_at (epoch seconds)."""
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, separators=(",", ":")), expires_at)
+            )
+            self._writes += 1
+            if self.max_entries is not None and self._writes % self.PRUNE_INTERVAL == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Drop expired rows, then the soonest-expiring rows beyond max_entries. Caller holds the lock."""
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+
+    def delete(self, key: str) -> None:
+        """Remove an entry."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class TTLCache:
+    """Bounded in-process LRU with per-entry TTLs, backed by an optional shared backend."""
+
+    def __init__(self, max_entries: int = 10000, backend: Optional[SQLiteCacheBackend] = None,
+                 namespace: str = ""):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def _backend_key(self, key: Hashable) -> str:
+        """Stable string key for the shared backend."""
+        parts = key if isinstance(key, tuple) else (key,)
+        return self.namespace + ":" + "|".join(str(part) for part in parts)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry, checking the in-process tier before the shared backend."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+
+        if self.backend is not None:
+            found = self.backend.get(self._backend_key(key))
+            if found is not None:
+                with self._lock:
+                    self._store_local(key, found[0], found[1])
+                    self.hits += 1
+                return found[0]
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds in every tier."""
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._store_local(key, value, expires_at)
+        if self.backend is not None:
+            self.backend.set(self._backend_key(key), value, expires_at)
+
+    def _store_local(self, key: Hashable, value: Any, expires_at: float) -> None:
+        """Insert into the in-process tier, evicting least-recently-used entries. Caller holds the lock."""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove an entry from every tier."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(self._backend_key(key))
+
+    def clear(self) -> None:
+        """Drop all in-process entries (the shared backend is left alone)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Get hit/miss counters and size information."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total * 100) if total > 0 else 0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "shared_backend": self.backend is not None
+            }
@@ -1,13 +1,19 @@
 """
 Tests for multi-agent system.
 """
+import json
+import time
 import pytest
 from src.agents.context_manager import ContextManager
 from src.agents.registry import AgentRegistry
 from src.agents.orchestrator import Orchestrator
 from src.agents.match_analysis_agent import MatchAnalysisAgent
 from src.agents.insights_agent import InsightsAgent
-from src.agents.messages import create_request
+from src.agents.visualization_agent import VisualizationAgent
+from src.agents.messages import create_request, create_response
+from src.agents.base_agent import BaseAgent
+from src.services.deadline import remaining
+from src.agents.events import EventBus, EventType, AgentEvent, JsonLinesEventSink, parse_sample_rates
 
 
 def test_context_manager():
@@ -33,6 +39,56 @@ def test_context_manager():
     assert context.get_version() == initial_version + 1
 
 
+def test_context_manager_history_is_bounded_and_reads_are_snapshots():
+    """Test that history keeps only the latest changes and get_all is a read-only snapshot."""
+    context = ContextManager(history_size=3)
+    context.set("a", 1, "agent")
+    snapshot = context.get_all()
+    for i in range(5):
+        context.update({"b": i, "c": i})
+    
+    history = context.get_history()
+    assert [change.version for change in history] == [4, 5, 6]
+    assert history[-1].action == "update" and history[-1].keys == ("b", "c")
+    assert history[0].timestamp <= history[-1].timestamp
+    
+    # The earlier snapshot is unaffected by later writes and can't be modified
+    assert dict(snapshot) == {"a": 1}
+    with pytest.raises(TypeError):
+        snapshot["a"] = 2
+    assert context.get_all() == {"a": 1, "b": 4, "c": 4}
+    
+    context.clear()
+    assert context.get_all() == {}
+    assert [change.action for change in context.get_history()] == ["clear"]
+
+
+def test_event_bus_dispatches_in_background_to_batched_sinks(tmp_path):
+    """Test async dispatch, the bounded history, sampling and the JSON-lines sink."""
+    path = tmp_path / "events.jsonl"
+    bus = EventBus(history_size=5, async_dispatch=True, sink_batch_size=4,
+                   sample_rates=parse_sample_rates("context_updated:0"),
+                   sinks=[JsonLinesEventSink(str(path))])
+    received = []
+    bus.subscribe(EventType.AGENT_COMPLETED, lambda event: (time.sleep(0.05), received.append(event)))
+    
+    start = time.monotonic()
+    for i in range(10):
+        bus.publish(AgentEvent(EventType.AGENT_COMPLETED, "agent", {"i": i}))
+        bus.publish(AgentEvent(EventType.CONTEXT_UPDATED, "agent"))
+    # Publishing doesn't wait for the slow subscriber
+    assert time.monotonic() - start < 0.25
+    
+    bus.close()
+    
+    assert [event.data["i"] for event in received] == list(range(10))
+    assert [event.data["i"] for event in bus.get_history()] == list(range(5, 10))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["data"]["i"] for line in lines] == list(range(10))
+    assert all(line["event_type"] == "agent_completed" for line in lines)
+    assert bus.stats()["sampled_out"] == 10
+
+
 def test_agent_registry():
     """Test agent registry."""
     context = ContextManager()
@@ -100,3 +156,283 @@ def test_orchestrator():
     # Cleanup
     orchestrator.shutdown()
 
+
+
+class SleepyAgent(BaseAgent):
+    """Agent that sleeps, records when it ran and writes one context key."""
+    
+    def __init__(self, name, context_manager, output_key, runs):
+        super().__init__(name, context_manager)
+        self.output_key = output_key
+        self.runs = runs
+    
+    def _setup(self):
+        pass
+    
+    def execute(self, request):
+        start = time.monotonic()
+        time.sleep(0.2)
+        self.runs[self.name] = (start, time.monotonic(), dict(request.input_data))
+        return create_response(request, True, context_updates={self.output_key: self.name})
+
+
+def test_workflow_runs_independent_steps_concurrently():
+    """Test that steps run once their inputs exist and independent steps overlap."""
+    context = ContextManager()
+    registry = AgentRegistry()
+    orchestrator = Orchestrator(context, registry)
+    runs = {}
+    for name, key in [("producer", "base"), ("left", "left_out"), ("right", "right_out")]:
+        registry.register(SleepyAgent(name, context, key, runs))
+    
+    results = orchestrator.execute_workflow([
+        {"id": "producer", "agent": "producer", "task": "run", "output_keys": ["base"]},
+        {"id": "left", "agent": "left", "task": "run", "context_keys": ["base"], "output_keys": ["left_out"]},
+        {"id": "right", "agent": "right", "task": "run", "context_keys": ["base"], "output_keys": ["right_out"]},
+        {"id": "missing", "agent": "nobody", "task": "run"},
+        {"id": "after_missing", "agent": "left", "task": "run", "depends_on": ["missing"]},
+    ])
+    
+    assert list(results) == ["producer", "left", "right", "missing", "after_missing"]
+    assert all(results[step].success for step in ["producer", "left", "right"])
+    assert runs["left"][2]["base"] == "producer"
+    assert runs["left"][0] >= runs["producer"][1]
+    assert runs["right"][0] >= runs["producer"][1]
+    # The two consumers only share a dependency, so they run at the same time
+    assert runs["left"][0] < runs["right"][1] and runs["right"][0] < runs["left"][1]
+    assert results["missing"].success is False
+    assert results["after_missing"].error == "Skipped: dependency 'missing' failed"
+    
+    with pytest.raises(ValueError):
+        orchestrator.execute_workflow([{"agent": "left", "task": "run", "depends_on": ["later"]}])
+    
+    orchestrator.shutdown()
+
+
+def test_workflows_use_isolated_request_contexts():
+    """Test that workflows running at the same time each see only their own context."""
+    context = ContextManager()
+    registry = AgentRegistry()
+    orchestrator = Orchestrator(context, registry)
+    runs = {}
+    registry.register(SleepyAgent("producer", context, "base", runs))
+    registry.register(SleepyAgent("consumer", context, "out", runs))
+    
+    def run(tag):
+        request_context = ContextManager()
+        request_context.set("tag", tag)
+        orchestrator.execute_workflow([
+            {"id": "producer", "agent": "producer", "task": "run", "output_keys": ["base"]},
+            {"id": "consumer", "agent": "consumer", "task": "run", "context_keys": ["base", "tag"]},
+        ], request_context)
+        return request_context.get_all()
+    
+    first, second = list(orchestrator.executor.map(run, ["a", "b"]))
+    
+    assert first["tag"] == "a" and second["tag"] == "b"
+    assert first["out"] == second["out"] == "consumer"
+    # Nothing leaks into the global context
+    assert context.get_all() == {}
+    
+    orchestrator.shutdown()
+
+
+class CountingAgent(BaseAgent):
+    """Cacheable agent that counts how often it actually runs."""
+    
+    cacheable_tasks = ("count",)
+    
+    def __init__(self, context_manager):
+        super().__init__("counting", context_manager)
+        self.calls = 0
+    
+    def _setup(self):
+        pass
+    
+    def execute(self, request):
+        self.calls += 1
+        return create_response(request, True, result={"calls": self.calls},
+                               context_updates={"count": len(request.input_data["matches"])})
+
+
+class OneChartGenerator:
+    """Visualization generator that can only draw the win rate chart."""
+    
+    def generate_win_rate_chart(self, matches, puuid):
+        return {"image": "x" * 10000}
+    
+    def __getattr__(self, name):
+        def unavailable(*args):
+            raise ValueError("no data")
+        return unavailable
+
+
+def test_results_go_to_context_listeners_and_events_stay_small():
+    """Test that full results reach the request context's listeners while RESULT_READY events carry no payload."""
+    bus = EventBus(async_dispatch=False)
+    agent = VisualizationAgent(ContextManager(), bus, viz_generator=OneChartGenerator())
+    context = ContextManager()
+    received = []
+    context.add_result_listener(received.append)
+    
+    response = agent.handle_request(create_request(
+        "visualization", "generate_visualizations",
+        {"matches": [{}], "puuid": "me", "match_analysis": {}}, context=context
+    ))
+    
+    assert response.success
+    assert received[0]["chart"] == "win_rate_chart"
+    assert received[0]["visualization"] == {"image": "x" * 10000}
+    assert received[1]["result"]["visualizations"] == {"win_rate_chart": {"image": "x" * 10000}}
+    events = [event for event in bus.get_history() if event.event_type == EventType.RESULT_READY]
+    assert [event.data for event in events] == [
+        {"agent": "visualization", "task": "generate_visualizations",
+         "session_id": context.get_session_id(), "chart": "win_rate_chart"},
+        {"agent": "visualization", "task": "generate_visualizations",
+         "session_id": context.get_session_id()},
+    ]
+
+
+def test_cacheable_agent_results_are_reused_for_identical_inputs():
+    """Test that the same match set (in any order) hits the result cache and still updates the context."""
+    global_context = ContextManager()
+    registry = AgentRegistry()
+    orchestrator = Orchestrator(global_context, registry)
+    agent = CountingAgent(global_context)
+    registry.register(agent)
+    matches = [{"metadata": {"matchId": f"NA1_{i}"}, "info": {}} for i in range(3)]
+    
+    first = orchestrator.delegate("counting", "count", {"matches": matches, "puuid": "me"})
+    request_context = ContextManager()
+    second = orchestrator.delegate("counting", "count", {"matches": matches[::-1], "puuid": "me"},
+                                   context=request_context)
+    third = orchestrator.delegate("counting", "count", {"matches": matches[:2], "puuid": "me"})
+    
+    assert agent.calls == 2
+    assert first.result == second.result == {"calls": 1}
+    assert request_context.get("count") == 3
+    assert third.result == {"calls": 2}
+    assert global_context.result_cache_stats()["hits"] == 1
+    # Request contexts never cache results, so they never build a cache
+    assert request_context._result_cache is None
+    
+    orchestrator.shutdown()
+
+
+class DeadlineProbeAgent(BaseAgent):
+    """Agent that records how much time its request had left."""
+    
+    def __init__(self, context_manager):
+        super().__init__("probe", context_manager)
+        self.remaining = []
+    
+    def _setup(self):
+        pass
+    
+    def execute(self, request):
+        self.remaining.append(remaining())
+        return create_response(request, True)
+
+
+def test_workflow_deadlines_return_partial_results():
+    """Test step timeouts, workflow deadlines and deadline propagation into agents."""
+    context = ContextManager()
+    registry = AgentRegistry()
+    orchestrator = Orchestrator(context, registry)
+    probe = DeadlineProbeAgent(context)
+    registry.register(SleepyAgent("slow", context, "base", {}))
+    registry.register(probe)
+    
+    start = time.monotonic()
+    results = orchestrator.execute_workflow([
+        {"id": "slow", "agent": "slow", "task": "run", "output_keys": ["base"], "timeout": 0.05},
+        {"id": "after_slow", "agent": "probe", "task": "run", "context_keys": ["base"]},
+        {"id": "probe", "agent": "probe", "task": "run"},
+    ], timeout=5)
+    
+    assert time.monotonic() - start < 0.15
+    assert results["slow"].error == "Timed out"
+    assert results["after_slow"].error == "Skipped: dependency 'slow' failed"
+    assert results["probe"].success is True
+    assert 0 < probe.remaining[0] <= 5
+    # The timed-out step's thread is tracked until it returns
+    assert orchestrator.stats() == {"abandoned_steps": 1, "abandoned_still_running": 1}
+    time.sleep(0.25)
+    assert orchestrator.stats()["abandoned_still_running"] == 0
+    
+    results = orchestrator.execute_workflow([
+        {"id": "slow", "agent": "slow", "task": "run", "output_keys": ["base"]},
+        {"id": "after_slow", "agent": "probe", "task": "run", "context_keys": ["base"]},
+    ], timeout=0.05)
+    
+    assert results["slow"].error == "Timed out"
+    assert results["after_slow"].error == "Cancelled: workflow deadline exceeded"
+    assert len(probe.remaining) == 1
+    
+    orchestrator.shutdown()
+
+
+class RecordingComparisonAgent(BaseAgent):
+    """Stand-in for the comparison agent that records the analyses it was given."""
+    
+    def __init__(self, context_manager):
+        super().__init__("player_comparison", context_manager)
+        self.inputs = []
+    
+    def _setup(self):
+        pass
+    
+    def execute(self, request):
+        self.inputs.append(request.input_data)
+        return create_response(request, True, context_updates={"comparison": {"comparison_text": "close"}})
+
+
+def test_comparison_workflow_reuses_cached_player_analysis():
+    """Test that each player's analysis comes from the result cache when it was already computed."""
+    from tests.test_analyzers import make_match
+    context = ContextManager()
+    registry = AgentRegistry()
+    orchestrator = Orchestrator(context, registry)
+    analysis_agent = MatchAnalysisAgent(context)
+    comparison_agent = RecordingComparisonAgent(context)
+    registry.register(analysis_agent)
+    registry.register(comparison_agent)
+    matches = [make_match(f"NA1_{i}", i, "Ahri", i, 1, 2, i % 2 == 0) for i in range(4)]
+    
+    cached = orchestrator.get_player_analysis(matches, "me")
+    result = orchestrator.get_comparison_workflow(
+        {"name": "A", "puuid": "me", "matches": matches[::-1]},
+        {"name": "B", "puuid": "me", "matches": matches[:2]}
+    )
+    
+    assert result["comparison"] == {"comparison_text": "close"}
+    player1, player2 = comparison_agent.inputs[0]["player1"], comparison_agent.inputs[0]["player2"]
+    assert player1["analysis"] == cached
+    assert player2["analysis"]["total_matches"] == 2
+    assert context.result_cache_stats()["hits"] == 1
+    
+    orchestrator.shutdown()
+
+
+def test_comparison_workflow_stops_waiting_at_the_deadline(monkeypatch):
+    """Test that the comparison gives up on player analyses that outlast the workflow deadline."""
+    from src.agents import orchestrator as orchestrator_module
+    monkeypatch.setattr(orchestrator_module.settings, "workflow_timeout", 0.05)
+    context = ContextManager()
+    registry = AgentRegistry()
+    orchestrator = Orchestrator(context, registry)
+    comparison_agent = RecordingComparisonAgent(context)
+    registry.register(SleepyAgent("match_analysis", context, "match_analysis", {}))
+    registry.register(comparison_agent)
+    
+    start = time.monotonic()
+    result = orchestrator.get_comparison_workflow(
+        {"name": "A", "puuid": "a", "matches": []},
+        {"name": "B", "puuid": "b", "matches": []}
+    )
+    
+    assert time.monotonic() - start < 0.15
+    assert result == {"error": "Player comparison failed", "details": "Timed out analyzing players"}
+    assert comparison_agent.inputs == []
+    
+    orchestrator.shutdown()
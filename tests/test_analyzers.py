@@ -0,0 +1,117 @@
+"""
+Tests for match analyzers.
+"""
+import pytest
+from src.analyzers.player_games import PlayerGames
+from src.analyzers.match_analyzer import MatchAnalyzer
+from src.analyzers.analysis_state import AnalysisState
+from src.analyzers.progress_tracker import ProgressTracker
+from src.analyzers.year_summary import YearSummaryGenerator
+
+
+def make_match(match_id, created, champion, kills, deaths, assists, win, role="MIDDLE"):
+    """Build a minimal match-v5 payload with the test player and one teammate."""
+    return {
+        "metadata": {"matchId": match_id},
+        "info": {
+            "gameCreation": created,
+            "gameDuration": 1800,
+            "participants": [
+                {"puuid": "other", "teamId": 100, "kills": 4, "championName": "Garen"},
+                {
+                    "puuid": "me", "teamId": 100, "championName": champion, "teamPosition": role,
+                    "kills": kills, "deaths": deaths, "assists": assists, "win": win,
+                    "totalDamageDealtToChampions": 20000, "goldEarned": 10000, "visionScore": 20,
+                    "totalMinionsKilled": 150, "neutralMinionsKilled": 10
+                }
+            ]
+        }
+    }
+
+
+def test_player_games_extracts_columns_once():
+    """Test that the player's fields are pulled into columns and matches without the player are skipped."""
+    matches = [
+        make_match("NA1_1", 2000, "Ahri", 5, 0, 5, True),
+        {"metadata": {"matchId": "NA1_2"}, "info": {"participants": [{"puuid": "other"}]}},
+        make_match("NA1_3", 1000, "Lux", 2, 4, 6, False, role="UTILITY"),
+    ]
+
+    games = PlayerGames.from_matches(matches, "me")
+
+    assert len(games) == 2
+    assert games.match_ids.tolist() == ["NA1_1", "NA1_3"]
+    assert games.champion_names.tolist() == ["Ahri", "Lux"]
+    assert games.cs.tolist() == [160, 160]
+    assert games.team_kills.tolist() == [9, 6]
+    assert games.kda.tolist() == [10.0, 2.0]
+    assert games.time_order().tolist() == [1, 0]
+    assert PlayerGames.ensure(games, "me") is games
+
+
+def test_match_analyzer_accepts_raw_matches_or_player_games():
+    """Test that analysis results are the same from raw matches and a prebuilt table."""
+    matches = [make_match(f"NA1_{i}", i, "Ahri" if i % 2 else "Lux", i, i % 3, 2, i % 2 == 0) for i in range(12)]
+    analyzer = MatchAnalyzer()
+
+    from_matches = analyzer.analyze_player_matches(matches, "me")
+    from_games = analyzer.analyze_player_matches(PlayerGames.from_matches(matches, "me"), "me")
+
+    assert from_matches == from_games
+    assert from_matches["total_matches"] == 12
+    assert list(from_matches["champion_stats"]) == ["Lux", "Ahri"]
+    assert from_matches["champion_stats"]["Lux"]["games_played"] == 6
+    assert type(from_matches["key_metrics"]["avg_kda"]) is float
+
+
+def test_merged_period_states_match_full_analysis():
+    """Test that monthly states merged together give the same analysis as one pass over all games."""
+    month_ms = 31 * 24 * 3600 * 1000
+    matches = [
+        make_match(f"NA1_{i}", 1704067200000 + (i // 5) * month_ms + i, ["Ahri", "Lux", "Jinx"][i % 3],
+                   i % 7, i % 4, i % 5, i % 3 != 0)
+        for i in range(30)
+    ]
+    analyzer = MatchAnalyzer()
+    tracker = ProgressTracker()
+
+    monthly = tracker.build_period_states(matches, "me", "month")
+    merged = analyzer.analyze_state(AnalysisState.merge_all(monthly[key] for key in sorted(monthly)))
+    full = analyzer.analyze_player_matches(matches, "me")
+
+    assert len(monthly) == 6
+    assert merged["total_matches"] == full["total_matches"] == 30
+    assert merged["win_rate"] == full["win_rate"]
+    assert merged["champion_stats"].keys() == full["champion_stats"].keys()
+    assert merged["key_metrics"] == pytest.approx(full["key_metrics"])
+    assert merged["performance_trends"]["improvement"] == pytest.approx(full["performance_trends"]["improvement"])
+    assert merged["achievements"] == full["achievements"]
+
+    quarters = tracker.merge_period_states(monthly, "quarter")
+    assert sorted(quarters) == ["2024-Q1", "2024-Q2"]
+    assert quarters["2024-Q1"].games + quarters["2024-Q2"].games == 30
+
+    # The year summary is built from the same monthly states
+    summary = YearSummaryGenerator().generate_year_summary(matches, "me", 2024)["summary"]
+    assert summary["total_games"] == 30
+    assert summary["key_metrics"] == pytest.approx(full["key_metrics"])
+    assert {quarter: stats["games"] for quarter, stats in summary["quarterly"].items()} == {
+        "2024-Q1": quarters["2024-Q1"].games, "2024-Q2": quarters["2024-Q2"].games
+    }
+
+
+def test_year_summary_keeps_the_newest_perfect_games():
+    """Test that merged monthly states list the same (newest) perfect games as one pass over the year."""
+    month_ms = 31 * 24 * 3600 * 1000
+    # Newest first, as match-v5 lists them; every game is deathless
+    matches = [
+        make_match(f"NA1_{i}", 1704067200000 + (i // 2) * month_ms + i, "Ahri", 3, 0, 4, True)
+        for i in range(11, -1, -1)
+    ]
+    analyzer = MatchAnalyzer()
+
+    direct = analyzer.analyze_state(analyzer.build_state(matches, "me"))["achievements"]
+    summary = YearSummaryGenerator().generate_year_summary(matches, "me", 2024)["summary"]
+
+    assert summary["achievements"] == direct
+    assert [a["match_id"] for a in direct if a["type"] == "Perfect KDA"] == [f"NA1_{i}" for i in range(11, 6, -1)]
@@ -1,8 +1,10 @@
 """
 Basic API tests.
 """
+import json
 import pytest
 from fastapi.testclient import TestClient
+from src.api import main
 from src.api.main import app
 
 client = TestClient(app)
@@ -21,3 +23,108 @@ def test_health():
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
 
+
+
+def test_insights_stream_sends_results_as_they_complete(monkeypatch):
+    """Test that the SSE endpoint streams key metrics, insights and charts, then completes."""
+    matches = [
+        {
+            "metadata": {"matchId": f"NA1_{i}"},
+            "info": {
+                "gameCreation": 1700000000000 + i * 3600000,
+                "gameDuration": 1800,
+                "participants": [{
+                    "puuid": "me", "teamId": 100, "championName": "Ahri", "teamPosition": "MIDDLE",
+                    "kills": i, "deaths": 2, "assists": 5, "win": i % 2 == 0,
+                    "totalDamageDealtToChampions": 20000, "goldEarned": 10000, "visionScore": 20,
+                    "totalMinionsKilled": 150
+                }]
+            }
+        }
+        for i in range(6)
+    ]
+
+    async def fake_summoner(name, region="na1"):
+        return {"puuid": "me"}
+
+    async def fake_history(puuid, start=0, count=100):
+        return [m["metadata"]["matchId"] for m in matches]
+
+    async def fake_details_many(match_ids, skip_errors=False):
+        return matches
+
+    monkeypatch.setattr(main.async_riot_client, "get_summoner_by_name", fake_summoner)
+    monkeypatch.setattr(main.async_riot_client, "get_match_history", fake_history)
+    monkeypatch.setattr(main.async_riot_client, "get_match_details_many", fake_details_many)
+    insights_agent = main.agent_registry.get("insights_generation")
+    monkeypatch.setattr(insights_agent.bedrock_service, "generate_insights",
+                        lambda player_matches, key_metrics: {"strengths": ["Consistent"]})
+
+    response = client.get("/api/player/Test%23NA1/insights/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+
+    names = [name for name, _ in events]
+    assert names[0] == "key_metrics"
+    assert events[0][1]["total_matches"] == 6
+    assert ("insights", {"strengths": ["Consistent"]}) in events
+    assert names.count("visualization") >= 1
+    assert events[-1] == ("complete", {"partial": False})
+
+
+def test_metrics_report_pool_saturation():
+    """Test that the metrics endpoint reports each worker pool and the shared caches."""
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert {"io", "compute"} <= set(data["pools"])
+    assert data["pools"]["io"]["max_workers"] == main.settings.io_pool_workers
+    assert "hit_rate" in data["lookup_cache"]
+    assert "queue_depth" in data["event_bus"]
+
+
+def test_chat_stream_sends_tokens_as_generated(monkeypatch):
+    """Test that the chat SSE endpoint relays Bedrock stream chunks, then the full response."""
+    class FakeStream:
+        closed = False
+
+        def __iter__(self):
+            for text in ["Ward ", "more, ", "", "summoner."]:
+                yield {"chunk": {"bytes": json.dumps({"completion": text}).encode()}}
+
+        def close(self):
+            FakeStream.closed = True
+
+    requests = []
+
+    def fake_invoke_stream(**kwargs):
+        requests.append(json.loads(kwargs["body"]))
+        return {"body": FakeStream()}
+
+    monkeypatch.setattr(main.bedrock_service.client, "invoke_model_with_response_stream", fake_invoke_stream)
+
+    response = client.post("/api/agent/chat/stream", json={
+        "message": "How do I climb?",
+        "conversation_history": [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+    })
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (name[len("event: "):], json.loads(data[len("data: "):]))
+        for name, data in (block.split("\n") for block in response.text.strip().split("\n\n"))
+    ]
+    assert events == [
+        ("token", {"text": "Ward "}),
+        ("token", {"text": "more, "}),
+        ("token", {"text": "summoner."}),
+        ("complete", {"response": "Ward more, summoner.", "message_id": None})
+    ]
+    assert "Human: Hi\n\nAssistant: Hello\n\nHuman: How do I climb?" in requests[0]["prompt"]
+    assert FakeStream.closed
@@ -0,0 +1,645 @@
+"""
+Tests for service-layer helpers.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from src.services.riot_api_async import AsyncRiotAPIClient
+from src.services.rate_limiter import RiotRateLimiter, parse_rate_limit_header
+from src.services.match_store import MatchStore
+from src.services.riot_api import RiotAPIClient, RiotAPIError
+from src.services.match_sync import MatchSyncService
+from src.services.single_flight import SingleFlight, AsyncSingleFlight
+from src.services.ttl_cache import TTLCache, SQLiteCacheBackend
+from src.services.deadline import DeadlineExceeded, deadline_scope, remaining, submit_with_context
+
+
+def test_get_match_details_many_bounded_and_ordered():
+    """Test concurrent match fetching keeps order and respects the concurrency cap."""
+    client = AsyncRiotAPIClient(max_concurrency=3, rate_limiter=RiotRateLimiter("1000:1"))
+    in_flight = 0
+    peak = 0
+
+    class FakeResponse:
+        status = 200
+        reason = "OK"
+        headers = {}
+
+        def __init__(self, url):
+            self.url = url
+
+        async def __aenter__(self):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            return self
+
+        async def __aexit__(self, *exc):
+            nonlocal in_flight
+            in_flight -= 1
+
+        async def json(self):
+            return {"metadata": {"matchId": self.url.rsplit("/", 1)[-1]}}
+
+    class FakeSession:
+        """Stands in for the aiohttp session, below the client's own concurrency limit."""
+        closed = False
+
+        def get(self, url, params=None, timeout=None):
+            return FakeResponse(url)
+
+    async def run():
+        await client._get_session().close()
+        client._session = FakeSession()
+        return await client.get_match_details_many([f"NA1_{i}" for i in range(10)])
+
+    matches = asyncio.run(run())
+
+    assert [m["metadata"]["matchId"] for m in matches] == [f"NA1_{i}" for i in range(10)]
+    assert 1 < peak <= 3
+
+
+def test_parse_rate_limit_header():
+    """Test parsing of Riot rate-limit headers."""
+    assert parse_rate_limit_header("20:1,100:120") == [(20, 1), (100, 120)]
+    assert parse_rate_limit_header(None) == []
+
+
+def test_rate_limiter_windows_and_headers():
+    """Test that the limiter enforces every window and adopts server counts."""
+    limiter = RiotRateLimiter("2:1,3:120")
+
+    assert limiter.try_acquire("americas", "match-v5.getMatch") == 0
+    assert limiter.try_acquire("americas", "match-v5.getMatch") == 0
+    assert limiter.try_acquire("americas", "match-v5.getMatch") > 0
+    # Other routing values have independent buckets
+    assert limiter.try_acquire("europe", "match-v5.getMatch") == 0
+
+    # Server reports another worker has used the method budget on this host
+    limiter.update_from_headers("europe", "match-v5.getMatch", {
+        "X-App-Rate-Limit": "2:1,3:120",
+        "X-App-Rate-Limit-Count": "1:1,1:120",
+        "X-Method-Rate-Limit": "5:10",
+        "X-Method-Rate-Limit-Count": "5:10",
+    })
+    assert limiter.try_acquire("europe", "match-v5.getMatch") > 1
+    assert limiter.try_acquire("europe", "summoner-v4.getByPUUID") == 0
+
+
+def test_rate_limiter_honours_retry_after():
+    """Test that a 429 blocks the host for Retry-After seconds."""
+    limiter = RiotRateLimiter("100:1")
+    limiter.on_rate_limited("na1", "league-v4.getLeagueEntriesByPUUID", {"Retry-After": "5"})
+
+    wait = limiter.try_acquire("na1", "summoner-v4.getByPUUID")
+    assert 4 < wait <= 5
+
+
+def test_match_store_read_through_and_eviction(tmp_path):
+    """Test that stored matches are served locally and the store stays within its size limit."""
+    store = MatchStore(str(tmp_path / "matches.sqlite3"), max_bytes=4000)
+    client = RiotAPIClient(match_store=store)
+    calls = []
+
+    def fake_request(endpoint, params=None, timeout=None, retries=None, method=None):
+        calls.append(endpoint)
+        match_id = endpoint.rsplit("/", 1)[-1]
+        return {"metadata": {"matchId": match_id}, "info": {"gameCreation": 1, "filler": [hash((match_id, j)) for j in range(50)]}}
+
+    client._make_request = fake_request
+
+    first = client.get_match_details("NA1_1")
+    assert client.get_match_details("NA1_1") == first
+    assert len(calls) == 1
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+    for i in range(2, 40):
+        client.get_match_details(f"NA1_{i}")
+    stats = store.stats()
+    assert stats["evictions"] > 0
+    assert stats["size_bytes"] <= 4000
+    store.close()
+
+
+def test_async_client_reads_match_store_off_the_loop(tmp_path):
+    """Test that the async client's match store reads and writes run on its I/O executor."""
+    from src.services.executors import BoundedExecutor
+
+    pool = BoundedExecutor("test-io", max_workers=1)
+    store = MatchStore(str(tmp_path / "matches.sqlite3"))
+    client = AsyncRiotAPIClient(match_store=store, io_executor=pool)
+    store_threads = []
+    for name in ("get", "put"):
+        original = getattr(store, name)
+
+        def traced(*args, original=original):
+            store_threads.append(threading.current_thread().name)
+            return original(*args)
+        setattr(store, name, traced)
+
+    async def fake_request(url, method, params=None, retries=None):
+        return {"metadata": {"matchId": "NA1_1"}, "info": {"gameCreation": 1}}
+
+    async def run():
+        client._make_request = fake_request
+        first = await client.get_match_details("NA1_1")
+        return first, await client.get_match_details("NA1_1")
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert len(store_threads) == 3
+    assert all(name.startswith("test-io") for name in store_threads)
+    assert pool.stats()["completed"] == 3
+    store.close()
+    pool.shutdown()
+
+
+def test_get_matches_in_range_pushes_window_down():
+    """Test that the time window is sent to the ID query and paging stops on a short page."""
+    client = RiotAPIClient()
+    history_calls = []
+    detail_calls = []
+
+    def fake_history(puuid, start=0, count=100, start_time=None, end_time=None):
+        history_calls.append((start, start_time, end_time))
+        return [f"NA1_{i}" for i in range(start, min(start + count, 150))]
+
+    def fake_details(match_id):
+        detail_calls.append(match_id)
+        return {"info": {"gameCreation": 1_500_000}}
+
+    client.get_match_history = fake_history
+    client.get_match_details = fake_details
+
+    matches = client.get_matches_in_range("puuid", 1000, 2000)
+
+    assert history_calls == [(0, 1000, 2000), (100, 1000, 2000)]
+    assert len(detail_calls) == 150
+    assert len(matches) == 150
+
+
+def test_match_sync_only_fetches_newer_ids(tmp_path):
+    """Test that a returning player only triggers an ID query past the high-water mark."""
+    store = MatchStore(str(tmp_path / "matches.sqlite3"))
+    client = RiotAPIClient(match_store=store)
+    sync = MatchSyncService(client, store, overlap_seconds=0)
+    now = int(time.time())
+    games = {f"NA1_{i}": (now - 1000 + i * 100) * 1000 for i in range(5)}
+    range_calls = []
+
+    def fake_ids(puuid, start_time, end_time):
+        range_calls.append((start_time, end_time))
+        return [mid for mid, ts in games.items() if start_time * 1000 <= ts < end_time * 1000]
+
+    def fake_request(endpoint, params=None, timeout=None, retries=None, method=None):
+        match_id = endpoint.rsplit("/", 1)[-1]
+        return {"metadata": {"matchId": match_id}, "info": {"gameCreation": games[match_id]}}
+
+    client.get_match_ids_in_range = fake_ids
+    client._make_request = fake_request
+
+    assert len(sync.get_matches_in_range("puuid", now - 2000, now + 10)) == 5
+    first_sync_end = range_calls[-1][1]
+
+    games["NA1_5"] = first_sync_end * 1000 + 500
+    time.sleep(1.1)
+    matches = sync.get_matches_in_range("puuid", now - 2000, now + 10)
+
+    assert len(range_calls) == 2
+    assert range_calls[1][0] == first_sync_end
+    # Newest first, as match-v5 lists them
+    assert [m["metadata"]["matchId"] for m in matches] == [f"NA1_{i}" for i in range(5, -1, -1)]
+    assert store.get_sync_state("puuid")["newest_match_id"] == "NA1_5"
+
+    # A window that hasn't started yet is neither queried nor recorded
+    assert sync.get_matches_in_range("puuid", now + 3600, now + 7200) == []
+    assert len(range_calls) == 2
+    assert store.get_sync_state("puuid")["covered_until"] <= now + 10
+
+    # A window far before the synced one is fetched on its own, not together with everything in between
+    year = 365 * 24 * 3600
+    sync.get_matches_in_range("puuid", now - 3 * year, now - 2 * year)
+    assert range_calls[-1] == (now - 3 * year, now - 2 * year)
+    calls_before = len(range_calls)
+    sync.get_matches_in_range("puuid", now - 3 * year, now + 10)
+    # Only the gap between the two synced ranges (plus any games since the last sync) is queried
+    assert range_calls[calls_before] == (now - 2 * year, now - 2000)
+    assert all(start >= now - 2000 for start, _ in range_calls[calls_before + 1:])
+    assert store.get_sync_ranges("puuid") == [(now - 3 * year, store.get_sync_state("puuid")["covered_until"])]
+    store.close()
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Test that concurrent identical calls share one execution and its result."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return {"puuid": "abc"}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow_fetch)))
+    leader.start()
+    started.wait(2)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", slow_fetch))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.coalesced < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"puuid": "abc"}] * 4
+
+
+def test_async_single_flight_coalesces_concurrent_calls():
+    """Test that concurrent identical coroutine calls share one request."""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch(match_id):
+        calls.append(match_id)
+        await asyncio.sleep(0.01)
+        return {"matchId": match_id}
+
+    async def run():
+        return await asyncio.gather(*(flight.do(("match", "NA1_1"), fetch, "NA1_1") for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert calls == ["NA1_1"]
+    assert all(result == {"matchId": "NA1_1"} for result in results)
+
+
+def test_summoner_lookup_is_cached_with_negative_404s(monkeypatch):
+    """Test that account/summoner lookups hit Riot once and unknown Riot IDs are cached as 404s."""
+    client = RiotAPIClient()
+    calls = []
+
+    def fake_request(url, method, params=None, timeout=None, retries=None):
+        calls.append(method)
+        if "Missing" in url:
+            raise RiotAPIError("Riot API request failed: 404 Not Found", 404)
+        if method == "account-v1.getByRiotId":
+            return {"puuid": "abc", "gameName": "Player", "tagLine": "NA1"}
+        return {"summonerLevel": 100}
+
+    monkeypatch.setattr(client, "_request", fake_request)
+
+    first = client.get_summoner_by_name("Player#NA1")
+    second = client.get_summoner_by_name("player#na1")
+    assert first == second
+    assert first["puuid"] == "abc"
+    assert calls == ["account-v1.getByRiotId", "summoner-v4.getByPUUID"]
+
+    for _ in range(2):
+        with pytest.raises(RiotAPIError) as error:
+            client.get_summoner_by_name("Missing#NA1")
+        assert error.value.status_code == 404
+    assert calls.count("account-v1.getByRiotId") == 2
+
+
+def test_ttl_cache_expiry_and_shared_backend(tmp_path, monkeypatch):
+    """Test per-entry expiry and that a second cache process sees the shared backend."""
+    backend = SQLiteCacheBackend(str(tmp_path / "lookup.sqlite3"))
+    cache = TTLCache(max_entries=2, backend=backend, namespace="riot")
+    cache.set(("league", "abc"), {"value": []}, ttl=300)
+    cache.set(("account", "abc"), {"value": {"puuid": "abc"}}, ttl=1)
+
+    other_worker = TTLCache(backend=backend, namespace="riot")
+    assert other_worker.get(("league", "abc")) == {"value": []}
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2)
+    assert cache.get(("account", "abc")) is None
+    assert cache.get(("league", "abc")) == {"value": []}
+
+
+def test_deadline_propagates_and_stops_riot_requests():
+    """Test that deadlines nest, follow work into executor threads and stop requests once expired."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    assert remaining() is None
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining() <= 10
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert 0 < submit_with_context(executor, remaining).result() <= 10
+            assert executor.submit(remaining).result() is None
+
+    client = RiotAPIClient()
+    calls = []
+    client.session.get = lambda *args, **kwargs: calls.append(args)
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            client._send("https://na1.api.riotgames.com/lol/test", "test")
+    assert calls == []
+
+
+def test_job_queue_deduplicates_by_key_and_reports_results():
+    """Test that jobs for the same key share one run and failed jobs can be resubmitted."""
+    from src.services.job_queue import Job, JobQueue
+
+    queue = JobQueue(max_workers=2)
+    release = threading.Event()
+    runs = []
+
+    def work(job, value):
+        runs.append(value)
+        job.set_progress("working", value=value)
+        release.wait(5)
+        if value < 0:
+            raise ValueError("negative")
+        return value * 2
+
+    first = queue.submit(("year", "me", 2024), work, 21)
+    second = queue.submit(("year", "me", 2024), work, 21)
+    failing = queue.submit(("year", "other", 2024), work, -1)
+    assert second is first
+    assert queue.get(first.job_id).status in (Job.QUEUED, Job.RUNNING)
+
+    release.set()
+    deadline = time.time() + 5
+    while not (first.done and failing.done) and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert first.to_dict()["result"] == 42
+    assert first.progress == {"stage": "working", "value": 21}
+    assert failing.to_dict()["error"] == "negative"
+    assert queue.submit(("year", "me", 2024), work, 21) is first
+    assert queue.submit(("year", "other", 2024), work, -1) is not failing
+    assert sorted(runs[:2]) == [-1, 21]
+    assert queue.stats()["deduplicated"] == 2
+    queue.shutdown(wait=True)
+
+
+def test_bounded_executor_runs_off_loop_and_counts_saturation():
+    """Test that the pool runs blocking calls without blocking the loop and tracks in-flight work."""
+    from src.services.executors import BoundedExecutor
+    from src.services.deadline import deadline_scope, remaining
+
+    pool = BoundedExecutor("test", max_workers=2)
+    release = threading.Event()
+
+    async def main():
+        blocked = [pool.run(release.wait, 5) for _ in range(3)]
+        tasks = [asyncio.ensure_future(call) for call in blocked]
+        await asyncio.sleep(0.05)
+        # The loop is still free while three calls wait on two workers
+        stats = pool.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        with deadline_scope(10):
+            left = await pool.run(remaining)
+        return stats, left
+
+    stats, left = asyncio.run(main())
+    assert stats["in_flight"] == 3 and stats["queued"] == 1 and stats["saturation"] == 1.5
+    assert 0 < left <= 10
+    assert pool.stats()["completed"] == 4 and pool.stats()["in_flight"] == 0
+    pool.shutdown()
+
+
+def test_prompt_builder_packs_participants_into_a_budgeted_table():
+    """Test that participants are projected to a compact table and trimmed to the token budget."""
+    import json
+    from src.services.prompt_builder import PromptBuilder, estimate_tokens
+
+    participant = {
+        "championName": "Ahri", "teamPosition": "MIDDLE", "win": True, "kills": 7, "deaths": 2, "assists": 9,
+        "totalMinionsKilled": 180, "neutralMinionsKilled": 12, "goldEarned": 12000,
+        "totalDamageDealtToChampions": 25000, "visionScore": 21,
+        "challenges": {"killParticipation": 0.6123, **{f"stat{i}": i for i in range(100)}},
+        "perks": {"styles": [{"selections": [{"perk": 8112, "var1": 1}] * 4}] * 2}
+    }
+    matches = [dict(participant, kills=i) for i in range(20)]
+
+    full = PromptBuilder(budget_tokens=10000).text("Analyze.").data("Stats", {"avg_kda": 3.14159}) \
+        .participants("Matches", matches).build()
+    trimmed = PromptBuilder(budget_tokens=120).text("Analyze.").participants("Matches", matches).build()
+
+    assert len(full) * 10 < len(json.dumps(matches, indent=2))
+    assert '{"avg_kda":3.14}' in full
+    assert "Matches (20 rows):\nchampion|role|win|kills|" in full
+    assert "Ahri|MIDDLE|1|0|2|9|192|12000|25000|||21|||0.61" in full
+    assert "Matches (" in trimmed and " of 20 rows):" in trimmed
+    assert estimate_tokens(trimmed) <= 120
+
+
+def test_bedrock_response_cache_reuses_identical_requests(tmp_path, monkeypatch):
+    """Test that identical cacheable prompts hit the cache, chat does not, and the SQLite store is size-limited."""
+    import io
+    import json
+    from config.settings import settings
+    from src.services.aws_bedrock import BedrockService
+
+    calls = []
+
+    def fake_invoke_model(**kwargs):
+        calls.append(json.loads(kwargs["body"]))
+        return {"body": io.BytesIO(json.dumps({"completion": f"answer {len(calls)}"}).encode())}
+
+    monkeypatch.setattr(settings, "llm_cache_temperature", 0.0)
+    backend = SQLiteCacheBackend(str(tmp_path / "llm.sqlite3"), table="llm_responses", max_entries=3)
+    service = BedrockService(response_cache=TTLCache(10, backend=backend, namespace="bedrock"))
+    monkeypatch.setattr(service.client, "invoke_model", fake_invoke_model)
+
+    first = service.generate_social_comparison({"avg_kda": 3.0}, {"avg_kda": 2.0})
+    second = service.generate_social_comparison({"avg_kda": 3.0}, {"avg_kda": 2.0})
+    other = service.generate_social_comparison({"avg_kda": 3.0}, {"avg_kda": 2.5})
+    service.chat("Hi")
+    service.chat("Hi")
+
+    assert first == second == "answer 1"
+    assert other == "answer 2"
+    assert len(calls) == 4
+    assert [call["temperature"] for call in calls] == [0.0, 0.0, 0.7, 0.7]
+
+    # A fresh service on the same store answers from disk
+    restarted = BedrockService(response_cache=TTLCache(10, backend=backend, namespace="bedrock"))
+    monkeypatch.setattr(restarted.client, "invoke_model", fake_invoke_model)
+    assert restarted.generate_social_comparison({"avg_kda": 3.0}, {"avg_kda": 2.0}) == "answer 1"
+    assert len(calls) == 4
+
+    backend.PRUNE_INTERVAL = 1
+    for i in range(5):
+        backend.set(f"k{i}", i, time.time() + 100 + i)
+    assert backend._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0] == 3
+    assert backend.get("k4") is not None and backend.get("k0") is None
+
+
+def test_bedrock_async_response_cache_stays_off_the_loop(tmp_path, monkeypatch):
+    """Test that async model calls read and write the SQLite-backed response cache on the io executor."""
+    import io
+    import json
+    from src.services.aws_bedrock import BedrockService
+    from src.services.executors import BoundedExecutor
+
+    loop_threads = []
+
+    class LoopCheckingBackend(SQLiteCacheBackend):
+        def get(self, key):
+            loop_threads.append(threading.current_thread() is threading.main_thread())
+            return super().get(key)
+
+        def set(self, key, value, expires_at):
+            loop_threads.append(threading.current_thread() is threading.main_thread())
+            super().set(key, value, expires_at)
+
+    pool = BoundedExecutor("test-io", max_workers=2)
+    backend = LoopCheckingBackend(str(tmp_path / "llm.sqlite3"), table="llm_responses")
+    service = BedrockService(response_cache=TTLCache(10, backend=backend, namespace="bedrock"), io_executor=pool)
+    monkeypatch.setattr(service.client, "invoke_model", lambda **kwargs: {
+        "body": io.BytesIO(json.dumps({"completion": "analysis"}).encode())
+    })
+    match = {"metadata": {"matchId": "NA1_1"}, "info": {"participants": []}}
+
+    assert asyncio.run(service.generate_match_analysis_async(match, {"championName": "Ahri"})) == "analysis"
+    # A miss reads the backend, then writes the completion through to it
+    assert loop_threads == [False, False]
+    pool.shutdown()
+
+
+def test_bedrock_limiter_backs_off_on_throttling_and_queues_async_callers(monkeypatch):
+    """Test AIMD limit changes, jittered throttle retries, and FIFO async queueing under the cap."""
+    import io
+    import json
+    from botocore.exceptions import ClientError
+    from config.settings import settings
+    from src.services.adaptive_limiter import AdaptiveConcurrencyLimiter
+    from src.services.aws_bedrock import BedrockService
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=8, decrease_cooldown=10)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    limiter.acquire()
+    limiter.release(throttled=True)  # Within the cooldown: counted, but no second cut
+    assert limiter.stats()["limit"] == 2 and limiter.stats()["throttled"] == 2
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.stats()["limit"] == 3
+
+    monkeypatch.setattr(settings, "bedrock_retry_base_delay", 0.01)
+    service = BedrockService(response_cache=TTLCache(10))
+    service.limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    responses = ["throttle", "throttle", "ok"]
+    active = []
+    peak = []
+
+    def fake_invoke_model(**kwargs):
+        if responses and responses.pop(0) == "throttle":
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+        active.append(1)
+        peak.append(len(active))
+        time.sleep(0.05)
+        active.pop()
+        return {"body": io.BytesIO(json.dumps({"completion": "done"}).encode())}
+
+    monkeypatch.setattr(service.client, "invoke_model", fake_invoke_model)
+    assert service.chat("Hi") == "done"
+    assert service.retries == 2
+
+    async def burst():
+        calls = [asyncio.ensure_future(service.chat_async(f"question {i}")) for i in range(5)]
+        await asyncio.sleep(0.02)
+        depth = service.stats()["concurrency"]["queue_depth"]
+        return depth, await asyncio.gather(*calls)
+
+    depth, answers = asyncio.run(burst())
+    assert depth == 3
+    assert answers == ["done"] * 5
+    assert max(peak) == 2
+    stats = service.stats()["concurrency"]
+    assert stats["in_flight"] == 0 and stats["peak_queue_depth"] == 3
+
+
+def test_bedrock_async_call_holds_its_slot_until_the_thread_finishes(monkeypatch):
+    """Test that cancelling an async Bedrock call keeps its limiter slot until boto3 returns."""
+    from src.services.adaptive_limiter import AdaptiveConcurrencyLimiter
+    from src.services.aws_bedrock import BedrockService
+    from src.services.executors import BoundedExecutor
+
+    pool = BoundedExecutor("test-io", max_workers=2)
+    service = BedrockService(response_cache=TTLCache(10), io_executor=pool)
+    service.limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    release = threading.Event()
+
+    def slow_invoke_model(**kwargs):
+        release.wait(5)
+        return {"body": io.BytesIO(json.dumps({"completion": "late"}).encode())}
+
+    monkeypatch.setattr(service.client, "invoke_model", slow_invoke_model)
+
+    async def cancel_mid_call():
+        call = asyncio.ensure_future(service.chat_async("Hi"))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        return service.stats()["concurrency"]["in_flight"], pool.stats()["in_flight"]
+
+    assert asyncio.run(cancel_mid_call()) == (1, 1)
+    release.set()
+    deadline = time.monotonic() + 2
+    while service.stats()["concurrency"]["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.stats()["concurrency"]["in_flight"] == 0
+    pool.shutdown()
+
+
+def test_comprehend_batches_chunks_and_caches_documents(monkeypatch):
+    """Test that commentaries are split under 5 KB, batched by 25, merged back, and cached by text hash."""
+    from src.services.aws_comprehend import ComprehendService, split_document
+
+    long_text = "Great early game. " * 400  # About 7 KB
+    documents = split_document(long_text)
+    assert len(documents) == 2 and all(len(d.encode("utf-8")) <= 5000 for d in documents)
+    assert split_document("é" * 3000)[0] == "é" * 2500
+
+    service = ComprehendService(cache=TTLCache(100))
+    calls = []
+
+    def fake_sentiment(TextList, LanguageCode):
+        calls.append(("sentiment", len(TextList)))
+        return {"ResultList": [
+            {"Index": i, "Sentiment": "POSITIVE",
+             "SentimentScore": {"Positive": 0.9, "Negative": 0.0, "Neutral": 0.1, "Mixed": 0.0}}
+            for i in range(len(TextList))
+        ], "ErrorList": []}
+
+    def fake_key_phrases(TextList, LanguageCode):
+        calls.append(("key_phrases", len(TextList)))
+        return {"ResultList": [
+            {"Index": i, "KeyPhrases": [{"Text": "early game"}, {"Text": f"doc {text[-3:]}"}]}
+            for i, text in enumerate(TextList)
+        ], "ErrorList": []}
+
+    monkeypatch.setattr(service.client, "batch_detect_sentiment", fake_sentiment)
+    monkeypatch.setattr(service.client, "batch_detect_key_phrases", fake_key_phrases)
+
+    texts = [f"Match {i} went well. {i:03d}" for i in range(29)] + [long_text]
+    results = service.analyze_match_commentary_batch(texts)
+
+    assert sorted(calls) == [("key_phrases", 6), ("key_phrases", 25), ("sentiment", 6), ("sentiment", 25)]
+    assert len(results) == 30
+    assert results[0]["insights"]["tone"] == "POSITIVE"
+    assert results[0]["key_phrases"] == ["early game", "doc 000"]
+    assert results[-1]["sentiment"]["scores"]["Positive"] == pytest.approx(0.9)
+    assert results[-1]["key_phrases"][0] == "early game"
+
+    calls.clear()
+    assert service.analyze_match_commentary(texts[3]) == results[3]
+    assert service.analyze_sentiment("") == {"sentiment": "NEUTRAL", "scores": {}}
+    assert calls == []
+    service.shutdown()